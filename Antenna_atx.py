@@ -1,140 +1,90 @@
 #! /usr/bin/env python3
 
+import argparse
+import base64
 import fileinput
+import hashlib
+import io
+import json
+import os
 from pprint import pprint # pylint: disable=W0611
 
 import sys
+from collections import namedtuple
 from datetime import datetime, UTC
 
 import numpy as np
-import matplotlib
-
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-#import tempfile
-#import base64
 
 #TODO: Add doc strings and turn back on C0116
 
 # pprint=pprint.PrettyPrinter(stream=sys.stderr)
 
-from JCMBSoftPyLib import HTML_Unit
+from Antenna_model import (
+    COMPASS,
+    E1,
+    E2,
+    E5,
+    E5a,
+    E5b,
+    E6,
+    GALILEO,
+    GLONASS,
+    GPS,
+    IRNSS,
+    L1,
+    L2,
+    L5,
+    LEX,
+    NO_AZ,
+    QZSS,
+    SBAS,
+    SYSTEM_NAMES,
+    SV_Types,
+    E_Offset,
+    N_Offset,
+    U_Offset,
+    read_antennas,
+)
+from Antenna_checkpoint import CheckpointedRun
+from Antenna_memory import MemoryMonitor
+from Antenna_validate import validate_files
+from Antenna_progress import Run_Progress, input_size
+
+
+class LazyModule:  # pylint: disable=R0903
+    """Stands in for a module that is only imported the first time one of its attributes is used.
+
+    matplotlib and HTML_Unit take most of the start up time, so parsing and lookups never pay for them.
+    """
+
+    def __init__(self, load):
+        self.Load = load
+        self.Module = None
+
+    def __getattr__(self, name):
+        if self.Module is None:
+            self.Module = self.Load()
+        return getattr(self.Module, name)
+
+
+def load_pyplot():
+    import matplotlib  # pylint: disable=C0415
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # pylint: disable=C0415
+
+    return matplotlib.pyplot
+
+
+def load_HTML_Unit():
+    from JCMBSoftPyLib import HTML_Unit as module  # pylint: disable=C0415
+
+    return module
+
+
+plt = LazyModule(load_pyplot)
+HTML_Unit = LazyModule(load_HTML_Unit)
 
-# pylint: disable=W0105
-"""
-Record indicating the start of a new     |3X,A1,I2,54X|
- |                    | frequency section. The satellite system  |            |
- |                    | flag ('G','R','E','C','J','S') has to be |            |
- |                    | specified together with the frequency    |            |
- |                    | number code that has to be consistent    |            |
- |                    | with the RINEX definition:               |            |
- |                    | GPS:     'G01' - L1                      |            |
- |                    |          'G02' - L2                      |            |
- |                    |          'G05' - L5                      |            |
- |                    | GLONASS: 'R01' - G1                      |            |
- |                    |          'R02' - G2                      |            |
- |                    | Galileo: 'E01' - E1                      |            |
- |                    |          'E05' - E5a                     |            |
- |                    |          'E07' - E5b                     |            |
- |                    |          'E08' - E5 (E5a+E5b)            |            |
- |                    |          'E06' - E6                      |            |
- |                    | Compass: 'C01' - E1                      |            |
- |                    |          'C02' - E2                      |            |
- |                    |          'C07' - E5b                     |            |
- |                    |          'C06' - E6                      |            |
- |                    | QZSS:    'J01' - L1                      |            |
- |                    |          'J02' - L2                      |            |
- |                    |          'J05' - L5                      |            |
- |                    |          'J06' - LEX                     |            |
- |                    | SBAS:    'S01' - L1                      |            |
- |                    |          'S05' - L5                      |            |
- """
-
-GPS = 0
-GLONASS = 1
-GALILEO = 2
-COMPASS = 3
-QZSS = 4
-IRNSS = 5
-SBAS = 6
-
-SYSTEM_NAMES = [None] * (SBAS + 1)
-
-SYSTEM_NAMES[GPS] = "GPS"
-SYSTEM_NAMES[GLONASS] = "GLONASS"
-SYSTEM_NAMES[GALILEO] = "GALILEO"
-SYSTEM_NAMES[COMPASS] = "BeiDOU"
-SYSTEM_NAMES[QZSS] = "QZSS"
-SYSTEM_NAMES[IRNSS] = "IRNSS"
-SYSTEM_NAMES[SBAS] = "SBAS"
-
-
-L1 = 1
-L2 = 2
-L5 = 5
-
-E1 = 1
-E2 = 2
-E5a = 5
-E5b = 7
-E5 = 8
-E6 = 6
-
-LEX = 6
-
-N_Offset = 0
-E_Offset = 1
-U_Offset = 2
-
-
-NO_AZ = -99
-
-GPS_Generic_Cal_Antennas = "# Number of Calibrated Antennas:"
-GPS_Generic_Cal_Antennas_Length = len(GPS_Generic_Cal_Antennas)
-
-GPS_Cal_Antennas = "# Number of Calibrated Antennas GPS:"
-GPS_Cal_Antennas_Length = len(GPS_Cal_Antennas)
-
-GLO_Cal_Antennas = "# Number of Calibrated Antennas GLO:"
-GLO_Cal_Antennas_Length = len(GLO_Cal_Antennas)
-
-
-SV_Types = {
-    "BLOCK I",
-    "BLOCK II",
-    "BLOCK IIA",
-    "BLOCK IIF",
-    "BLOCK IIR",
-    "BLOCK IIR-A",
-    "BLOCK IIR-B",
-    "BLOCK IIR-M",
-    "BLOCK IIIA",
-    "GLONASS",
-    "GLONASS-M",
-    "GLONASS-K1",
-    "GLONASS-K2",
-    "GALILEO-1",
-    "GALILEO-2",
-    "GALILEO-0A",
-    "GALILEO-0B",
-    "BEIDOU-2G",
-    "BEIDOU-2I",
-    "BEIDOU-2M",
-    "BEIDOU-3I",
-    "BEIDOU-3G-CAST",
-    "BEIDOU-3M-CAST",
-    "BEIDOU-3M-SECM",
-    "BEIDOU-3SM-CAST",
-    "BEIDOU-3SI-CAST",
-    "BEIDOU-3SI-SECM",
-    "QZSS",
-    "QZSS-2A",
-    "QZSS-2G",
-    "QZSS-2I",
-    "IRNSS-1IGSO",
-    "IRNSS-1GEO",
-    "IRNSS-2GEO",
-}
 
 
 def safe_filename(filename):
@@ -146,6 +96,290 @@ def safe_filename(filename):
     return result
 
 
+class OutputLayout:
+    """Where the antenna pages and plots are written.
+
+    Everything for one antenna type goes in a single shard directory under Directory, so the links from a page
+    to its plots stay bare file names and the index links are relative to Directory. Layout "flat" writes
+    everything into Directory, "type" uses a directory per antenna type and "hash" a 256 way fan-out on a
+    hash of the type.
+
+    Every file written is recorded so a manifest can be written at the end of the run.
+
+    When Inline is "png" or "svg" plots are not written at all, they are embedded in the pages as data URIs.
+    Otherwise, with Thumbnails, each plot is also written reduced by THUMBNAIL_FACTOR and the pages show the
+    thumbnails linked to the full size plots.
+
+    With Deterministic the output only depends on the input. The plots are saved without the metadata that
+    changes between matplotlib versions or runs, the index shows Timestamp rather than the time of the run, and
+    files are built in memory and only written when their bytes differ from the file already there, so a sync
+    of the output only transfers what changed.
+    """
+
+    MANIFEST = "manifest.txt"
+    THUMBNAIL_FACTOR = 4
+    # Metadata that would differ between runs or matplotlib versions, None leaves the entry out
+    DETERMINISTIC_METADATA = {"png": {"Software": None}, "svg": {"Date": None, "Creator": None}}
+    SVG_HASH_SALT = "Antenna.ATX"
+
+    def __init__(self, Directory=".", Layout="flat", Inline=None, Thumbnails=False):
+        self.Directory = Directory
+        self.Layout = Layout
+        self.Inline = Inline
+        self.Thumbnails = Thumbnails
+        self.Deterministic = False
+        self.Timestamp = None
+        self.Written = []
+        self.Created = set()
+
+    def configure(self, Directory, Layout, Inline=None, Thumbnails=False, Deterministic=False, Timestamp=None):  # pylint: disable=R0913,R0917
+        self.Directory = Directory
+        self.Layout = Layout
+        self.Inline = Inline
+        self.Thumbnails = Thumbnails and not Inline
+        self.Deterministic = Deterministic
+        self.Timestamp = Timestamp
+
+    def shard(self, antennaName):
+        if self.Layout == "type":
+            return safe_filename(antennaName)
+        if self.Layout == "hash":
+            return hashlib.md5(antennaName.encode("utf-8")).hexdigest()[:2]
+        return ""
+
+    def link(self, antennaName, filename):
+        """Return the link to filename relative to Directory."""
+        shard = self.shard(antennaName)
+        if shard:
+            return shard + "/" + filename
+        return filename
+
+    def path(self, antennaName, filename):
+        """Return the path to write filename to, creating its shard directory if needed."""
+        directory = os.path.join(self.Directory, self.shard(antennaName))
+        if directory not in self.Created:
+            os.makedirs(directory, exist_ok=True)
+            self.Created.add(directory)
+        return os.path.join(directory, filename)
+
+    def record(self, antennaName, filename):
+        self.Written.append(self.link(antennaName, filename))
+
+    def created(self):
+        """Return the creation time shown in the index, Timestamp in deterministic mode."""
+        if self.Deterministic:
+            return self.Timestamp
+        return datetime.now(UTC)
+
+    def metadata(self, image_format):
+        """Return the metadata argument for saving a plot in image_format."""
+        if not self.Deterministic:
+            return None
+        plt.rcParams["svg.hashsalt"] = self.SVG_HASH_SALT
+        return self.DETERMINISTIC_METADATA.get(image_format)
+
+    def write_bytes(self, path, data):
+        """Write data to path, in deterministic mode only if the file does not already hold exactly data."""
+        if self.Deterministic:
+            try:
+                with open(path, "rb") as existing:
+                    if existing.read(len(data) + 1) == data:
+                        Run_Progress.Files_Unchanged += 1
+                        return
+            except OSError:
+                pass
+        with open(path, "wb") as output:
+            output.write(data)
+        Run_Progress.written(len(data))
+
+    def save(self, antennaName, filename, write):
+        """Call write with where to save filename, a file in memory in deterministic mode, and record it."""
+        path = self.path(antennaName, filename)
+        if self.Deterministic:
+            buffer = io.BytesIO()
+            write(buffer)
+            self.write_bytes(path, buffer.getvalue())
+        else:
+            write(path)
+            Run_Progress.written(os.path.getsize(path))
+        self.record(antennaName, filename)
+
+    def open_text(self, antennaName, filename):
+        """Record filename and open it for writing text, in memory until close_text in deterministic mode."""
+        self.record(antennaName, filename)
+        if self.Deterministic:
+            return io.StringIO()
+        return open(self.path(antennaName, filename), "w", encoding="utf-8")  # pylint: disable=R1732
+
+    def close_text(self, antennaName, filename, text_file):
+        path = self.path(antennaName, filename)
+        if self.Deterministic:
+            self.write_bytes(path, text_file.getvalue().encode("utf-8"))
+        else:
+            text_file.close()
+            Run_Progress.written(os.path.getsize(path))
+
+    def read_manifest(self):
+        try:
+            with open(os.path.join(self.Directory, self.MANIFEST), encoding="utf-8") as manifest:
+                return [line.rstrip("\n") for line in manifest if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def write_manifest(self, prune=False):
+        """Write the manifest of the files written in this run.
+
+        With prune the files listed by the previous manifest that were not written again are removed.
+        """
+        if prune:
+            Written = set(self.Written)
+            for stale in self.read_manifest():
+                if stale not in Written:
+                    try:
+                        os.remove(os.path.join(self.Directory, stale))
+                    except FileNotFoundError:
+                        pass
+
+        os.makedirs(self.Directory, exist_ok=True)
+        manifest = "".join(filename + "\n" for filename in self.Written)
+        self.write_bytes(os.path.join(self.Directory, self.MANIFEST), manifest.encode("utf-8"))
+
+
+Output_Layout = OutputLayout()
+
+IMAGE_MIME_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+def thumbnail_filename(filename):
+    return filename[: -len(".png")] + ".thumb.png"
+
+
+def reduce_image(rgba, factor):
+    """Shrink an RGBA image array by an integer factor, averaging each factor x factor block."""
+    height = rgba.shape[0] // factor * factor
+    width = rgba.shape[1] // factor * factor
+    blocks = rgba[:height, :width].reshape(height // factor, factor, width // factor, factor, 4)
+    return blocks.mean(axis=(1, 3)).round().astype(np.uint8)
+
+
+def save_plot(antennaName, filename):
+    """Save the current figure as filename for the antenna, returning the src for its img tag or "ERROR".
+
+    With inline images the figure is rendered to memory and the src is a data URI. With thumbnails the
+    figure is rendered once and both the full size image and the thumbnail are written from that render.
+    """
+    try:
+        if Output_Layout.Inline:
+            buffer = io.BytesIO()
+            plt.savefig(buffer, format=Output_Layout.Inline, metadata=Output_Layout.metadata(Output_Layout.Inline))
+            return "data:{};base64,{}".format(
+                IMAGE_MIME_TYPES[Output_Layout.Inline], base64.b64encode(buffer.getvalue()).decode("ascii")
+            )
+
+        if Output_Layout.Thumbnails:
+            figure = plt.gcf()
+            figure.canvas.draw()
+            rgba = np.asarray(figure.canvas.buffer_rgba())
+            metadata = Output_Layout.metadata("png")
+            Output_Layout.save(
+                antennaName, filename, lambda target: plt.imsave(target, rgba, format="png", metadata=metadata)
+            )
+            thumbnail = reduce_image(rgba, Output_Layout.THUMBNAIL_FACTOR)
+            Output_Layout.save(
+                antennaName,
+                thumbnail_filename(filename),
+                lambda target: plt.imsave(target, thumbnail, format="png", metadata=metadata),
+            )
+            return filename
+
+        metadata = Output_Layout.metadata("png")
+        Output_Layout.save(antennaName, filename, lambda target: plt.savefig(target, format="png", metadata=metadata))
+    except:
+        return "ERROR"
+    return filename
+
+
+def img_tag(src, alt):
+    """Return the img tag for a plot saved by save_plot, as a thumbnail linked to the plot when enabled.
+
+    Nothing is returned for a plot that could not be drawn, rather than a broken link.
+    """
+    if src in ("", "ERROR"):
+        return ""
+    if Output_Layout.Thumbnails and src.endswith(".png"):
+        return '<a target="_blank" href="{}"><img src="{}" alt="{}"></a>'.format(src, thumbnail_filename(src), alt)
+    return '<img src="{}" alt="{}">'.format(src, alt)
+
+
+def sparkline_svg(values, width=90, height=20):
+    """Return an inline SVG line of values, scaled to fill width x height."""
+    if len(values) < 2:
+        return ""
+    low = min(values)
+    high = max(values)
+    scale = (height - 2) / (high - low) if high > low else 0
+    points = " ".join(
+        "{:.1f},{:.1f}".format(index * width / (len(values) - 1), height - 1 - (value - low) * scale)
+        for index, value in enumerate(values)
+    )
+    return (
+        f'<svg width="{width}" height="{height}" viewBox="0 0 {width} {height}">'
+        f'<polyline fill="none" stroke="currentColor" points="{points}"/></svg>'
+    )
+
+
+PlotKind = namedtuple("PlotKind", ["Name", "Scope", "Render", "Alt", "Row", "Column"])
+PlotKind.__doc__ = """A kind of plot on the antenna pages.
+
+Scope "system" plots are drawn once per system by Render(antennaName, System, Elev_Corrections, Elev_Names),
+scope "band" plots once per band by Render(antennaName, bandName, Products), Products being the band's shared
+BandProducts. Both return the src for the img tag. Band plots are laid out in a table by their Row and Column, with Alt formatted with the band.
+"""
+
+
+class PlotRegistry:
+    """The kinds of plot on the antenna pages and the ones selected for this run.
+
+    Each kind registers its renderer with the register decorator, so the pages pick up new kinds without
+    changes to output_antenna_details. The page layout only has rows, columns and sections for the kinds
+    selected.
+    """
+
+    def __init__(self):
+        self.Kinds = {}
+        self.Selected = None
+
+    def register(self, Name, Scope, Alt="{}", Row=None, Column=None):
+        def decorator(render):
+            self.Kinds[Name] = PlotKind(Name, Scope, render, Alt, Row, Column)
+            return render
+
+        return decorator
+
+    def select(self, names):
+        """Only draw the kinds in names, all of them if names is None."""
+        unknown = [name for name in names or [] if name not in self.Kinds]
+        if unknown:
+            raise ValueError(
+                "Unknown plot kind {}, the kinds are {}".format(", ".join(unknown), ", ".join(self.Kinds))
+            )
+        self.Selected = names
+
+    def selected(self, Scope):
+        return [
+            kind
+            for kind in self.Kinds.values()
+            if kind.Scope == Scope and (self.Selected is None or kind.Name in self.Selected)
+        ]
+
+
+Plot_Registry = PlotRegistry()
+
+
+def unique(values):
+    return list(dict.fromkeys(values))
+
+
 def plot_polar_contour(Title, values, azimuths, zeniths, data_range):
     """Plot a polar contour plot, with 0 degrees at the North.
 
@@ -202,6 +436,7 @@ def plot_polar_contour(Title, values, azimuths, zeniths, data_range):
 # def create_mean_plot (Antenna,Band,Elev_Correction_L1,Elev_Correction_L2):
 
 
+@Plot_Registry.register("mean", "system")
 def create_mean_plot(antennaName, System, Elev_Corrections, Elev_Names):
     Elev_Labels = []
     Elev_values = []
@@ -218,10 +453,8 @@ def create_mean_plot(antennaName, System, Elev_Corrections, Elev_Names):
     xplot_range = [0, 90]
     plt.xlim(xplot_range)
 
-    if len(Elev_Corrections) == 0:
-        return ""
-
-    if len(Elev_Corrections[0]) == 0:
+    if len(Elev_Corrections) == 0 or len(Elev_Corrections[0]) == 0:
+        plt.close("all")
         return ""
 
     for Item in Elev_Corrections[0]:
@@ -264,22 +497,14 @@ def create_mean_plot(antennaName, System, Elev_Corrections, Elev_Names):
     plt.legend()
     filename = safe_filename(antennaName) + "." + SYSTEM_NAMES[System] + ".MEAN.png"
 
-    try:
-        plt.savefig(filename, format="png")
-    except:
-        filename = "Error"
+    filename = save_plot(antennaName, filename)
 
     plt.close("all")
     return filename
 
 
-def create_az_plot(antennaName, bandName, Az_Elev_Correction):
-
-    #    pprint(antennaName)
-    #    pprint(bandName)
-    Elev_Labels = []
-#    L1_values = []
-#    L2_values = []
+@Plot_Registry.register("az", "band", "{}", "Azimuth", "Bias")
+def create_az_plot(antennaName, bandName, Products):
 
     plt.figure(figsize=(8, 6), dpi=100)
     plt.ylabel("Bias (mm)")
@@ -290,56 +515,22 @@ def create_az_plot(antennaName, bandName, Az_Elev_Correction):
     plot_range = [0, 90]
     plt.xlim(plot_range)
 
-    for Item in Az_Elev_Correction[0]:
-        Elev_Labels.append(Item[0])
-    #      Elev_Labels.insert(0,Item[0])
-
-    Max_Correction = 0
-    for Az in sorted(Az_Elev_Correction):
-        if Az != NO_AZ:
-            for Item in Az_Elev_Correction[Az]:
-                #          values.append(Item[1])
-                if abs(Item[1]) > Max_Correction:
-                    Max_Correction = abs(Item[1])
-
-    yplot_range = [-50, 50]
-    if Max_Correction <= 5.0:
-        yplot_range = [-5, 5]
-        plt.ylim(yplot_range)
-    elif Max_Correction <= 10.0:
-        yplot_range = [-10, 10]
-        plt.ylim(yplot_range)
-    elif Max_Correction <= 15.0:
-        yplot_range = [-15, 15]
-        plt.ylim(yplot_range)
-    elif Max_Correction <= 20.0:
-        yplot_range = [-20, 20]
-        plt.ylim(yplot_range)
-
-    for Az in sorted(Az_Elev_Correction):
-        if Az != NO_AZ:
-            values = []
-            for Item in Az_Elev_Correction[Az]:
-                #          values.append(Item[1])
-                values.insert(0, Item[1])
+    if Products.Limit is not None:
+        plt.ylim([-Products.Limit, Products.Limit])
 
-            plt.plot(Elev_Labels, values, label=bandName + "-" + str(Az))
+    # The values are by zenith, reversed they are by elevation
+    for Az, values in zip(Products.Azimuths.tolist(), Products.Values):
+        plt.plot(Products.Zeniths, values[::-1], label=bandName + "-" + str(Az))
     filename = safe_filename(antennaName + "." + bandName + ".AZ.png")
-    try:
-        plt.savefig(filename, format="png")
-    except:
-        filename = "ERROR"
+    filename = save_plot(antennaName, filename)
 
     plt.close()
 
     return filename
 
 
-def create_az_delta_plot(antennaName, Band, Az_Elev_Correction):
-
-    Elev_Labels = []
-#    L1_values = []
-#    L2_values = []
+@Plot_Registry.register("az-delta", "band", "{}", "Azimuth", "Delta")
+def create_az_delta_plot(antennaName, Band, Products):
 
     plt.figure(figsize=(8, 6), dpi=100)
     plt.ylabel("Bias from mean (mm)")
@@ -352,119 +543,47 @@ def create_az_delta_plot(antennaName, Band, Az_Elev_Correction):
     plot_range = [0, 90]
     plt.xlim(plot_range)
 
-    for Item in Az_Elev_Correction[0]:
-        Elev_Labels.append(Item[0])
-    #      Elev_Labels.insert(0,Item[0])
-
-    for Az in sorted(Az_Elev_Correction):
-        if Az != NO_AZ:
-            values = []
-            #       pprint (Az_Elev_Correction[Az],stream=sys.stderr)
-            for index, item in enumerate(Az_Elev_Correction[Az]):
-                #          values.append(Item[1])
-                values.insert(0, item[1] - Az_Elev_Correction[NO_AZ][index][1])
-
-            plt.plot(Elev_Labels, values, label=Band + "-" + str(Az))
+    for Az, values in zip(Products.Azimuths.tolist(), Products.Delta):
+        plt.plot(Products.Zeniths, values[::-1], label=Band + "-" + str(Az))
     filename = safe_filename(antennaName) + "." + Band + ".AZ-Difference.png"
-    try:
-        plt.savefig(filename, format="png")
-    except:
-        filename = "ERROR"
+    filename = save_plot(antennaName, filename)
 
     plt.close()
 
     return filename
 
 
-def create_plot_radial(antennaName, Band, Az_Elev_Correction):
-
-    Az_Labels = []
-    for Az in sorted(Az_Elev_Correction):
-        if Az != NO_AZ:
-            Az_Labels.append(Az)
-
-    Elev_Labels = []
-    for Item in Az_Elev_Correction[0]:
-        Elev_Labels.append(Item[0])
-
-    Max_Correction = 0
-    Bias_values = []
-    for Az in sorted(Az_Elev_Correction):
-        if Az != NO_AZ:
-            for Item in Az_Elev_Correction[Az]:
-                Bias_values.append(Item[1])
-                #          Bias_values.insert(0,Item[1])
-
-                if abs(Item[1]) > Max_Correction:
-                    Max_Correction = abs(Item[1])
-
-    yplot_range = list(range(-30, 31, 1))
-
-    if Max_Correction <= 5.0:
-        yplot_range = list(range(-5, 6, 1))
-    elif Max_Correction <= 10.0:
-        yplot_range = list(range(-10, 11, 1))
-    elif Max_Correction <= 15.0:
-        yplot_range = list(range(-15, 16, 1))
-    elif Max_Correction <= 20.0:
-        yplot_range = list(range(-20, 21, 1))
-
-    #   pprint(Bias_values)
-    #   pprint(Az_Labels)
-    #   pprint(Elev_Labels)
-    #   pprint(yplot_range)
+@Plot_Registry.register("polar", "band", "Radial {}", "Radial", "Bias")
+def create_plot_radial(antennaName, Band, Products):
 
     plot_polar_contour(
         "Antenna Phase Biases: " + antennaName + " " + Band,
-        Bias_values,
-        Az_Labels,
-        Elev_Labels,
-        yplot_range,
+        Products.Values,
+        Products.Azimuths,
+        Products.Zeniths,
+        Products.Levels,
     )
 
     filename = safe_filename(antennaName) + "." + Band + ".POLAR.png"
-    try:
-        plt.savefig(filename, format="png")
-    except:
-        filename = "ERROR"
+    filename = save_plot(antennaName, filename)
     plt.close("all")
 
     return filename
 
 
-def create_plot_delta_radial(antennaName, Band, Az_Elev_Correction):
-
-    Az_Labels = []
-    for Az in sorted(Az_Elev_Correction):
-        if Az != NO_AZ:
-            Az_Labels.append(Az)
-
-    Elev_Labels = []
-    for Item in Az_Elev_Correction[0]:
-        Elev_Labels.append(Item[0])
-
-    Bias_values = []
-    for Az in sorted(Az_Elev_Correction):
-        if Az != NO_AZ:
-            for index, item in enumerate(Az_Elev_Correction[Az]):
-
-                Bias_values.append(item[1] - Az_Elev_Correction[NO_AZ][index][1])
-
-    yplot_range = list(range(-5, 6, 1))
+@Plot_Registry.register("polar-delta", "band", "Radial {}", "Radial", "Delta")
+def create_plot_delta_radial(antennaName, Band, Products):
 
     plot_polar_contour(
         "Delta Antenna Phase Biases: " + antennaName + " " + Band,
-        Bias_values,
-        Az_Labels,
-        Elev_Labels,
-        yplot_range,
+        Products.Delta,
+        Products.Azimuths,
+        Products.Zeniths,
+        Products.DELTA_LEVELS,
     )
 
     filename = safe_filename(antennaName) + "." + Band + ".POLAR-Difference.png"
-    try:
-        plt.savefig(filename, format="png")
-    except:
-        filename = "ERROR"
+    filename = save_plot(antennaName, filename)
     plt.close("all")
 
     return filename
@@ -942,15 +1061,50 @@ def dump_NEE_Offsets(Az_html_file, offsets):
 #  Az_html_file.write('</div>')
 
 
-def Az_Link(Antenna, Az_filename, System):
+INDEX_SYSTEMS = [GPS, GLONASS, GALILEO, COMPASS, QZSS, SBAS, IRNSS]
+
+
+def Az_Link(entry, System):
     SystemName = SYSTEM_NAMES[System]
-    if System in Antenna.APC_Offsets:  # pylint: disable=R1705
-        return f'<a target="_blank" href="{Az_filename}#{SystemName}">Azimuth</a>'
+    if SystemName in entry["Systems"]:  # pylint: disable=R1705
+        return f'<a target="_blank" href="{entry["Link"]}#{SystemName}">Azimuth</a>'
     else:
         return ""
 
 
-def output_antenna_details(Antenna):
+def antenna_index_entry(Antenna, Az_link):
+    """Return the index data for an antenna whose page is at Az_link."""
+    return {
+        "Type": Antenna.Type,
+        "Link": Az_link,
+        "Bands": len(Antenna.APC_Offsets[GPS]),
+        "Freqs": Antenna.Num_Freqs,
+        "Antennas": Antenna.GPS_Antennas,
+        "Systems": [SYSTEM_NAMES[System] for System in INDEX_SYSTEMS if System in Antenna.APC_Offsets],
+        # GPS L1 NOAZI from 0 to 90 degrees elevation, for the sparklines
+        "Mean": [Item[1] for Item in reversed(Antenna.APC_Offsets[GPS].get(L1, {}).get(NO_AZ, []))],
+    }
+
+
+def output_index_row(output, entry, Sparklines=False):
+    HTML_Unit.output_table_row(
+        output,
+        [
+            f'<a target="_blank" href="{entry["Link"]}">{entry["Type"]}</a>',
+            entry["Bands"],
+            entry["Freqs"],
+            entry["Antennas"],
+        ]
+        + [Az_Link(entry, System) for System in INDEX_SYSTEMS]
+        + ([sparkline_svg(entry["Mean"])] if Sparklines else []),
+    )
+
+
+def output_antenna_details(Antenna, index=None):
+    """Write the antenna page and its plots, and add the antenna to index (an HTMLIndex of stdout)."""
+    if index is None:
+        index = HTMLIndex(sys.stdout)
+
     if not Antenna.Type in SV_Types:
         #        print ("Type: {} Serial: {} Bands: {} Freqs: {} GPS Antennas: {} GLONASS Antennas: {}".
         #    format(Type,Serial,len(APC_Offsets[SV_System]),Num_Freqs,GPS_Antennas,GLO_Antennas))
@@ -962,7 +1116,7 @@ def output_antenna_details(Antenna):
         Az_html_file = None
         Az_filename = safe_filename(Antenna.Type) + ".html"
         #        print(Az_filename)
-        Az_html_file = open(Az_filename, "w",encoding="utf-8") # pylint: disable=R1732
+        Az_html_file = Output_Layout.open_text(Antenna.Type, Az_filename)
         #        pprint(Az_html_file)
         HTML_Unit.output_html_header(
             Az_html_file, "Antenna information for " + Antenna.Type
@@ -973,92 +1127,79 @@ def output_antenna_details(Antenna):
         dump_NEE_Offsets(Az_html_file, Antenna.NEE_Offsets)
         Az_html_file.write("\n")
 
-        HTML_Unit.output_table_row(
-            sys.stdout,
-            [
-                f'<a target="_blank" href="{Az_filename}">{Antenna.Type}</a>',
-                len(Antenna.APC_Offsets[GPS]),
-                Antenna.Num_Freqs,
-                Antenna.GPS_Antennas,
-                Az_Link(Antenna, Az_filename, GPS),
-                Az_Link(Antenna, Az_filename, GLONASS),
-                Az_Link(Antenna, Az_filename, GALILEO),
-                Az_Link(Antenna, Az_filename, COMPASS),
-                Az_Link(Antenna, Az_filename, QZSS),
-                Az_Link(Antenna, Az_filename, SBAS),
-                Az_Link(Antenna, Az_filename, IRNSS),
-            ],
-        )
+        index.add(antenna_index_entry(Antenna, Output_Layout.link(Antenna.Type, Az_filename)))
 
-        Az_html_file.write("<h1>Means</h1>\n")
+        if Plot_Registry.selected("system"):
+            Az_html_file.write("<h1>Means</h1>\n")
 
         if GPS in Antenna.APC_Offsets:
-            Antenna.plot_SV_System_means(
-                Az_html_file, GPS, [L1, L2, L5], ["L1", "L2", "L5"]
+            plot_SV_System_means(
+                Antenna, Az_html_file, GPS, [L1, L2, L5], ["L1", "L2", "L5"]
             )
 
         if GLONASS in Antenna.APC_Offsets:
-            Antenna.plot_SV_System_means(Az_html_file, GLONASS, [L1, L2], ["L1", "L2"])
+            plot_SV_System_means(Antenna, Az_html_file, GLONASS, [L1, L2], ["L1", "L2"])
 
         if GALILEO in Antenna.APC_Offsets:
-            Antenna.plot_SV_System_means(
-                Az_html_file,
+            plot_SV_System_means(
+                Antenna, Az_html_file,
                 GALILEO,
                 [E1, E5a, E5b, E5, E6],
                 ["E1", "E5a", "E5b", "E5", "E6"],
             )
 
         if COMPASS in Antenna.APC_Offsets:
-            Antenna.plot_SV_System_means(
-                Az_html_file, COMPASS, [E1, E2, E5b, E6], ["E1", "E2", "E5b", "E6"]
+            plot_SV_System_means(
+                Antenna, Az_html_file, COMPASS, [E1, E2, E5b, E6], ["E1", "E2", "E5b", "E6"]
             )
 
         if QZSS in Antenna.APC_Offsets:
-            Antenna.plot_SV_System_means(
-                Az_html_file, QZSS, [L1, L2, L5], ["L1", "L2", "L5"]
+            plot_SV_System_means(
+                Antenna, Az_html_file, QZSS, [L1, L2, L5], ["L1", "L2", "L5"]
             )
 
         if SBAS in Antenna.APC_Offsets:
-            Antenna.plot_SV_System_means(Az_html_file, SBAS, [L1, L5], ["L1", "L5"])
+            plot_SV_System_means(Antenna, Az_html_file, SBAS, [L1, L5], ["L1", "L5"])
 
         if IRNSS in Antenna.APC_Offsets:
-            Antenna.plot_SV_System_means(Az_html_file, IRNSS, [L5], ["L5"])
+            plot_SV_System_means(Antenna, Az_html_file, IRNSS, [L5], ["L5"])
 
-        Az_html_file.write("<h1>Azimuths</h1>\n")
+        if Plot_Registry.selected("band"):
+            Az_html_file.write("<h1>Azimuths</h1>\n")
 
         if GPS in Antenna.APC_Offsets:
-            Antenna.plot_SV_System_Azimuth(
-                Az_html_file, GPS, [L1, L2, L5], ["L1", "L2", "L5"]
+            plot_SV_System_Azimuth(
+                Antenna, Az_html_file, GPS, [L1, L2, L5], ["L1", "L2", "L5"]
             )
 
         if GLONASS in Antenna.APC_Offsets:
-            Antenna.plot_SV_System_Azimuth(
-                Az_html_file, GLONASS, [L1, L2], ["L1", "L2"]
+            plot_SV_System_Azimuth(
+                Antenna, Az_html_file, GLONASS, [L1, L2], ["L1", "L2"]
             )
 
         if GALILEO in Antenna.APC_Offsets:
-            Antenna.plot_SV_System_Azimuth(
-                Az_html_file,
+            plot_SV_System_Azimuth(
+                Antenna, Az_html_file,
                 GALILEO,
                 [E1, E5a, E5b, E5, E6],
                 ["E1", "E5a", "E5b", "E5", "E6"],
             )
 
         if COMPASS in Antenna.APC_Offsets:
-            Antenna.plot_SV_System_Azimuth(
-                Az_html_file, COMPASS, [E1, E2, E5b, E6], ["E1", "E2", "E5b", "E6"]
+            plot_SV_System_Azimuth(
+                Antenna, Az_html_file, COMPASS, [E1, E2, E5b, E6], ["E1", "E2", "E5b", "E6"]
             )
 
         if QZSS in Antenna.APC_Offsets:
-            Antenna.plot_SV_System_Azimuth(
-                Az_html_file, QZSS, [L1, L2, L5], ["L1", "L2", "L5"]
+            plot_SV_System_Azimuth(
+                Antenna, Az_html_file, QZSS, [L1, L2, L5], ["L1", "L2", "L5"]
             )
 
         if SBAS in Antenna.APC_Offsets:
-            Antenna.plot_SV_System_Azimuth(Az_html_file, SBAS, [L1, L5], ["L1", "L5"])
+            plot_SV_System_Azimuth(Antenna, Az_html_file, SBAS, [L1, L5], ["L1", "L5"])
 
         if IRNSS in Antenna.APC_Offsets:
-            Antenna.plot_SV_System_Azimuth(Az_html_file, IRNSS, [L5], ["L5"])
+            plot_SV_System_Azimuth(Antenna, Az_html_file, IRNSS, [L5], ["L5"])
 
         # Really need to split this one up, it is super ugly
 
@@ -1067,346 +1208,533 @@ def output_antenna_details(Antenna):
         #                 GPS_Offsets_Txt,GPS_L1_Offsets_Txt,GPS_L2_Offsets_Txt,
         #                 GLO_Offsets_Txt,GLO_L1_Offsets_Txt,GLO_L2_Offsets_Txt])
 
-        if Az_html_file is None:
+        if Az_html_file is not None:
             HTML_Unit.output_html_footer(Az_html_file, [])
 
-            Az_html_file.close()
+            Output_Layout.close_text(Antenna.Type, Az_filename, Az_html_file)
             Az_html_file = None
+            Run_Progress.Antennas_Rendered += 1
 
     return None
 
 
-class GNSSAntenna:
-    def __init__(self):
-        self.NEE_Offsets = {}
-        self.APC_Offsets = {}
-        self.GPS_Antennas = None
-        self.GLO_Antennas = None
-        self.GAL_Antennas = None
-        self.BDS_Antennas = None
-        self.SBAS_Antennas = None
-        self.QZSS_Antennas = None
-        self.Type = None
-        self.Serial = None
-        self.DAZI = None
-        self.ZEN1 = None
-        self.ZEN2 = None
-        self.DZEN = None
-        self.Num_Freqs = None
-        self.Sinex_Code = None
-        self.SV_System = None
-        self.Freq_Number = None
-        self.North = None
-        self.East = None
-        self.Up = None
-
-    def process_NEU(self, line):
-        North = float(line[0:10])
-        East = float(line[10:20])
-        Up = float(line[20:30])
-        if not self.SV_System in self.NEE_Offsets:
-            self.NEE_Offsets[self.SV_System] = {}
-            self.APC_Offsets[self.SV_System] = {}
-        self.NEE_Offsets[self.SV_System][self.Freq_Number] = (North, East, Up)
-        self.APC_Offsets[self.SV_System][self.Freq_Number] = {}
-
-    def process_comment(self, line):
-        #      print "COMMENT"
-        if line.find(GPS_Cal_Antennas) == 0:
-            #        print "GPS"
-            self.GPS_Antennas = int(line[GPS_Cal_Antennas_Length:60], base=10)
-        #        print GPS_Antennas
-        elif line.find(GPS_Generic_Cal_Antennas) == 0:
-            #        print "GPS Generic"
-            self.GPS_Antennas = int(line[GPS_Generic_Cal_Antennas_Length:60], base=10)
-        #        print GPS_Antennas
-        elif line.find(GLO_Cal_Antennas) == 0:
-            #        print "GLONASS"
-            self.GLO_Antennas = int(line[GLO_Cal_Antennas_Length:60], base=10)
-        #        print GLO_Antennas
-        elif line.find("# Number of Individual GLO-Calibrations:") == 0:
-            if self.GLO_Antennas is None:
-                self.GLO_Antennas = self.GPS_Antennas
-                # Handle the antennas with a generic antenna total comment and GLONASS
-
-    #      print line
-
-    def process_type_serial(self, line):
-        self.Type = line[0:20].rstrip()
-        self.Serial = line[20:60].rstrip()
-
-    #        print Type,Serial
-
-    def process_freq(self, line):
-        SV_System_Char = line[3:4]
-        if SV_System_Char == "G":
-            self.SV_System = GPS
-        elif SV_System_Char == "R":
-            self.SV_System = GLONASS
-        elif SV_System_Char == "E":
-            self.SV_System = GALILEO
-        elif SV_System_Char == "C":
-            self.SV_System = COMPASS
-        elif SV_System_Char == "J":
-            self.SV_System = QZSS
-        elif SV_System_Char == "S":
-            self.SV_System = SBAS
-        elif SV_System_Char == "I":
-            self.SV_System = IRNSS
-        else:
-            raise Exception("Uknown SV_System_Char" + line)
-        self.Freq_Number = int(line[4:6])
+def plot_SV_System_means(Antenna, Az_file, System, bands, bands_names):
 
-    def process_offsets(self, line):
-        Az = line[0:8]
-        if Az == "   NOAZI":
-            Az = NO_AZ
-        else:
-            Az = float(Az)
+    Offsets = []
+    if System in Antenna.APC_Offsets and Plot_Registry.selected("system"):
+        band_number = 0
+        bands_included = []
+        for band in bands:
+            if band in Antenna.APC_Offsets[System]:
+                Offsets.append(Antenna.APC_Offsets[System][band][NO_AZ])
+                bands_included.append(bands_names[band_number])
+#                    band_name = bands_names[band_number]
+                band_number += 1
 
-        line = line[8:]
+        Az_file.write("<H3>{}</H3>\n".format(SYSTEM_NAMES[System]))
+        for kind in Plot_Registry.selected("system"):
+            plot_name = kind.Render(Antenna.Type, System, Offsets, bands_names)
+            Run_Progress.plot(kind.Name, plot_name)
+            Az_file.write(img_tag(plot_name, SYSTEM_NAMES[System] + " Means") + "\n")
 
-        zen = self.ZEN1
 
-        Offsets = []
+def band_plot(kind, Antenna, bandName, System, band):
+    """Return the img tag of the kind of plot for one band, nothing for an empty cell of the layout."""
+    if kind is None:
+        return ""
+    src = kind.Render(Antenna.Type, bandName, Antenna.band_products(System, band))
+    Run_Progress.plot(kind.Name, src)
+    return img_tag(src, kind.Alt.format(bandName))
+
+
+def plot_SV_System_Azimuth(Antenna, Az_html_file, System, bands, bands_names):  # pylint: disable=R0914
+    kinds = Plot_Registry.selected("band")
+    if System in Antenna.APC_Offsets and kinds:
+        band_number = 0
+        systemName = SYSTEM_NAMES[System]
+        columns = unique(kind.Column for kind in kinds)
+        rows = unique(kind.Row for kind in kinds)
+        cells = {(kind.Row, kind.Column): kind for kind in kinds}
+        Az_html_file.write("<p/>\n")
+        Az_html_file.write("<p/>\n")
+        HTML_Unit.output_table_header(
+            Az_html_file,
+            systemName,
+            f"<h2>{systemName}</h2><br/>\n",
+            columns,
+        )
 
-        while zen <= self.ZEN2:
-            # Yes if someone really did models at 0.1 resolution we would break but since they are all 5 degrees at the moment we don't care.
-            offset = float(line[0:8])
-            line = line[8:]
-            Offsets.append([zen, offset])
-            zen += self.DZEN
+        for band in bands:
+            if band in Antenna.APC_Offsets[System]:
+                if len(Antenna.APC_Offsets[System][band]) == 1:
+                    continue
 
-        self.APC_Offsets[self.SV_System][self.Freq_Number][Az] = Offsets
+                band_name = bands_names[band_number]
+                band_number += 1
 
-    def plot_SV_System_means(self, Az_file, System, bands, bands_names):
+                Az_html_file.write(
+                    f'<tr><td colspan="{len(columns)}" style="text-align: center;"><h3>{systemName}-{band_name}</h3></td></tr>\n'
+                )
+                Az_html_file.write("<tr>")
+
+                for row_number, row in enumerate(rows):
+                    if row_number:
+                        Az_html_file.write("</tr><tr>")
+                        Az_html_file.write("\n")
+                    for column in columns:
+                        Az_html_file.write(
+                            "<td>{}</td>".format(
+                                band_plot(cells.get((row, column)), Antenna, f"{systemName}-{band_name}", System, band)
+                            )
+                        )
+                Az_html_file.write("</tr>\n")
 
-        Offsets = []
-        if System in self.APC_Offsets:
-            band_number = 0
-            bands_included = []
-            for band in bands:
-                if band in self.APC_Offsets[System]:
-                    Offsets.append(self.APC_Offsets[System][band][NO_AZ])
-                    bands_included.append(bands_names[band_number])
-#                    band_name = bands_names[band_number]
-                    band_number += 1
+        HTML_Unit.output_table_footer(Az_html_file)
 
-            plot_name = create_mean_plot(self.Type, System, Offsets, bands_names)
-            Az_file.write("<H3>{}</H3>\n".format(SYSTEM_NAMES[System]))
-            Az_file.write(
-                '<img src="{}" alt={}>\n'.format(plot_name, plot_name) # pylint: disable=W1308
-            )
 
-    def plot_SV_System_Azimuth(self, Az_html_file, System, bands, bands_names):
-#        Offsets = []
-        #        print(f"Type: {System}")
-
-        if System in self.APC_Offsets:
-            band_number = 0
-            systemName = SYSTEM_NAMES[System]
-            bands_included = []
-            Az_html_file.write("<p/>\n")
-            Az_html_file.write("<p/>\n")
-            HTML_Unit.output_table_header(
-                Az_html_file,
-                systemName,
-                f"<h2>{systemName}</h2><br/>\n",
-                ["Bias", "Delta"],
+INDEX_COLUMNS = [
+    "Type",
+    "Bands",
+    "Freqs",
+    "#Antennas",
+    "GPS",
+    "GLO",
+    "GAL",
+    "BDS",
+    "QZSS",
+    "SBAS",
+    "IRNSS",
+]
+
+SPARKLINE_COLUMN = "GPS L1 Mean"
+
+
+def output_index_header(output, Sparklines=False):
+    HTML_Unit.output_html_header(output, "Antenna information")
+    HTML_Unit.output_html_body(output)
+    output.write("<br/>Created: {}".format(Output_Layout.created()))
+    HTML_Unit.output_table_header(
+        output,
+        "Antenna_Information",
+        "Antenna Information",
+        INDEX_COLUMNS + ([SPARKLINE_COLUMN] if Sparklines else []),
+    )
+    #       HTML_Unit.output_table_row(sys.stdout,[defect,defects_Desc[defect],Versions_Str])
+
+
+def output_index_footer(output):
+    HTML_Unit.output_table_footer(output)
+    HTML_Unit.output_html_footer(output, ["Antenna_Information"])
+
+
+class HTMLIndex:
+    """The index as one HTML table, with a row per antenna and optionally a sparkline of the GPS L1 mean."""
+
+    def __init__(self, output, Sparklines=False):
+        self.Output = output
+        self.Sparklines = Sparklines
+
+    def header(self):
+        output_index_header(self.Output, self.Sparklines)
+
+    def add(self, entry):
+        output_index_row(self.Output, entry, self.Sparklines)
+
+    def footer(self):
+        output_index_footer(self.Output)
+
+
+FEED_INDEX_SCRIPT = """
+<div>
+Search: <input id="Antenna_Search" type="search">
+<button id="Antenna_Previous">Previous</button>
+<span id="Antenna_Page"></span>
+<button id="Antenna_Next">Next</button>
+</div>
+<table id="Antenna_Information"><thead><tr>{headers}</tr></thead><tbody></tbody></table>
+<script>
+(function () {{
+  const FEED = "{feed}";
+  const PAGE_SIZE = {page_size};
+  const SYSTEMS = {systems};
+  const SPARKLINES = {sparklines};
+  const entries = [];
+  let matches = [];
+  let page = 0;
+  let filter = "";
+  let complete = false;
+
+  function cell(row, html) {{
+    const td = document.createElement("td");
+    td.innerHTML = html;
+    row.appendChild(td);
+  }}
+
+  function link(href, text) {{
+    const a = document.createElement("a");
+    a.target = "_blank";
+    a.href = href;
+    a.textContent = text;
+    return a.outerHTML;
+  }}
+
+  function sparkline(values) {{
+    if (values.length < 2) return "";
+    const low = Math.min(...values);
+    const high = Math.max(...values);
+    const scale = high > low ? 18 / (high - low) : 0;
+    const points = values.map(function (value, index) {{
+      return (index * 90 / (values.length - 1)).toFixed(1) + "," + (19 - (value - low) * scale).toFixed(1);
+    }});
+    return '<svg width="90" height="20" viewBox="0 0 90 20"><polyline fill="none" stroke="currentColor" points="' +
+      points.join(" ") + '"/></svg>';
+  }}
+
+  function render() {{
+    const pages = Math.max(1, Math.ceil(matches.length / PAGE_SIZE));
+    page = Math.min(page, pages - 1);
+    const body = document.querySelector("#Antenna_Information tbody");
+    body.replaceChildren();
+    for (const entry of matches.slice(page * PAGE_SIZE, (page + 1) * PAGE_SIZE)) {{
+      const row = document.createElement("tr");
+      cell(row, link(entry.Link, entry.Type));
+      cell(row, entry.Bands);
+      cell(row, entry.Freqs);
+      cell(row, entry.Antennas === null ? "None" : entry.Antennas);
+      for (const system of SYSTEMS) {{
+        cell(row, entry.Systems.includes(system) ? link(entry.Link + "#" + system, "Azimuth") : "");
+      }}
+      if (SPARKLINES) cell(row, sparkline(entry.Mean));
+      body.appendChild(row);
+    }}
+    document.getElementById("Antenna_Page").textContent =
+      "Page " + (page + 1) + " of " + pages + " (" + matches.length + (complete ? "" : "+") + " antennas)";
+  }}
+
+  function matching(entry) {{
+    return entry.Type.toLowerCase().includes(filter);
+  }}
+
+  function add(lines) {{
+    for (const line of lines) {{
+      if (line.trim() === "") continue;
+      const entry = JSON.parse(line);
+      entries.push(entry);
+      if (matching(entry)) matches.push(entry);
+    }}
+  }}
+
+  document.getElementById("Antenna_Search").addEventListener("input", function (event) {{
+    filter = event.target.value.toLowerCase();
+    matches = entries.filter(matching);
+    page = 0;
+    render();
+  }});
+  document.getElementById("Antenna_Previous").addEventListener("click", function () {{
+    page = Math.max(0, page - 1);
+    render();
+  }});
+  document.getElementById("Antenna_Next").addEventListener("click", function () {{
+    page += 1;
+    render();
+  }});
+
+  fetch(FEED).then(async function (response) {{
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let pending = "";
+    for (;;) {{
+      const {{done, value}} = await reader.read();
+      if (done) break;
+      pending += decoder.decode(value, {{stream: true}});
+      const lines = pending.split("\\n");
+      pending = lines.pop();
+      add(lines);
+      render();
+    }}
+    add([pending]);
+    complete = true;
+    render();
+  }});
+}})();
+</script>
+"""
+
+
+class FeedIndex:
+    """The index as an NDJSON feed of the antennas plus a page that loads, searches and pages through it.
+
+    The page has a constant size however many antennas there are. The feed is written to Feed_Filename in
+    the output directory and the page links to it relative to the output directory. The GPS L1 means are only
+    included in the feed when the page draws Sparklines.
+    """
+
+    PAGE_SIZE = 100
+
+    def __init__(self, output, Feed_Filename="antennas.ndjson", Sparklines=False):
+        self.Output = output
+        self.Feed_Filename = Feed_Filename
+        self.Sparklines = Sparklines
+        self.Feed = None
+
+    def header(self):
+        self.Feed = Output_Layout.open_text("", self.Feed_Filename)
+
+        HTML_Unit.output_html_header(self.Output, "Antenna information")
+        HTML_Unit.output_html_body(self.Output)
+        self.Output.write("<br/>Created: {}".format(Output_Layout.created()))
+        self.Output.write(
+            FEED_INDEX_SCRIPT.format(
+                feed=self.Feed_Filename,
+                page_size=self.PAGE_SIZE,
+                systems=json.dumps([SYSTEM_NAMES[System] for System in INDEX_SYSTEMS]),
+                sparklines=json.dumps(self.Sparklines),
+                headers="".join(
+                    "<th>{}</th>".format(column)
+                    for column in INDEX_COLUMNS + ([SPARKLINE_COLUMN] if self.Sparklines else [])
+                ),
             )
+        )
 
-            for band in bands:
-                #                pprint(self.APC_Offsets)
-                #                pprint(self.APC_Offsets[0])
-                #                pprint(System)
-                #                pprint(self.APC_Offsets[System])
-
-                if band in self.APC_Offsets[System]:
-                    if len(self.APC_Offsets[System][band]) == 1:
-                        continue
-
-                    bands_included.append(bands_names[band_number])
-                    band_name = bands_names[band_number]
-                    band_number += 1
-
-                    Az_html_file.write(
-                        f'<tr><td colspan="2" style="text-align: center;"><h3>{systemName}-{band_name}</h3></td></tr>\n'
-                    )
-                    Az_html_file.write("<tr>")
-
-                    #          pprint(APC_Offsets[GPS][L1])
-                    Az_html_file.write(
-                        '<td><img src="{}" alt="{}"></td>'.format(
-                            create_az_plot(
-                                self.Type,
-                                f"{systemName}-{band_name}",
-                                self.APC_Offsets[System][band],
-                            ),
-                            f"{systemName}-{band_name}",
-                        )
-                    )
-
-                    Az_html_file.write(
-                        '<td><img src="{}" alt="{}"></td>'.format(
-                            create_az_delta_plot(
-                                self.Type,
-                                f"{systemName}-{band_name}",
-                                self.APC_Offsets[System][band],
-                            ),
-                            f"{systemName}-{band_name}",
-                        )
-                    )
-
-                    Az_html_file.write("</tr><tr>")
-
-                    Az_html_file.write("\n")
-                    Az_html_file.write(
-                        '<td><img src="{}" alt="{}"></td>'.format(
-                            create_plot_radial(
-                                self.Type,
-                                f"{systemName}-{band_name}",
-                                self.APC_Offsets[System][band],
-                            ),
-                            f"Radial {systemName}-{band_name}",
-                        )
-                    )
-
-                    Az_html_file.write(
-                        '<td><img src="{}" alt="{}"></td>'.format(
-                            create_plot_delta_radial(
-                                self.Type,
-                                f"{systemName}-{band_name}",
-                                self.APC_Offsets[System][band],
-                            ),
-                            f"Radial {systemName}-{band_name}",
-                        )
-                    )
-                    Az_html_file.write("</tr>\n")
+    def add(self, entry):
+        if not self.Sparklines:
+            entry = {key: value for key, value in entry.items() if key != "Mean"}
+        self.Feed.write(json.dumps(entry, separators=(",", ":")))
+        self.Feed.write("\n")
 
-            HTML_Unit.output_table_footer(Az_html_file)
+    def footer(self):
+        Output_Layout.close_text("", self.Feed_Filename, self.Feed)
+        self.Feed = None
+        HTML_Unit.output_html_footer(self.Output, [])
 
 
-#           plot_name=create_mean_plot (Type,"GPS",Offsets,["L1","L2","L5"])
+def source_timestamp(filenames):
+    """Return the time a deterministic run shows as its creation time.
 
+    This is SOURCE_DATE_EPOCH when it is set, as for reproducible builds, otherwise the time the newest input
+    file was modified. None when neither is known, as for standard input.
+    """
+    if os.environ.get("SOURCE_DATE_EPOCH"):
+        return datetime.fromtimestamp(int(os.environ["SOURCE_DATE_EPOCH"]), UTC)
+    if not filenames or "-" in filenames:
+        return None
+    return datetime.fromtimestamp(int(max(os.path.getmtime(filename) for filename in filenames)), UTC)
 
-def main():
 
-    In_Antenna = False
-    In_APC_Offsets = False
-    Antenna = None
-#    DAZI = None
+def output_antenna_ndjson(Antenna, output):
+    """Write the antenna's header fields, offsets and grids as one line of JSON, flushed so it can be read at once."""
+    record = Antenna.metadata()
+    record["Grids"] = Antenna.grids()
+    output.write(json.dumps(record, separators=(",", ":")))
+    output.write("\n")
+    output.flush()
 
-    HTML_Unit.output_html_header(sys.stdout, "Antenna information")
-    HTML_Unit.output_html_body(sys.stdout)
-    sys.stdout.write("<br/>Created: {}".format(datetime.now(UTC)))
-    HTML_Unit.output_table_header(
-        sys.stdout,
-        "Antenna_Information",
-        "Antenna Information",
-        [
-            "Type",
-            "Bands",
-            "Freqs",
-            "#Antennas",
-            "GPS",
-            "GLO",
-            "GAL",
-            "BDS",
-            "QZSS",
-            "SBAS",
-            "IRNSS",
-        ],
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create antenna information pages and plots from ANTEX files. The index is written to stdout."
     )
-    #       HTML_Unit.output_table_row(sys.stdout,[defect,defects_Desc[defect],Versions_Str])
+    parser.add_argument("files", nargs="*", help="ANTEX files, standard input if none are given")
+    parser.add_argument(
+        "--format",
+        choices=["html", "ndjson"],
+        default="html",
+        help="html: the pages, plots and index. ndjson: only write each antenna to stdout as a line of JSON as soon "
+        "as it is read (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        default=".",
+        help="Directory for the pages and plots, the index links are relative to it (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--layout",
+        choices=["flat", "type", "hash"],
+        default="flat",
+        help="flat: all files in the output directory, type: a directory per antenna type, "
+        "hash: a 256 way fan-out on the antenna type (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="Remove files listed in the previous manifest that were not written by this run",
+    )
+    parser.add_argument(
+        "--inline-images",
+        choices=["png", "svg"],
+        help="Embed the plots in the antenna pages as data URIs instead of writing image files",
+    )
+    parser.add_argument("--memory-log", metavar="FILE", help="Write a CSV time series of memory use to FILE")
+    parser.add_argument(
+        "--memory-every",
+        type=int,
+        default=100,
+        metavar="N",
+        help="Sample memory use every N antennas (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--memory-ceiling",
+        type=float,
+        metavar="MB",
+        help="Close all figures and collect garbage whenever RSS is above MB at a sample",
+    )
+    parser.add_argument(
+        "--memory-top",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Also log the top N tracemalloc allocators, this slows the run down considerably",
+    )
+    parser.add_argument(
+        "--index-feed",
+        action="store_true",
+        help="Write the index data to antennas.ndjson in the output directory and make the index a page that "
+        "searches and pages through it",
+    )
+    parser.add_argument(
+        "--thumbnails",
+        action="store_true",
+        help="Also write a thumbnail of each plot and show the thumbnails in the pages, linked to the plots",
+    )
+    parser.add_argument("--sparklines", action="store_true", help="Add a GPS L1 mean sparkline column to the index")
+    parser.add_argument(
+        "--plots",
+        help="Comma separated plot kinds to draw, from {} (default: all)".format(",".join(Plot_Registry.Kinds)),
+    )
+    parser.add_argument(
+        "--checkpoint",
+        metavar="FILE",
+        help="Record the run's position and completed antennas in FILE, so an interrupted run can be resumed",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=50,
+        metavar="N",
+        help="Write the checkpoint every N antennas (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Carry on from the checkpoint after its last completed antenna, rather than starting again",
+    )
+    parser.add_argument(
+        "--skip-bad-blocks",
+        action="store_true",
+        help="Report and skip antenna blocks that cannot be parsed, carrying on at the next START OF ANTENNA",
+    )
+    parser.add_argument(
+        "--deterministic",
+        action="store_true",
+        help="Make the output depend only on the input: plots without run specific metadata, the index created "
+        "time from SOURCE_DATE_EPOCH or the input files, and files left untouched when their bytes are unchanged",
+    )
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="Report antennas parsed and rendered, plots per second and the ETA on stderr",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        metavar="FILE",
+        help="Keep the run's counters in FILE in the Prometheus text format, for the node exporter textfile collector",
+    )
+    parser.add_argument(
+        "--report-every",
+        type=float,
+        default=10.0,
+        metavar="SECONDS",
+        help="Seconds between progress reports and metrics file updates (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="Only check the files are well formed, listing every problem found, and exit non zero if there are any",
+    )
+    args = parser.parse_args()
+    if args.memory_every < 1:
+        parser.error("--memory-every must be at least 1")
+
+    if args.validate:
+        sys.exit(1 if validate_files(args.files) else 0)
+
+    if args.resume and not args.checkpoint:
+        parser.error("--resume needs --checkpoint")
+    if (args.checkpoint or args.skip_bad_blocks) and (not args.files or "-" in args.files):
+        parser.error("--checkpoint and --skip-bad-blocks need ANTEX files, not standard input")
+
+    if args.format == "ndjson":
+        try:
+            for Antenna in read_antennas(fileinput.input(files=args.files)):
+                output_antenna_ndjson(Antenna, sys.stdout)
+        except BrokenPipeError:
+            # The consumer stopped reading, as head does. Stop Python reporting it again when stdout is closed
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            sys.exit(1)
+        return
+
+    Timestamp = None
+    if args.deterministic:
+        Timestamp = source_timestamp(args.files)
+        if Timestamp is None:
+            parser.error("--deterministic needs SOURCE_DATE_EPOCH set when reading standard input")
+    Output_Layout.configure(
+        args.output_dir, args.layout, args.inline_images, args.thumbnails, args.deterministic, Timestamp
+    )
+    try:
+        Plot_Registry.select(args.plots.split(",") if args.plots else None)
+    except ValueError as e:
+        parser.error(str(e))
+
+    monitor = None
+    if args.memory_log or args.memory_ceiling:
+        monitor = MemoryMonitor(args.memory_log, args.memory_every, args.memory_ceiling, args.memory_top)
+
+    if args.index_feed:
+        index = FeedIndex(sys.stdout, Sparklines=args.sparklines)
+    else:
+        index = HTMLIndex(sys.stdout, args.sparklines)
+
+    index.header()
+
+    Run_Progress.configure(args.progress, args.metrics_file, args.report_every, input_size(args.files))
+    run = None
+    if args.checkpoint or args.skip_bad_blocks:
+        run = CheckpointedRun(args.files, args.checkpoint, args.checkpoint_every, args.skip_bad_blocks)
+        index = run.start(index, Output_Layout.Written)
+        if args.resume and run.resume():
+            sys.stderr.write("Resuming after {} completed antennas\n".format(len(run.Completed)))
+        antennas = run.antennas(Run_Progress)
+    else:
+        lines = fileinput.input(files=args.files)
+        if Run_Progress.enabled():
+            lines = Run_Progress.count_input(lines)
+        antennas = read_antennas(lines)
 
-    for line in fileinput.input():
-        line = line.rstrip()
-        #        print (line)
-        Record_Type = line[60:]
-        #        print (Record_Type,"*")
-        if Record_Type == "START OF ANTENNA":
-            #      print "Start"
-            Antenna = GNSSAntenna()
-
-            if In_Antenna:  # pylint: disable=R1720
-                raise Exception("Got start of antenna while in antenna")
-            else:
-                In_Antenna = True
-#                DAZI = None
-
-        if Record_Type == "END OF ANTENNA":
-            if In_Antenna:
-                In_Antenna = False
-                #                pprint(Antenna)
-                output_antenna_details(Antenna)
-            else:
-                raise Exception("Got end of antenna while not in antenna")
-
-        if Record_Type == "COMMENT":
-            if In_Antenna:
-                Antenna.process_comment(line)
-
-        if Record_Type == "TYPE / SERIAL NO":
-            if In_Antenna:
-                Antenna.process_type_serial(line)
-            else:
-                raise Exception("Got end of antenna while not in antenna")
-
-        if Record_Type == "DAZI":
-            #      print line
-            if In_Antenna:
-                Antenna.DAZI = float(line[2:6])
-            else:
-                raise Exception("Got DAZI while not in antenna")
-
-        if Record_Type == "ZEN1 / ZEN2 / DZEN":
-            if In_Antenna:
-                Antenna.ZEN1 = float(line[2:8])
-                Antenna.ZEN2 = float(line[8:14])
-                Antenna.DZEN = float(line[14:20])
-            else:
-                raise Exception("Got ZEN1 / ZEN2 / DZEN while not in antenna")
-
-        if Record_Type == "# OF FREQUENCIES":
-            if In_Antenna:
-                Antenna.Num_Freqs = int(line[0:6])
-            #        print Num_Freqs
-            else:
-                raise Exception("Got # OF FREQUENCIES while not in antenna")
-
-        if Record_Type == "SINEX CODE":
-            if In_Antenna:
-                Antenna.Sinex_Code = line[0:10]
-            #        print Sinex_Code
-            else:
-                raise Exception("Got SINEX CODE while not in antenna")
-
-        if Record_Type == "START OF FREQUENCY":
-            if In_Antenna:
-                Antenna.process_freq(line)
-            else:
-                raise Exception("Got START OF FREQUENCY while not in antenna")
-
-        if Record_Type == "END OF FREQUENCY":
-            if In_Antenna:
-                In_APC_Offsets = False
-            else:
-                raise Exception("Got END OF FREQUENCY while not in antenna")
-
-        # Here we may be in a antenna model set. We have to do the checking after the end of freq and before the NEU which shows the start of freqs
-
-        if In_APC_Offsets:
-            Antenna.process_offsets(line)
-
-        if Record_Type == "NORTH / EAST / UP":
-            if In_Antenna:
-                Antenna.process_NEU(line)
-                In_APC_Offsets = True
-            else:
-                raise Exception("Got NORTH / EAST / UP while not in antenna")
-
-    HTML_Unit.output_table_footer(sys.stdout)
-    HTML_Unit.output_html_footer(sys.stdout, ["Antenna_Information"])
+    Antennas = 0
+    try:
+        for Antenna in antennas:
+            Run_Progress.Antennas_Parsed += 1
+            output_antenna_details(Antenna, index)
+            Antennas += 1
+            if monitor is not None:
+                monitor.sample(Antennas)
+            Run_Progress.tick()
+    except BaseException:
+        if run is not None:
+            run.save()
+        raise
+
+    index.footer()
+    if Run_Progress.enabled():
+        Run_Progress.report()
+
+    if monitor is not None:
+        monitor.close(Antennas)
+
+    Output_Layout.write_manifest(args.prune)
+    if run is not None:
+        run.finish()
 
 
 if __name__ == "__main__":
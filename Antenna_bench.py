@@ -0,0 +1,169 @@
+#! /usr/bin/env python3
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# Modules that must load without the plotting dependencies, and Antenna_atx whose plotting is deferred
+IMPORT_MODULES = ["Antenna_model", "Antenna_eval", "Antenna_validate", "Antenna_resample", "Antenna_service", "Antenna_atx"]
+PLOTTING_PACKAGES = ["matplotlib", "JCMBSoftPyLib"]
+
+
+def import_time(module):
+    """Return the cumulative import time of module in ms and the top level packages it imported.
+
+    The module is imported in a fresh interpreter with -X importtime, so nothing is already cached. The time is
+    None if the import failed.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr.splitlines()[-1] + "\n")
+        return None, set()
+    cumulative = None
+    packages = set()
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:") :].split("|")
+        if not fields[0].strip().isdigit():
+            continue
+        name = fields[2].strip()
+        packages.add(name.split(".")[0])
+        if name == module:
+            cumulative = int(fields[1]) / 1000
+    return cumulative, packages
+
+
+def bench_imports(args):
+    """Report the import time of each module, failing if a module loads the plotting dependencies or is slow."""
+    failures = []
+    for module in IMPORT_MODULES:
+        times = []
+        for _ in range(args.repeat):
+            cumulative, packages = import_time(module)
+            times.append(cumulative)
+        if None in times:
+            failures.append("{} failed to import".format(module))
+            continue
+        best = min(times)
+        plotting = sorted(package for package in PLOTTING_PACKAGES if package in packages)
+        print("{:20} {:8.1f} ms  {}".format(module, best, "imports " + ", ".join(plotting) if plotting else "").rstrip())
+        if plotting:
+            failures.append("{} imports {}".format(module, ", ".join(plotting)))
+        if args.max_ms is not None and best > args.max_ms:
+            failures.append("{} took {:.1f} ms, over {} ms".format(module, best, args.max_ms))
+
+    for failure in failures:
+        sys.stderr.write("FAIL: {}\n".format(failure))
+    return len(failures)
+
+
+def bench_parse(args):
+    """Report how fast read_antennas parses each file, failing if it is slower than --min-mb-s.
+
+    The file is read into memory first, so only the parse is timed, not the disk.
+    """
+    from Antenna_model import read_antennas  # pylint: disable=C0415
+
+    failures = []
+    for filename in args.files:
+        with open(filename, encoding="utf-8", errors="replace") as atx:
+            lines = atx.readlines()
+        size = os.path.getsize(filename) / 1e6
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            Antennas = sum(1 for _ in read_antennas(lines))
+            times.append(time.perf_counter() - start)
+        best = min(times)
+        print(
+            "{:30} {:8.1f} MB/s {:10.0f} lines/s {:8.0f} antennas/s".format(
+                filename, size / best, len(lines) / best, Antennas / best
+            )
+        )
+        if args.min_mb_s is not None and size / best < args.min_mb_s:
+            failures.append("{} parsed at {:.1f} MB/s, under {} MB/s".format(filename, size / best, args.min_mb_s))
+
+    for failure in failures:
+        sys.stderr.write("FAIL: {}\n".format(failure))
+    return len(failures)
+
+
+def held_memory(lines, compact):
+    """Return the antennas parsed from lines and the MB they hold, traced with tracemalloc."""
+    from Antenna_model import read_antennas  # pylint: disable=C0415
+
+    tracemalloc.start()
+    try:
+        Antennas = list(read_antennas(lines, compact=compact))
+        return Antennas, tracemalloc.get_traced_memory()[0] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def round_trip_failures(filename, Parsed, Compact):
+    """Yield a failure for each band whose compact grid does not decode to exactly the grid as parsed."""
+    from Antenna_model import frequency_code  # pylint: disable=C0415
+
+    for Antenna, Compact_Antenna in zip(Parsed, Compact):
+        for System, band in ((System, band) for System, bands in Antenna.APC_Offsets.items() for band in bands):
+            arrays = zip(Antenna.band_grid(System, band), Compact_Antenna.band_grid(System, band))
+            if any(parsed.tobytes() != decoded.tobytes() for parsed, decoded in arrays):
+                yield "{} {} {} does not round trip".format(filename, Antenna.Type, frequency_code(System, band))
+
+
+def bench_memory(args):
+    """Report the memory the antennas of each file hold once parsed, as parsed and with compact grids.
+
+    Fails if a compact grid does not decode to exactly the grid as parsed.
+    """
+    failures = []
+    for filename in args.files:
+        with open(filename, encoding="utf-8", errors="replace") as atx:
+            lines = atx.readlines()
+        Parsed, parsed_mb = held_memory(lines, False)
+        Compact, compact_mb = held_memory(lines, True)
+        print("{:30} {:8.1f} MB parsed {:8.1f} MB compact  {:.1f}x".format(filename, parsed_mb, compact_mb, parsed_mb / compact_mb))
+        failures.extend(round_trip_failures(filename, Parsed, Compact))
+
+    for failure in failures:
+        sys.stderr.write("FAIL: {}\n".format(failure))
+    return len(failures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the antenna tools, exiting non zero on a failure.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("imports", help="Time importing each module with python -X importtime")
+    import_parser.add_argument("--repeat", type=int, default=3, help="Imports timed per module, the best is reported")
+    import_parser.add_argument("--max-ms", type=float, help="Fail if any module takes longer than this to import")
+
+    parse_parser = subparsers.add_parser("parse", help="Time parsing ANTEX files with read_antennas")
+    parse_parser.add_argument("files", nargs="+", help="ANTEX files to parse")
+    parse_parser.add_argument("--repeat", type=int, default=3, help="Parses timed per file, the best is reported")
+    parse_parser.add_argument("--min-mb-s", type=float, help="Fail if any file parses slower than this")
+
+    memory_parser = subparsers.add_parser("memory", help="Measure the memory of parsed antennas, as parsed and compact")
+    memory_parser.add_argument("files", nargs="+", help="ANTEX files to parse")
+    args = parser.parse_args()
+
+    if args.command == "imports":
+        sys.exit(1 if bench_imports(args) else 0)
+    if args.command == "parse":
+        sys.exit(1 if bench_parse(args) else 0)
+    if args.command == "memory":
+        sys.exit(1 if bench_memory(args) else 0)
+
+
+if __name__ == "__main__":
+    main()
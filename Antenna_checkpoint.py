@@ -0,0 +1,212 @@
+#! /usr/bin/env python3
+
+import json
+import os
+import sys
+from collections import namedtuple
+
+from Antenna_model import read_antennas
+
+Block = namedtuple("Block", ["File", "Line", "End", "Lines", "Error"])
+Block.__doc__ = """One START OF ANTENNA .. END OF ANTENNA block read by read_blocks.
+
+File is the position of the file in the run's files and Line the line number of the block's first line. End is
+the byte offset just after the block, where reading resumes. Error is why the block is incomplete, None if it
+is not.
+"""
+
+
+def read_blocks(filenames, File=0, Offset=0, Line=1):
+    """Yield a Block for each antenna block of the files, starting from byte Offset, line Line, of file File.
+
+    A line outside a block is yielded as a block of its own, so the parser reports records out of place as it
+    does for a whole file. A START OF ANTENNA before the END OF ANTENNA of the block it is in ends that block
+    with an Error, and reading carries on from the new START OF ANTENNA.
+    """
+    for number in range(File, len(filenames)):
+        with open(filenames[number], "rb") as atx:
+            if number == File:
+                atx.seek(Offset)
+                offset, line_number = Offset, Line
+            else:
+                offset, line_number = 0, 1
+            lines = None
+            start_line = None
+            for raw in atx:
+                offset += len(raw)
+                line = raw.decode("utf-8", errors="replace")
+                Record_Type = line[60:].rstrip()
+                if Record_Type == "START OF ANTENNA":
+                    if lines is not None:
+                        yield Block(number, start_line, offset - len(raw), lines, "START OF ANTENNA before END OF ANTENNA")
+                    lines = []
+                    start_line = line_number
+                if lines is None:
+                    yield Block(number, line_number, offset, [line], None)
+                else:
+                    lines.append(line)
+                    if Record_Type == "END OF ANTENNA":
+                        yield Block(number, start_line, offset, lines, None)
+                        lines = None
+                line_number += 1
+            if lines is not None:
+                yield Block(number, start_line, offset, lines, "File ends before END OF ANTENNA")
+
+
+class RecordingIndex:
+    """Passes index entries to index and keeps them, so they can be replayed into the index when resuming."""
+
+    def __init__(self, index):
+        self.Index = index
+        self.Entries = []
+
+    def header(self):
+        self.Index.header()
+
+    def add(self, entry):
+        self.Entries.append(entry)
+        self.Index.add(entry)
+
+    def footer(self):
+        self.Index.footer()
+
+
+class CheckpointedRun:  # pylint: disable=R0902
+    """Parse the antennas of a report run block by block, recording its progress in a checkpoint file.
+
+    The checkpoint holds the size and modification time of each input, where the block after the last
+    completed antenna starts, the completed antennas, and the index entries and files written for them. It is
+    written atomically every Every antennas and when the run stops on an error, and removed when the run
+    completes. resume refuses a checkpoint whose inputs have changed since, as its position would no longer be
+    the start of a block. Otherwise it replays the index entries and the files written, then the run carries on
+    from the checkpoint's position.
+
+    With Skip_Bad_Blocks a block that cannot be parsed is reported on stderr and skipped, and parsing resyncs at
+    the next START OF ANTENNA rather than failing the run.
+    """
+
+    def __init__(self, filenames, Checkpoint_File=None, Every=50, Skip_Bad_Blocks=False):  # pylint: disable=R0913,R0917
+        self.Filenames = [os.path.abspath(filename) for filename in filenames]
+        self.Checkpoint_File = Checkpoint_File
+        self.Every = Every
+        self.Skip_Bad_Blocks = Skip_Bad_Blocks
+        stats = [os.stat(filename) for filename in self.Filenames]
+        self.Sizes = [stat.st_size for stat in stats]
+        self.Mtimes = [stat.st_mtime_ns for stat in stats]
+        self.Completed = []
+        self.Skipped = []
+        self.Index = None
+        self.Written = None
+        # Position after the last completed antenna, and the lengths of Index.Entries and Written then
+        self.Position = {"File": 0, "Offset": 0, "Line": 1}
+        self.Saved = {"Entries": 0, "Written": 0}
+        self.Since_Save = 0
+
+    def start(self, index, Written):
+        """Record the index entries added to index and the files appended to Written, returning the index to use."""
+        self.Index = RecordingIndex(index)
+        self.Written = Written
+        return self.Index
+
+    def resume(self):
+        """Load the checkpoint, replaying its index entries and files written. False if there is no checkpoint."""
+        try:
+            with open(self.Checkpoint_File, encoding="utf-8") as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return False
+        if checkpoint["Files"] != self.Filenames:
+            raise Exception(
+                "Checkpoint {} is for {}, not {}".format(
+                    self.Checkpoint_File, ", ".join(checkpoint["Files"]), ", ".join(self.Filenames)
+                )
+            )
+        saved = list(zip(checkpoint.get("Sizes", []), checkpoint.get("Mtimes", [])))
+        current = list(zip(self.Sizes, self.Mtimes))
+        if saved != current:
+            changed = [
+                filename
+                for number, filename in enumerate(self.Filenames)
+                if number >= len(saved) or saved[number] != current[number]
+            ]
+            raise Exception(
+                "Checkpoint {} cannot be resumed, {} changed since it was written".format(
+                    self.Checkpoint_File, ", ".join(changed)
+                )
+            )
+        self.Position = checkpoint["Position"]
+        self.Completed = [tuple(key) for key in checkpoint["Completed"]]
+        self.Skipped = checkpoint["Skipped"]
+        for entry in checkpoint["Entries"]:
+            self.Index.add(entry)
+        self.Written.extend(checkpoint["Written"])
+        self.complete_state()
+        return True
+
+    def complete_state(self):
+        self.Saved = {"Entries": len(self.Index.Entries), "Written": len(self.Written)}
+
+    def save(self):
+        """Write the checkpoint as of the last completed antenna."""
+        if not self.Checkpoint_File:
+            return
+        checkpoint = {
+            "Files": self.Filenames,
+            "Sizes": self.Sizes,
+            "Mtimes": self.Mtimes,
+            "Position": self.Position,
+            "Completed": self.Completed,
+            "Skipped": self.Skipped,
+            "Entries": self.Index.Entries[: self.Saved["Entries"]],
+            "Written": self.Written[: self.Saved["Written"]],
+        }
+        temp_filename = "{}.tmp{}".format(self.Checkpoint_File, os.getpid())
+        with open(temp_filename, "w", encoding="utf-8") as temp_file:
+            json.dump(checkpoint, temp_file)
+        os.replace(temp_filename, self.Checkpoint_File)
+        self.Since_Save = 0
+
+    def finish(self):
+        if self.Checkpoint_File and os.path.exists(self.Checkpoint_File):
+            os.remove(self.Checkpoint_File)
+        if self.Skipped:
+            sys.stderr.write("{} bad blocks skipped\n".format(len(self.Skipped)))
+
+    def skip(self, block, message):
+        where = "{}:{}".format(self.Filenames[block.File], block.Line)
+        if not self.Skip_Bad_Blocks:
+            raise Exception("{}: {}".format(where, message))
+        sys.stderr.write("{}: skipping bad block: {}\n".format(where, message))
+        self.Skipped.append([self.Filenames[block.File], block.Line, str(message)])
+
+    def input_read(self, block):
+        """Bytes of the input read up to the end of block, for the progress ETA."""
+        return sum(self.Sizes[: block.File]) + block.End
+
+    def antennas(self, progress=None):
+        """Yield the antennas from the checkpoint's position on.
+
+        An antenna is complete when the next one is asked for, the checkpoint then moving past it.
+        """
+        position = self.Position
+        for block in read_blocks(self.Filenames, position["File"], position["Offset"], position["Line"]):
+            Antennas = []
+            if block.Error:
+                self.skip(block, block.Error)
+            else:
+                try:
+                    Antennas = list(read_antennas(block.Lines))
+                except Exception as e:  # pylint: disable=W0718
+                    self.skip(block, e)
+            if progress is not None:
+                progress.Input_Read = self.input_read(block)
+
+            for Antenna in Antennas:
+                yield Antenna
+                self.Completed.append((Antenna.Type, Antenna.Serial))
+                self.Since_Save += 1
+
+            self.Position = {"File": block.File, "Offset": block.End, "Line": block.Line + len(block.Lines)}
+            self.complete_state()
+            if self.Since_Save >= self.Every:
+                self.save()
@@ -0,0 +1,76 @@
+#! /usr/bin/env python3
+
+import numpy as np
+
+EXTRAPOLATIONS = ["hold", "linear", "error"]
+
+
+def zenith_positions(zeniths, zen, extrapolation):
+    """Return the zenith cell index and fraction of each point in zen, following the extrapolation rule.
+
+    Outside the grid "hold" takes the value at the nearest edge, "linear" extends the outermost cell and
+    "error" raises ValueError.
+    """
+    zen = np.asarray(zen, dtype=float)
+    if extrapolation == "error":
+        if zen.size and (zen.min() < zeniths[0] - 1e-9 or zen.max() > zeniths[-1] + 1e-9):
+            raise ValueError(
+                "Zenith {:.1f} to {:.1f} is outside the grid {:.1f} to {:.1f}".format(
+                    zen.min(), zen.max(), zeniths[0], zeniths[-1]
+                )
+            )
+        zen = np.clip(zen, zeniths[0], zeniths[-1])
+    elif extrapolation == "hold":
+        zen = np.clip(zen, zeniths[0], zeniths[-1])
+    elif extrapolation != "linear":
+        raise ValueError("Unknown extrapolation {}".format(extrapolation))
+
+    iz = np.clip(np.searchsorted(zeniths, zen, side="right") - 1, 0, len(zeniths) - 2)
+    tz = (zen - zeniths[iz]) / (zeniths[iz + 1] - zeniths[iz])
+    return iz, tz
+
+
+def interpolate_profile(zeniths, values, zen, extrapolation="hold"):
+    """Linearly interpolate a NOAZI profile at the zeniths zen, vectorized over the points."""
+    iz, tz = zenith_positions(zeniths, zen, extrapolation)
+    return values[iz] * (1 - tz) + values[iz + 1] * tz
+
+
+def interpolate_grid(azimuths, zeniths, values, az, zen, extrapolation="hold"):  # pylint: disable=R0913,R0917
+    """Bilinearly interpolate a PCV grid at the points az, zen (degrees), vectorized over the points.
+
+    values has a row per azimuth and a column per zenith. Azimuth wraps around at 360 degrees, zeniths
+    outside the grid follow the extrapolation rule of zenith_positions.
+    """
+    az = np.mod(np.asarray(az, dtype=float), 360.0)
+
+    if azimuths[-1] < azimuths[0] + 360.0:
+        azimuths = np.append(azimuths, azimuths[0] + 360.0)
+        values = np.vstack([values, values[:1]])
+
+    ia = np.clip(np.searchsorted(azimuths, az, side="right") - 1, 0, len(azimuths) - 2)
+    ta = (az - azimuths[ia]) / (azimuths[ia + 1] - azimuths[ia])
+    iz, tz = zenith_positions(zeniths, zen, extrapolation)
+
+    return (
+        values[ia, iz] * (1 - ta) * (1 - tz)
+        + values[ia + 1, iz] * ta * (1 - tz)
+        + values[ia, iz + 1] * (1 - ta) * tz
+        + values[ia + 1, iz + 1] * ta * tz
+    )
+
+
+class PCVInterpolator:  # pylint: disable=R0903
+    """Phase centre variation of one band of an antenna at arbitrary azimuths and zeniths.
+
+    The grid is built once, so an interpolator can be kept and evaluated many times. NOAZI only models, with
+    DAZI 0, are interpolated along zenith alone.
+    """
+
+    def __init__(self, Antenna, System, band):
+        self.Azimuths, self.Zeniths, self.Values, self.NOAZI = Antenna.band_grid(System, band)
+
+    def __call__(self, az, zen):
+        if self.Values.size == 0:
+            return interpolate_profile(self.Zeniths, self.NOAZI, zen) + np.zeros(np.shape(az))
+        return interpolate_grid(self.Azimuths, self.Zeniths, self.Values, az, zen)
@@ -0,0 +1,262 @@
+#! /usr/bin/env python3
+
+import argparse
+import difflib
+import json
+import os
+import sqlite3
+import sys
+import zlib
+from datetime import datetime, UTC
+
+from Antenna_index import ANTEXIndex
+
+# Longest chain of deltas before a block is stored in full again, bounding the work to rebuild any block
+MAX_DELTA_DEPTH = 8
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS releases (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    source TEXT,
+    added TEXT,
+    header TEXT NOT NULL,
+    antennas INTEGER
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    digest TEXT PRIMARY KEY,
+    base TEXT,
+    depth INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS release_blocks (
+    release INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    serial TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (release, position)
+);
+CREATE INDEX IF NOT EXISTS release_blocks_key ON release_blocks (type, serial, release);
+"""
+
+
+def block_delta(base, data):
+    """Return the lines of data as a delta against base, a list of [start, end] runs of base lines and literal text.
+
+    The blocks are bytes, decoded as latin-1 so any byte survives the round trip through JSON.
+    """
+    base_lines = base.decode("latin-1").splitlines(keepends=True)
+    lines = data.decode("latin-1").splitlines(keepends=True)
+    delta = []
+    for tag, base_start, base_end, start, end in difflib.SequenceMatcher(None, base_lines, lines, False).get_opcodes():
+        if tag == "equal":
+            delta.append([base_start, base_end])
+        elif start != end:
+            delta.append("".join(lines[start:end]))
+    return delta
+
+
+def apply_delta(base, delta):
+    base_lines = base.decode("latin-1").splitlines(keepends=True)
+    return "".join(item if isinstance(item, str) else "".join(base_lines[item[0] : item[1]]) for item in delta).encode(
+        "latin-1"
+    )
+
+
+class HistoryStore:
+    """Successive ANTEX releases in one SQLite database, each distinct antenna block stored once.
+
+    A release is its header and a list of references to its blocks, by SHA1 digest, in file order. A block
+    that is new is stored as a zlib compressed delta against the latest earlier block of the same antenna, when
+    there is one and the delta is smaller, and in full otherwise. Deltas are chained at most MAX_DELTA_DEPTH
+    deep. Blocks are looked up through an index on (type, serial, release), so neither a query nor an ingest
+    scans the earlier releases.
+    """
+
+    def __init__(self, filename):
+        self.Connection = sqlite3.connect(filename)
+        self.Connection.executescript(SCHEMA)
+
+    def close(self):
+        self.Connection.close()
+
+    def store_block(self, data, digest, Type, Serial):
+        """Store the bytes of a block that is not in the store yet, as a delta if that is smaller."""
+        row = self.Connection.execute(
+            "SELECT rb.digest, b.depth FROM release_blocks rb JOIN blocks b ON b.digest = rb.digest "
+            "WHERE rb.type = ? AND rb.serial = ? ORDER BY rb.release DESC LIMIT 1",
+            (Type, Serial),
+        ).fetchone()
+        base = None
+        depth = 0
+        stored = zlib.compress(data)
+        if row is not None and row[1] < MAX_DELTA_DEPTH:
+            delta = zlib.compress(json.dumps(block_delta(self.block(row[0]), data), separators=(",", ":")).encode())
+            if len(delta) < len(stored):
+                base, depth, stored = row[0], row[1] + 1, delta
+        self.Connection.execute(
+            "INSERT INTO blocks (digest, base, depth, size, data) VALUES (?, ?, ?, ?, ?)",
+            (digest, base, depth, len(data), stored),
+        )
+
+    def block(self, digest):
+        """Return the bytes of a block, rebuilding it from its chain of deltas."""
+        chain = []
+        while digest is not None:
+            base, data = self.Connection.execute("SELECT base, data FROM blocks WHERE digest = ?", (digest,)).fetchone()
+            chain.append((base, zlib.decompress(data)))
+            digest = base
+        block = chain.pop()[1]
+        for _, delta in reversed(chain):
+            block = apply_delta(block, json.loads(delta))
+        return block
+
+    def add_release(self, filename, name):
+        """Add the ANTEX file filename as the release name, returning (antennas, new blocks)."""
+        if self.Connection.execute("SELECT 1 FROM releases WHERE name = ?", (name,)).fetchone():
+            raise Exception("Release {} is already in the store".format(name))
+        index = ANTEXIndex(filename)
+        new_blocks = 0
+        with self.Connection, open(filename, "rb") as atx:
+            release = self.Connection.execute(
+                "INSERT INTO releases (name, source, added, header, antennas) VALUES (?, ?, ?, ?, ?)",
+                (
+                    name,
+                    os.path.abspath(filename),
+                    datetime.now(UTC).isoformat(),
+                    index.read_header(atx).decode("latin-1"),
+                    len(index),
+                ),
+            ).lastrowid
+            for position, block in enumerate(index):
+                if not self.Connection.execute("SELECT 1 FROM blocks WHERE digest = ?", (block.Digest,)).fetchone():
+                    self.store_block(index.read_block(block, atx), block.Digest, block.Type, block.Serial)
+                    new_blocks += 1
+                self.Connection.execute(
+                    "INSERT INTO release_blocks (release, position, type, serial, digest) VALUES (?, ?, ?, ?, ?)",
+                    (release, position, block.Type, block.Serial, block.Digest),
+                )
+        return len(index), new_blocks
+
+    def releases(self):
+        """Return [(name, source, added, antennas)] in the order the releases were added."""
+        return self.Connection.execute("SELECT name, source, added, antennas FROM releases ORDER BY id").fetchall()
+
+    def release_id(self, name=None):
+        """Return the id and header of the release name, the latest release if name is None."""
+        if name is None:
+            row = self.Connection.execute("SELECT id, header FROM releases ORDER BY id DESC LIMIT 1").fetchone()
+        else:
+            row = self.Connection.execute("SELECT id, header FROM releases WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError("No release {}".format(name) if name else "The store is empty")
+        return row
+
+    def antenna(self, Type, Serial="", release=None):
+        """Return the ANTEX blocks of an antenna in a release as bytes, with the release header first.
+
+        The result is a valid ANTEX file. KeyError if the antenna is not in the release.
+        """
+        release_id, header = self.release_id(release)
+        digests = [
+            row[0]
+            for row in self.Connection.execute(
+                "SELECT digest FROM release_blocks WHERE release = ? AND type = ? AND serial = ? ORDER BY position",
+                (release_id, Type, Serial),
+            )
+        ]
+        if not digests:
+            raise KeyError("{!r} serial {!r} is not in release {}".format(Type, Serial, release or "latest"))
+        return header.encode("latin-1") + b"".join(self.block(digest) for digest in digests)
+
+    def timeline(self, Type, Serial=""):
+        """Yield (release, status, digests) for each release, status being added, changed, same, removed or absent.
+
+        digests are the antenna's block digests in the release, several for satellites with more than one
+        validity period.
+        """
+        found = {}
+        for release, digest in self.Connection.execute(
+            "SELECT release, digest FROM release_blocks WHERE type = ? AND serial = ? ORDER BY release, position",
+            (Type, Serial),
+        ):
+            found.setdefault(release, []).append(digest)
+
+        previous = None
+        for release, name in self.Connection.execute("SELECT id, name FROM releases ORDER BY id"):
+            digests = found.get(release)
+            if digests is None:
+                status = "removed" if previous else "absent"
+            elif previous is None:
+                status = "added"
+            else:
+                status = "same" if digests == previous else "changed"
+            yield name, status, digests or []
+            previous = digests
+
+    def statistics(self):
+        """Return the number of blocks, of them stored as deltas, their bytes in full and as stored."""
+        return self.Connection.execute(
+            "SELECT COUNT(*), COUNT(base), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM blocks"
+        ).fetchone()
+
+
+def main():  # pylint: disable=R0914
+    parser = argparse.ArgumentParser(
+        description="Keep successive ANTEX releases in one store, each distinct antenna block stored once, and look up "
+        "any antenna at any release."
+    )
+    parser.add_argument("store", help="History database (SQLite), created if it does not exist")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = subparsers.add_parser("add", help="Add ANTEX files as releases, in the order given")
+    add_parser.add_argument("files", nargs="+", help="ANTEX files")
+    add_parser.add_argument("--name", help="Release name, only for a single file (default: the file name)")
+
+    subparsers.add_parser("releases", help="List the releases")
+    subparsers.add_parser("stats", help="Show how many blocks are stored and their compression")
+
+    for command, help_text in (
+        ("show", "Write an antenna at a release as an ANTEX file to stdout"),
+        ("timeline", "List the releases an antenna was added, changed or removed in"),
+    ):
+        sub_parser = subparsers.add_parser(command, help=help_text)
+        sub_parser.add_argument("--type", required=True, help="Antenna type, as in the TYPE / SERIAL NO record")
+        sub_parser.add_argument("--serial", default="", help="Serial number, blank for the type mean")
+        if command == "show":
+            sub_parser.add_argument("--release", help="Release name (default: the latest)")
+    args = parser.parse_args()
+
+    if args.command == "add" and args.name and len(args.files) > 1:
+        parser.error("--name is only for a single file")
+
+    store = HistoryStore(args.store)
+    try:
+        if args.command == "add":
+            for filename in args.files:
+                name = args.name or os.path.basename(filename)
+                antennas, new_blocks = store.add_release(filename, name)
+                print("{}: {} antennas, {} new blocks".format(name, antennas, new_blocks))
+        elif args.command == "releases":
+            for name, source, added, antennas in store.releases():
+                print("{:20} {:6d} antennas  added {}  from {}".format(name, antennas, added, source))
+        elif args.command == "stats":
+            blocks, deltas, size, stored = store.statistics()
+            print(
+                "{} blocks, {} as deltas, {:.1f} MB stored for {:.1f} MB of blocks".format(blocks, deltas, stored / 1e6, size / 1e6)
+            )
+        elif args.command == "show":
+            sys.stdout.buffer.write(store.antenna(args.type, args.serial, args.release))
+        elif args.command == "timeline":
+            for name, status, digests in store.timeline(args.type, args.serial):
+                print("{:20} {:8} {}".format(name, status, " ".join(digest[:12] for digest in digests)))
+    except KeyError as e:
+        sys.exit(e.args[0])
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
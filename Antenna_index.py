@@ -0,0 +1,103 @@
+#! /usr/bin/env python3
+
+import hashlib
+from collections import namedtuple
+
+AntennaBlock = namedtuple(
+    "AntennaBlock", ["Type", "Serial", "Start", "End", "Line", "Digest"]
+)
+AntennaBlock.__doc__ = """Location of one START OF ANTENNA .. END OF ANTENNA block in an ANTEX file.
+
+Start and End are byte offsets, End being just after the END OF ANTENNA line. Line is the 1 based line number
+of the START OF ANTENNA record and Digest the SHA1 of the block bytes.
+"""
+
+
+def block_lines(data):
+    """Split the bytes of an ANTEX block or header into text lines for read_antennas."""
+    return data.decode("utf-8", errors="replace").splitlines()
+
+
+class ANTEXIndex:
+    """Byte offset index of the antenna blocks of an ANTEX file.
+
+    Only the offsets and keys are held, never the parsed grids, so indexing a file costs a few bytes per
+    antenna whatever its size.
+    """
+
+    def __init__(self, filename):
+        self.Filename = filename
+        self.Header_End = 0
+        self.Size = 0
+        self.Blocks = []
+        self.scan()
+
+    def scan(self):
+        self.Blocks = []
+        self.Header_End = 0
+        In_Antenna = False
+        Type = None
+        Serial = None
+        Start = 0
+        Start_Line = 0
+        digest = None
+        offset = 0
+
+        with open(self.Filename, "rb") as atx:
+            for line_number, raw in enumerate(atx, start=1):
+                Record_Type = raw[60:].rstrip()
+
+                if Record_Type == b"START OF ANTENNA":
+                    if In_Antenna:
+                        raise Exception(
+                            "{}:{}: Got start of antenna while in antenna".format(self.Filename, line_number)
+                        )
+                    In_Antenna = True
+                    Type = None
+                    Serial = None
+                    Start = offset
+                    Start_Line = line_number
+                    digest = hashlib.sha1()
+                elif Record_Type == b"END OF HEADER":
+                    self.Header_End = offset + len(raw)
+                elif Record_Type == b"TYPE / SERIAL NO" and In_Antenna:
+                    Type = raw[0:20].decode("utf-8", errors="replace").rstrip()
+                    Serial = raw[20:60].decode("utf-8", errors="replace").rstrip()
+
+                if In_Antenna:
+                    digest.update(raw)
+
+                offset += len(raw)
+
+                if Record_Type == b"END OF ANTENNA":
+                    if not In_Antenna:
+                        raise Exception(
+                            "{}:{}: Got end of antenna while not in antenna".format(self.Filename, line_number)
+                        )
+                    In_Antenna = False
+                    self.Blocks.append(
+                        AntennaBlock(Type, Serial, Start, offset, Start_Line, digest.hexdigest())
+                    )
+
+        self.Size = offset
+
+    def __len__(self):
+        return len(self.Blocks)
+
+    def __iter__(self):
+        return iter(self.Blocks)
+
+    def read_header(self, atx=None):
+        return self.read_range(0, self.Header_End, atx)
+
+    def read_block(self, block, atx=None):
+        return self.read_range(block.Start, block.End, atx)
+
+    def read_range(self, start, end, atx=None):
+        """Read bytes start:end, from the already open binary file atx when it is given."""
+        if atx is None:
+            with open(self.Filename, "rb") as atx_file:
+                atx_file.seek(start)
+                return atx_file.read(end - start)
+        atx.seek(start)
+        return atx.read(end - start)
@@ -0,0 +1,122 @@
+#! /usr/bin/env python3
+
+import csv
+import gc
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+MEMORY_COLUMNS = [
+    "Time",
+    "Antennas",
+    "RSS MB",
+    "Open Figures",
+    "Open Files",
+    "Traced MB",
+    "Top Allocators",
+    "Cleanup",
+]
+
+
+def rss_mb():
+    """Current resident set size in MB, the peak RSS where /proc is not available."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        # ru_maxrss is in KB on Linux and bytes on macOS, either way it is the peak not the current value
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / 1e6 if sys.platform == "darwin" else maxrss / 1e3
+
+
+def pyplot():
+    """Return matplotlib.pyplot if something has imported it, there can be no figures open otherwise."""
+    return sys.modules.get("matplotlib.pyplot")
+
+
+def open_files():
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+class MemoryMonitor:
+    """Sample memory use every Every antennas of a report run and enforce an optional memory ceiling.
+
+    Samples of RSS, open matplotlib figures, open file descriptors and the Top tracemalloc allocators are
+    written to filename as a CSV time series. tracemalloc is only started when Top is set, as it slows
+    rendering down many times over. When RSS is above Ceiling MB after a sample every figure is closed and a
+    full garbage collection is run.
+    """
+
+    def __init__(self, filename=None, Every=100, Ceiling=None, Top=0):
+        self.Every = Every
+        self.Ceiling = Ceiling
+        self.Top = Top
+        self.Start = time.monotonic()
+        self.Log_File = None
+        self.Writer = None
+
+        if filename:
+            self.Log_File = open(filename, "w", newline="", encoding="utf-8")  # pylint: disable=R1732
+            self.Writer = csv.writer(self.Log_File)
+            self.Writer.writerow(MEMORY_COLUMNS)
+            if Top:
+                tracemalloc.start()
+
+    def top_allocators(self):
+        if not tracemalloc.is_tracing():
+            return "", ""
+        snapshot = tracemalloc.take_snapshot()
+        stats = snapshot.statistics("lineno")[: self.Top]
+        traced = tracemalloc.get_traced_memory()[0] / 1e6
+        return "{:.1f}".format(traced), ";".join(
+            "{}:{}={:.0f}KB".format(stat.traceback[0].filename, stat.traceback[0].lineno, stat.size / 1e3)
+            for stat in stats
+        )
+
+    def sample(self, Antennas, force=False):
+        if not force and Antennas % self.Every != 0:
+            return
+
+        RSS = rss_mb()
+        Cleanup = ""
+        plt = pyplot()
+        if self.Ceiling is not None and RSS > self.Ceiling:
+            if plt is not None:
+                plt.close("all")
+            gc.collect()
+            Cleanup = "{:.1f}".format(rss_mb())
+            sys.stderr.write(
+                "RSS {:.1f} MB above the {} MB ceiling after {} antennas, {} MB after cleanup\n".format(
+                    RSS, self.Ceiling, Antennas, Cleanup
+                )
+            )
+
+        if self.Writer is not None:
+            traced, top = self.top_allocators()
+            self.Writer.writerow(
+                [
+                    "{:.1f}".format(time.monotonic() - self.Start),
+                    Antennas,
+                    "{:.1f}".format(RSS),
+                    len(plt.get_fignums()) if plt is not None else 0,
+                    open_files(),
+                    traced,
+                    top,
+                    Cleanup,
+                ]
+            )
+            self.Log_File.flush()
+
+    def close(self, Antennas):
+        if Antennas % self.Every != 0:
+            self.sample(Antennas, force=True)
+        if self.Log_File is not None:
+            self.Log_File.close()
+            self.Log_File = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
@@ -0,0 +1,133 @@
+#! /usr/bin/env python3
+
+import argparse
+import csv
+import sys
+
+from Antenna_model import AntennaCatalogue, read_antennas
+from Antenna_index import ANTEXIndex, block_lines
+
+
+class ANTEXMerge:
+    """Merge of several ANTEX files, resolving duplicate TYPE / SERIAL NO entries by precedence.
+
+    filenames are in layer order: the header and the antenna order come from the first file and antennas only
+    found in later files are appended in the order they are first seen. precedence lists positions in
+    filenames from the highest precedence to the lowest. By default later files override earlier ones.
+
+    Only the block indexes of the sources are held. The blocks themselves are read back from the sources when
+    the merge is written or parsed.
+    """
+
+    def __init__(self, filenames, precedence=None):
+        if precedence is None:
+            precedence = list(reversed(range(len(filenames))))
+        if sorted(precedence) != list(range(len(filenames))):
+            raise Exception("Precedence {} is not an ordering of the {} sources".format(precedence, len(filenames)))
+
+        self.Filenames = filenames
+        self.Indexes = [ANTEXIndex(filename) for filename in filenames]
+        self.Rank = {source: rank for rank, source in enumerate(precedence)}
+
+        # (Type, Serial) -> [source, ...] in the order the key was found, the winner is resolved from it
+        self.Found = {}
+        for source, index in enumerate(self.Indexes):
+            for block in index:
+                sources = self.Found.setdefault((block.Type, block.Serial), [])
+                if source not in sources:
+                    sources.append(source)
+
+    def winner(self, key):
+        return min(self.Found[key], key=lambda source: self.Rank[source])
+
+    def provenance(self):
+        """Yield (Type, Serial, winning filename, [overridden filenames]) for every merged antenna."""
+        for key, sources in self.Found.items():
+            winner = self.winner(key)
+            yield (
+                key[0],
+                key[1],
+                self.Filenames[winner],
+                [self.Filenames[source] for source in sources if source != winner],
+            )
+
+    def merged_blocks(self):
+        """Yield (source, block) for the winning blocks, in merged order.
+
+        Every block of the winning source is kept when it has several with the same key, for example
+        satellites with more than one validity period.
+        """
+        Winning_Blocks = {}
+        for source, index in enumerate(self.Indexes):
+            for block in index:
+                key = (block.Type, block.Serial)
+                if self.winner(key) == source:
+                    Winning_Blocks.setdefault(key, []).append(block)
+
+        for key in self.Found:
+            source = self.winner(key)
+            for block in Winning_Blocks[key]:
+                yield source, block
+
+    def write(self, output):
+        """Write the merged ANTEX to the binary stream output, copying the blocks byte for byte."""
+        atx_files = [open(filename, "rb") for filename in self.Filenames]  # pylint: disable=R1732
+        try:
+            output.write(self.Indexes[0].read_header(atx_files[0]))
+            for source, block in self.merged_blocks():
+                output.write(self.Indexes[source].read_block(block, atx_files[source]))
+        finally:
+            for atx in atx_files:
+                atx.close()
+
+    def catalogue(self):
+        """Parse the winning blocks into an AntennaCatalogue, with the winning filename as the Source."""
+        catalogue = AntennaCatalogue()
+        atx_files = [open(filename, "rb") for filename in self.Filenames]  # pylint: disable=R1732
+        try:
+            for source, block in self.merged_blocks():
+                data = self.Indexes[source].read_block(block, atx_files[source])
+                for Antenna in read_antennas(block_lines(data)):
+                    catalogue.add(Antenna, self.Filenames[source])
+        finally:
+            for atx in atx_files:
+                atx.close()
+        return catalogue
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Merge ANTEX files, resolving duplicate TYPE / SERIAL NO entries by precedence. "
+        "The merged ANTEX is written to stdout."
+    )
+    parser.add_argument("files", nargs="+", help="ANTEX files, the first supplies the header and antenna order")
+    parser.add_argument(
+        "--precedence",
+        metavar="ORDER",
+        help="Comma separated 1 based file positions, highest precedence first. Default is the last file wins",
+    )
+    parser.add_argument("--report", metavar="FILE", help="Write the source that won for each antenna as CSV to FILE")
+    args = parser.parse_args()
+
+    precedence = None
+    if args.precedence:
+        try:
+            precedence = [int(position) - 1 for position in args.precedence.split(",")]
+        except ValueError:
+            parser.error("--precedence must be a comma separated list of file positions")
+        if sorted(precedence) != list(range(len(args.files))):
+            parser.error("--precedence must list every file position exactly once")
+
+    merge = ANTEXMerge(args.files, precedence)
+    merge.write(sys.stdout.buffer)
+
+    if args.report:
+        with open(args.report, "w", newline="", encoding="utf-8") as report_file:
+            writer = csv.writer(report_file)
+            writer.writerow(["Type", "Serial", "Source", "Overrides"])
+            for Type, Serial, Source, Overrides in merge.provenance():
+                writer.writerow([Type, Serial, Source, ";".join(Overrides)])
+
+
+if __name__ == "__main__":
+    main()
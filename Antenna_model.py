@@ -0,0 +1,617 @@
+#! /usr/bin/env python3
+
+from collections.abc import Mapping
+from datetime import datetime, timedelta, UTC
+
+import numpy as np
+
+# pylint: disable=W0105
+"""
+Record indicating the start of a new     |3X,A1,I2,54X|
+ |                    | frequency section. The satellite system  |            |
+ |                    | flag ('G','R','E','C','J','S') has to be |            |
+ |                    | specified together with the frequency    |            |
+ |                    | number code that has to be consistent    |            |
+ |                    | with the RINEX definition:               |            |
+ |                    | GPS:     'G01' - L1                      |            |
+ |                    |          'G02' - L2                      |            |
+ |                    |          'G05' - L5                      |            |
+ |                    | GLONASS: 'R01' - G1                      |            |
+ |                    |          'R02' - G2                      |            |
+ |                    | Galileo: 'E01' - E1                      |            |
+ |                    |          'E05' - E5a                     |            |
+ |                    |          'E07' - E5b                     |            |
+ |                    |          'E08' - E5 (E5a+E5b)            |            |
+ |                    |          'E06' - E6                      |            |
+ |                    | Compass: 'C01' - E1                      |            |
+ |                    |          'C02' - E2                      |            |
+ |                    |          'C07' - E5b                     |            |
+ |                    |          'C06' - E6                      |            |
+ |                    | QZSS:    'J01' - L1                      |            |
+ |                    |          'J02' - L2                      |            |
+ |                    |          'J05' - L5                      |            |
+ |                    |          'J06' - LEX                     |            |
+ |                    | SBAS:    'S01' - L1                      |            |
+ |                    |          'S05' - L5                      |            |
+ """
+
+GPS = 0
+GLONASS = 1
+GALILEO = 2
+COMPASS = 3
+QZSS = 4
+IRNSS = 5
+SBAS = 6
+
+SYSTEM_NAMES = [None] * (SBAS + 1)
+
+SYSTEM_NAMES[GPS] = "GPS"
+SYSTEM_NAMES[GLONASS] = "GLONASS"
+SYSTEM_NAMES[GALILEO] = "GALILEO"
+SYSTEM_NAMES[COMPASS] = "BeiDOU"
+SYSTEM_NAMES[QZSS] = "QZSS"
+SYSTEM_NAMES[IRNSS] = "IRNSS"
+SYSTEM_NAMES[SBAS] = "SBAS"
+
+SYSTEM_CHARS = [None] * (SBAS + 1)
+
+SYSTEM_CHARS[GPS] = "G"
+SYSTEM_CHARS[GLONASS] = "R"
+SYSTEM_CHARS[GALILEO] = "E"
+SYSTEM_CHARS[COMPASS] = "C"
+SYSTEM_CHARS[QZSS] = "J"
+SYSTEM_CHARS[IRNSS] = "I"
+SYSTEM_CHARS[SBAS] = "S"
+
+
+L1 = 1
+L2 = 2
+L5 = 5
+
+E1 = 1
+E2 = 2
+E5a = 5
+E5b = 7
+E5 = 8
+E6 = 6
+
+LEX = 6
+
+SYSTEM_BANDS = {
+    GPS: ([L1, L2, L5], ["L1", "L2", "L5"]),
+    GLONASS: ([L1, L2], ["L1", "L2"]),
+    GALILEO: ([E1, E5a, E5b, E5, E6], ["E1", "E5a", "E5b", "E5", "E6"]),
+    COMPASS: ([E1, E2, E5b, E6], ["E1", "E2", "E5b", "E6"]),
+    QZSS: ([L1, L2, L5, LEX], ["L1", "L2", "L5", "LEX"]),
+    SBAS: ([L1, L5], ["L1", "L5"]),
+    IRNSS: ([L5], ["L5"]),
+}
+
+
+def frequency_code(System, band):
+    """Return the ANTEX frequency code, for example G01, of a system and band."""
+    return "{}{:02d}".format(SYSTEM_CHARS[System], band)
+
+
+def parse_frequency_code(code):
+    """Return the (System, band) of an ANTEX frequency code such as G01, ValueError if code is not one."""
+    if not isinstance(code, str) or code[:1] not in SYSTEM_CHARS or not (code[1:].isascii() and code[1:].isdigit()):
+        raise ValueError("Invalid frequency code {!r}".format(code))
+    return SYSTEM_CHARS.index(code[0]), int(code[1:])
+
+
+def band_label(System, band):
+    bands, bands_names = SYSTEM_BANDS[System]
+    if band in bands:
+        return bands_names[bands.index(band)]
+    return "{:02d}".format(band)
+
+N_Offset = 0
+E_Offset = 1
+U_Offset = 2
+
+
+NO_AZ = -99
+
+GPS_Generic_Cal_Antennas = "# Number of Calibrated Antennas:"
+GPS_Generic_Cal_Antennas_Length = len(GPS_Generic_Cal_Antennas)
+
+GPS_Cal_Antennas = "# Number of Calibrated Antennas GPS:"
+GPS_Cal_Antennas_Length = len(GPS_Cal_Antennas)
+
+GLO_Cal_Antennas = "# Number of Calibrated Antennas GLO:"
+GLO_Cal_Antennas_Length = len(GLO_Cal_Antennas)
+
+
+SV_Types = {
+    "BLOCK I",
+    "BLOCK II",
+    "BLOCK IIA",
+    "BLOCK IIF",
+    "BLOCK IIR",
+    "BLOCK IIR-A",
+    "BLOCK IIR-B",
+    "BLOCK IIR-M",
+    "BLOCK IIIA",
+    "GLONASS",
+    "GLONASS-M",
+    "GLONASS-K1",
+    "GLONASS-K2",
+    "GALILEO-1",
+    "GALILEO-2",
+    "GALILEO-0A",
+    "GALILEO-0B",
+    "BEIDOU-2G",
+    "BEIDOU-2I",
+    "BEIDOU-2M",
+    "BEIDOU-3I",
+    "BEIDOU-3G-CAST",
+    "BEIDOU-3M-CAST",
+    "BEIDOU-3M-SECM",
+    "BEIDOU-3SM-CAST",
+    "BEIDOU-3SI-CAST",
+    "BEIDOU-3SI-SECM",
+    "QZSS",
+    "QZSS-2A",
+    "QZSS-2G",
+    "QZSS-2I",
+    "IRNSS-1IGSO",
+    "IRNSS-1GEO",
+    "IRNSS-2GEO",
+}
+
+
+class GNSSAntenna:
+    def __init__(self):
+        self.NEE_Offsets = {}
+        self.APC_Offsets = {}
+        self.GPS_Antennas = None
+        self.GLO_Antennas = None
+        self.GAL_Antennas = None
+        self.BDS_Antennas = None
+        self.SBAS_Antennas = None
+        self.QZSS_Antennas = None
+        self.Type = None
+        self.Serial = None
+        self.Model = None
+        self.Radome = None
+        self.DAZI = None
+        self.ZEN1 = None
+        self.ZEN2 = None
+        self.DZEN = None
+        self.Num_Freqs = None
+        self.Sinex_Code = None
+        self.Valid_From = None
+        self.Valid_Until = None
+        self.SV_System = None
+        self.Freq_Number = None
+        self.In_RMS = False
+        self.Zeniths = None
+        self.North = None
+        self.East = None
+        self.Up = None
+        # The FREQ RMS sections, laid out as NEE_Offsets and APC_Offsets
+        self.NEE_RMS = {}
+        self.APC_RMS = {}
+        self.Products = {}
+
+    def process_NEU(self, line):
+        """Process the NORTH / EAST / UP record, returning the grid its rows go into."""
+        North = float(line[0:10])
+        East = float(line[10:20])
+        Up = float(line[20:30])
+        Offsets, Grids = (self.NEE_RMS, self.APC_RMS) if self.In_RMS else (self.NEE_Offsets, self.APC_Offsets)
+        if not self.SV_System in Offsets:
+            Offsets[self.SV_System] = {}
+            Grids[self.SV_System] = {}
+        Offsets[self.SV_System][self.Freq_Number] = (North, East, Up)
+        Grids[self.SV_System][self.Freq_Number] = {}
+        return Grids[self.SV_System][self.Freq_Number]
+
+    def process_comment(self, line):
+        #      print "COMMENT"
+        if line.find(GPS_Cal_Antennas) == 0:
+            #        print "GPS"
+            self.GPS_Antennas = int(line[GPS_Cal_Antennas_Length:60], base=10)
+        #        print GPS_Antennas
+        elif line.find(GPS_Generic_Cal_Antennas) == 0:
+            #        print "GPS Generic"
+            self.GPS_Antennas = int(line[GPS_Generic_Cal_Antennas_Length:60], base=10)
+        #        print GPS_Antennas
+        elif line.find(GLO_Cal_Antennas) == 0:
+            #        print "GLONASS"
+            self.GLO_Antennas = int(line[GLO_Cal_Antennas_Length:60], base=10)
+        #        print GLO_Antennas
+        elif line.find("# Number of Individual GLO-Calibrations:") == 0:
+            if self.GLO_Antennas is None:
+                self.GLO_Antennas = self.GPS_Antennas
+                # Handle the antennas with a generic antenna total comment and GLONASS
+
+    #      print line
+
+    def process_type_serial(self, line):
+        self.Type = line[0:20].rstrip()
+        self.Serial = line[20:60].rstrip()
+        self.Model, self.Radome = split_type(self.Type)
+
+    #        print Type,Serial
+
+    def process_dazi(self, line):
+        self.DAZI = float(line[2:6])
+
+    def process_zen(self, line):
+        self.ZEN1 = float(line[2:8])
+        self.ZEN2 = float(line[8:14])
+        self.DZEN = float(line[14:20])
+        self.Zeniths = None
+
+    def process_num_freqs(self, line):
+        self.Num_Freqs = int(line[0:6])
+
+    def process_sinex_code(self, line):
+        self.Sinex_Code = line[0:10]
+
+    def process_valid_from(self, line):
+        self.Valid_From = parse_epoch(line)
+
+    def process_valid_until(self, line):
+        self.Valid_Until = parse_epoch(line)
+
+    def process_freq_rms(self, line):
+        self.process_freq(line)
+        self.In_RMS = True
+
+    def process_end_freq(self, line):  # pylint: disable=W0613
+        self.In_RMS = False
+
+    def process_freq(self, line):
+        self.In_RMS = False
+        SV_System_Char = line[3:4]
+        if SV_System_Char == "G":
+            self.SV_System = GPS
+        elif SV_System_Char == "R":
+            self.SV_System = GLONASS
+        elif SV_System_Char == "E":
+            self.SV_System = GALILEO
+        elif SV_System_Char == "C":
+            self.SV_System = COMPASS
+        elif SV_System_Char == "J":
+            self.SV_System = QZSS
+        elif SV_System_Char == "S":
+            self.SV_System = SBAS
+        elif SV_System_Char == "I":
+            self.SV_System = IRNSS
+        else:
+            raise Exception("Uknown SV_System_Char" + line)
+        self.Freq_Number = int(line[4:6])
+
+    def zenith_columns(self):
+        """Return [(zenith, column of its value in a grid row)], worked out once per ZEN1 / ZEN2 / DZEN."""
+        if self.Zeniths is None:
+            self.Zeniths = []
+            zen = self.ZEN1
+            column = 8
+            while zen <= self.ZEN2:
+                # Yes if someone really did models at 0.1 resolution we would break but since they are all 5 degrees at the moment we don't care.
+                self.Zeniths.append((zen, column))
+                column += 8
+                zen += self.DZEN
+        return self.Zeniths
+
+    def process_offsets(self, line, Grid=None):
+        """Process a grid row into Grid, by default the PCV grid of the current frequency."""
+        if Grid is None:
+            Grid = self.APC_Offsets[self.SV_System][self.Freq_Number]
+        Az = line[0:8]
+        if Az == "   NOAZI":
+            Az = NO_AZ
+        else:
+            Az = float(Az)
+
+        Grid[Az] = [[zen, float(line[column : column + 8])] for zen, column in self.zenith_columns()]
+
+    def compact(self):
+        """Replace the PCV and FREQ RMS grids with FixedPointGrids, returning the antenna.
+
+        The grids read as before and band_grid decodes them to the same arrays. The axes of the grids are
+        shared, as every band of an antenna has the same azimuths and zeniths. A grid without a NOAZI row, which
+        band_grid cannot read either, is left as parsed.
+        """
+        axes = {}
+        for Grids in (self.APC_Offsets, self.APC_RMS):
+            for bands in Grids.values():
+                for band, Grid in bands.items():
+                    if isinstance(Grid, FixedPointGrid) or NO_AZ not in Grid:
+                        continue
+                    azimuths, zeniths, values, noazi = grid_arrays(Grid)
+                    azimuths = axes.setdefault(("Azimuths", azimuths.tobytes()), azimuths)
+                    zeniths = axes.setdefault(("Zeniths", zeniths.tobytes()), zeniths)
+                    bands[band] = FixedPointGrid(azimuths, zeniths, values, noazi)
+        self.Products = {}
+        return self
+
+    def metadata(self):
+        """Return the antenna's header fields and phase centre offsets, keyed by frequency code."""
+        return {
+            "Type": self.Type,
+            "Serial": self.Serial,
+            "Sinex_Code": self.Sinex_Code.rstrip() if self.Sinex_Code else self.Sinex_Code,
+            "DAZI": self.DAZI,
+            "ZEN1": self.ZEN1,
+            "ZEN2": self.ZEN2,
+            "DZEN": self.DZEN,
+            "Num_Freqs": self.Num_Freqs,
+            "Valid_From": self.Valid_From.isoformat() if self.Valid_From else None,
+            "Valid_Until": self.Valid_Until.isoformat() if self.Valid_Until else None,
+            "GPS_Antennas": self.GPS_Antennas,
+            "GLO_Antennas": self.GLO_Antennas,
+            "Offsets": {
+                frequency_code(System, band): list(Offsets)
+                for System, bands in self.NEE_Offsets.items()
+                for band, Offsets in bands.items()
+            },
+        }
+
+    def band_grid(self, System, band):
+        """Return the azimuths, zeniths, values and NOAZI arrays for one band.
+
+        values has one row per azimuth, sorted, with the NOAZI row excluded. It has no rows when DAZI is 0.
+        """
+        return grid_arrays(self.APC_Offsets[System][band])
+
+    def band_rms_grid(self, System, band):
+        """Return the azimuths, zeniths, values and NOAZI arrays of the FREQ RMS section of one band, as band_grid."""
+        return grid_arrays(self.APC_RMS[System][band])
+
+    def band_products(self, System, band):
+        """Return the BandProducts of one band, computing them the first time they are asked for."""
+        key = (System, band)
+        if key not in self.Products:
+            self.Products[key] = BandProducts(*self.band_grid(System, band))
+        return self.Products[key]
+
+    def grids(self):
+        """Return the PCV grid of every band keyed by frequency code, as plain lists ready for JSON.
+
+        Values holds the azimuth rows one after another, len(Azimuths) * len(Zeniths) values in all.
+        """
+        result = {}
+        for System, bands in self.APC_Offsets.items():
+            for band in bands:
+                azimuths, zeniths, values, noazi = self.band_grid(System, band)
+                result[frequency_code(System, band)] = {
+                    "Azimuths": azimuths.tolist(),
+                    "Zeniths": zeniths.tolist(),
+                    "NOAZI": noazi.tolist(),
+                    "Values": values.ravel().tolist(),
+                }
+        return result
+
+
+def grid_arrays(Az_Elev_Correction):
+    """Return the azimuths, zeniths, values and NOAZI arrays of a grid parsed by process_offsets or a FixedPointGrid."""
+    if isinstance(Az_Elev_Correction, FixedPointGrid):
+        return Az_Elev_Correction.decode()
+    zeniths = np.array([Item[0] for Item in Az_Elev_Correction[NO_AZ]])
+    noazi = np.array([Item[1] for Item in Az_Elev_Correction[NO_AZ]])
+    azimuths = sorted(Az for Az in Az_Elev_Correction if Az != NO_AZ)
+    values = np.array(
+        [[Item[1] for Item in Az_Elev_Correction[Az]] for Az in azimuths]
+    ).reshape(len(azimuths), len(zeniths))
+    return np.array(azimuths), zeniths, values, noazi
+
+
+class FixedPointGrid(Mapping):
+    """A PCV grid held as whole numbers of 1 / Units_Per_MM mm, in int16 when they fit and int32 otherwise.
+
+    ANTEX PCVs are F8.2 in mm, so a grid is exact in hundredths of a mm, Units_Per_MM being 100. A grid with
+    finer values gets the coarsest of UNITS_PER_MM that holds it exactly. The integers are checked to decode to
+    the very floats the grid was parsed to, and the positions of any -0.00 values are kept so they decode with
+    their sign, so the storage is lossless. ValueError is raised for a grid that cannot be held exactly.
+
+    Grid holds the NOAZI row then the azimuth rows, NOAZI and Values being views of it. decode returns the arrays
+    of band_grid with one vectorized divide. The grid also reads as the dict of rows process_offsets builds,
+    Grid[Az] being [[zen, value], ...], decoding only the row asked for.
+    """
+
+    UNITS_PER_MM = (100, 1000, 10000)
+
+    def __init__(self, azimuths, zeniths, values, noazi):
+        self.Azimuths = azimuths
+        self.Zeniths = zeniths
+        self.Shape = values.shape
+        grid = np.concatenate((noazi, values.ravel()))
+        for units in self.UNITS_PER_MM:
+            scaled = np.rint(grid * units)
+            if np.array_equal(scaled / units, grid):
+                break
+        else:
+            raise ValueError("PCV grid is not a whole number of 1/{} mm".format(self.UNITS_PER_MM[-1]))
+        largest = np.abs(scaled).max() if scaled.size else 0
+        if largest > np.iinfo(np.int32).max:
+            raise ValueError("PCV grid value {} mm is too large to store".format(largest / units))
+        negative_zeros = np.flatnonzero(np.signbit(grid) & (scaled == 0))
+        self.Negative_Zeros = negative_zeros.astype(np.int32) if negative_zeros.size else None
+        self.Units_Per_MM = units
+        self.Grid = scaled.astype(np.int16 if largest <= np.iinfo(np.int16).max else np.int32)
+        self.NOAZI = self.Grid[: len(zeniths)]
+        self.Values = self.Grid[len(zeniths) :].reshape(self.Shape)
+
+    def decode_rows(self, start=0, end=None):
+        """Return Grid[start:end] in mm, as float64."""
+        end = len(self.Grid) if end is None else end
+        rows = self.Grid[start:end] / self.Units_Per_MM
+        if self.Negative_Zeros is not None:
+            negative_zeros = self.Negative_Zeros[(self.Negative_Zeros >= start) & (self.Negative_Zeros < end)]
+            rows[negative_zeros - start] = -0.0
+        return rows
+
+    def decode(self):
+        """Return the azimuths, zeniths, values and NOAZI arrays of the grid in mm, as band_grid does."""
+        grid = self.decode_rows()
+        return self.Azimuths, self.Zeniths, grid[len(self.Zeniths) :].reshape(self.Shape), grid[: len(self.Zeniths)]
+
+    @property
+    def nbytes(self):
+        return self.Grid.nbytes + (self.Negative_Zeros.nbytes if self.Negative_Zeros is not None else 0)
+
+    def __getitem__(self, Az):
+        if Az == NO_AZ:
+            start = 0
+        else:
+            index = np.searchsorted(self.Azimuths, Az)
+            if index == len(self.Azimuths) or self.Azimuths[index] != Az:
+                raise KeyError(Az)
+            start = len(self.Zeniths) * (index + 1)
+        row = self.decode_rows(start, start + len(self.Zeniths))
+        return [[zen, value] for zen, value in zip(self.Zeniths.tolist(), row.tolist())]
+
+    def __iter__(self):
+        # In the order of the rows in ANTEX, NOAZI first
+        yield NO_AZ
+        yield from self.Azimuths.tolist()
+
+    def __len__(self):
+        return len(self.Azimuths) + 1
+
+
+def parse_epoch(line):
+    """Return the UTC datetime of a VALID FROM or VALID UNTIL record, 5I6,F13.7."""
+    year, month, day, hour, minute = (int(line[start : start + 6]) for start in range(0, 30, 6))
+    return datetime(year, month, day, hour, minute, tzinfo=UTC) + timedelta(seconds=float(line[30:43]))
+
+
+class BandProducts:  # pylint: disable=R0903
+    """The arrays derived from the grid of one band, computed once and shared by its plots and statistics.
+
+    Values has a row per azimuth, in sorted order, and a column per zenith. Delta is Values less the NOAZI
+    profile. Max_Correction is the largest |Values| and Limit the smallest of LIMITS, in mm, that covers it, None
+    when it is larger than all of them.
+    """
+
+    LIMITS = [5, 10, 15, 20]
+    DEFAULT_LEVEL_LIMIT = 30
+    DELTA_LEVELS = list(range(-5, 6, 1))
+
+    def __init__(self, azimuths, zeniths, values, noazi):
+        self.Azimuths = azimuths
+        self.Zeniths = zeniths
+        self.Values = values
+        self.NOAZI = noazi
+        self.Delta = values - noazi
+        self.Max_Correction = float(np.abs(values).max()) if values.size else 0.0
+        self.Limit = next((limit for limit in self.LIMITS if self.Max_Correction <= limit), None)
+        # Contour levels every mm across the Limit, or DEFAULT_LEVEL_LIMIT when there is none
+        limit = self.Limit or self.DEFAULT_LEVEL_LIMIT
+        self.Levels = list(range(-limit, limit + 1, 1))
+
+
+def split_type(Type):
+    """Return the (model, radome) of an antenna type, the radome being in columns 17-20 of the type.
+
+    A type without a radome code has the radome NONE, as IGS treats it. Satellite antennas have no radome, "".
+    """
+    if Type in SV_Types:
+        return Type, ""
+    return Type[0:16].rstrip(), Type[16:20].strip() or "NONE"
+
+
+class AntennaCatalogue:
+    """Parsed antennas keyed by (Type, Serial), kept in the order they were added.
+
+    Source records where each antenna came from, for example the ANTEX file that won a merge. Radomes maps
+    each antenna model to {radome: (Type, Serial)} for its radome variants, built as antennas are added so the
+    variants of a model are found without a scan. The first antenna added for a model and radome is used,
+    normally the type mean rather than an individual calibration.
+    """
+
+    def __init__(self):
+        self.Antennas = {}
+        self.Sources = {}
+        self.Radomes = {}
+
+    def add(self, Antenna, Source=None):
+        key = (Antenna.Type, Antenna.Serial)
+        self.Antennas[key] = Antenna
+        self.Sources[key] = Source
+        if Antenna.Radome:
+            self.Radomes.setdefault(Antenna.Model, {}).setdefault(Antenna.Radome, key)
+
+    def radomes(self, Model):
+        """Return {radome: GNSSAntenna} of the variants of an antenna model."""
+        return {Radome: self.Antennas[key] for Radome, key in self.Radomes.get(Model, {}).items()}
+
+    def get(self, Type, Serial=""):
+        return self.Antennas.get((Type, Serial))
+
+    def __len__(self):
+        return len(self.Antennas)
+
+    def __iter__(self):
+        return iter(self.Antennas.values())
+
+    def __contains__(self, key):
+        return key in self.Antennas
+
+
+# What to do with each record of an antenna block, looked up once per line. Records that are not listed, such as
+# METH / BY / # / DATE, are skipped. The NORTH / EAST / UP record returns the grid its rows are parsed into.
+RECORD_HANDLERS = {
+    "COMMENT": GNSSAntenna.process_comment,
+    "TYPE / SERIAL NO": GNSSAntenna.process_type_serial,
+    "DAZI": GNSSAntenna.process_dazi,
+    "ZEN1 / ZEN2 / DZEN": GNSSAntenna.process_zen,
+    "# OF FREQUENCIES": GNSSAntenna.process_num_freqs,
+    "VALID FROM": GNSSAntenna.process_valid_from,
+    "VALID UNTIL": GNSSAntenna.process_valid_until,
+    "SINEX CODE": GNSSAntenna.process_sinex_code,
+    "START OF FREQUENCY": GNSSAntenna.process_freq,
+    "START OF FREQ RMS": GNSSAntenna.process_freq_rms,
+    "NORTH / EAST / UP": GNSSAntenna.process_NEU,
+    "END OF FREQUENCY": GNSSAntenna.process_end_freq,
+    "END OF FREQ RMS": GNSSAntenna.process_end_freq,
+}
+
+# Records that end the grid rows of a frequency or FREQ RMS section
+GRID_END_RECORDS = {"END OF FREQUENCY", "END OF FREQ RMS"}
+
+
+def read_antennas(lines, compact=False):
+    """Parse ANTEX lines, yielding each GNSSAntenna as its END OF ANTENNA record is seen.
+
+    Each line is classified once. Inside a grid, which is most of the file, only the end of the grid is looked
+    for, every other line being a grid row. Otherwise the record is dispatched through RECORD_HANDLERS. FREQ RMS
+    sections are parsed into NEE_RMS and APC_RMS. With compact the grids of each antenna are stored as
+    FixedPointGrids, for catalogues held in memory.
+    """
+
+    Antenna = None
+    Grid = None
+
+    for line in lines:
+        line = line.rstrip()
+        Record_Type = line[60:]
+
+        if Grid is not None:
+            if Record_Type in GRID_END_RECORDS:
+                Grid = None
+                Antenna.process_end_freq(line)
+            else:
+                Antenna.process_offsets(line, Grid)
+            continue
+
+        process = RECORD_HANDLERS.get(Record_Type)
+        if process is not None:
+            if Antenna is not None:
+                Grid = process(Antenna, line)
+            elif Record_Type != "COMMENT":
+                raise Exception("Got {} while not in antenna".format(Record_Type))
+        elif Record_Type == "START OF ANTENNA":
+            if Antenna is not None:
+                raise Exception("Got start of antenna while in antenna")
+            Antenna = GNSSAntenna()
+        elif Record_Type == "END OF ANTENNA":
+            if Antenna is None:
+                raise Exception("Got end of antenna while not in antenna")
+            yield Antenna.compact() if compact else Antenna
+            Antenna = None
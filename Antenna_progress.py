@@ -0,0 +1,150 @@
+#! /usr/bin/env python3
+
+import os
+import sys
+import time
+
+METRICS_PREFIX = "antex_report_"
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return "{}h{:02d}m{:02d}s".format(hours, minutes, seconds)
+    if minutes:
+        return "{}m{:02d}s".format(minutes, seconds)
+    return "{}s".format(seconds)
+
+
+def input_size(filenames):
+    """Return the total size of the input files in bytes, None when it is not known, as for standard input."""
+    try:
+        if not filenames or "-" in filenames:
+            return None
+        return sum(os.path.getsize(filename) for filename in filenames)
+    except OSError:
+        return None
+
+
+class RunProgress:  # pylint: disable=R0902
+    """Counters of a report run, reported as progress on stderr and as a Prometheus textfile.
+
+    The counters are always kept, they are only additions. Nothing is reported unless configure is called, and
+    then only when tick finds Every seconds have passed since the last report, so the cost per antenna is one
+    clock read. The ETA is from the position in the input, which is only counted when reporting.
+    """
+
+    def __init__(self):
+        self.Antennas_Parsed = 0
+        self.Antennas_Rendered = 0
+        self.Plots = {}  # plot kind -> plots drawn
+        self.Plot_Failures = {}  # plot kind -> plots that could not be saved
+        self.Bytes_Written = 0
+        self.Files_Unchanged = 0
+        self.Input_Read = 0
+        self.Input_Size = None
+        self.Progress = False
+        self.Metrics_File = None
+        self.Every = None
+        self.Start = time.monotonic()
+        self.Next_Report = float("inf")
+
+    def configure(self, Progress=False, Metrics_File=None, Every=10.0, Input_Size=None):  # pylint: disable=R0913,R0917
+        self.Progress = Progress
+        self.Metrics_File = Metrics_File
+        self.Every = Every
+        self.Input_Size = Input_Size
+        self.Start = time.monotonic()
+        if Progress or Metrics_File:
+            self.Next_Report = self.Start + Every
+
+    def enabled(self):
+        return self.Progress or self.Metrics_File is not None
+
+    def count_input(self, lines):
+        """Yield lines, counting the characters read for the ETA. ANTEX is ASCII, so these are the bytes."""
+        for line in lines:
+            self.Input_Read += len(line)
+            yield line
+
+    def plot(self, kind, src):
+        """Count a plot of kind saved as src, the src being "ERROR" when save_plot failed."""
+        if src == "ERROR":
+            self.Plot_Failures[kind] = self.Plot_Failures.get(kind, 0) + 1
+        else:
+            self.Plots[kind] = self.Plots.get(kind, 0) + 1
+
+    def written(self, size):
+        self.Bytes_Written += size
+
+    def tick(self):
+        if time.monotonic() >= self.Next_Report:
+            self.report()
+
+    def report(self):
+        now = time.monotonic()
+        self.Next_Report = now + self.Every
+        if self.Progress:
+            sys.stderr.write(self.progress_line(now - self.Start) + "\n")
+            sys.stderr.flush()
+        if self.Metrics_File:
+            self.write_metrics()
+
+    def progress_line(self, elapsed):
+        plots = sum(self.Plots.values())
+        line = "{} antennas parsed, {} rendered, {} plots, {:.1f} plots/s".format(
+            self.Antennas_Parsed, self.Antennas_Rendered, plots, plots / elapsed if elapsed > 0 else 0.0
+        )
+        failures = sum(self.Plot_Failures.values())
+        if failures:
+            line += ", {} failed".format(failures)
+        if self.Input_Size:
+            fraction = min(self.Input_Read / self.Input_Size, 1.0)
+            line += ", {:.1f}% of input".format(100 * fraction)
+            if fraction > 0:
+                line += ", ETA {}".format(format_duration(elapsed * (1 - fraction) / fraction))
+        return "{} {}".format(format_duration(elapsed), line)
+
+    def metrics(self):
+        """Return the counters in the Prometheus text exposition format."""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append("# HELP {}{} {}".format(METRICS_PREFIX, name, help_text))
+            lines.append("# TYPE {}{} {}".format(METRICS_PREFIX, name, kind))
+            for labels, value in samples:
+                lines.append("{}{}{} {}".format(METRICS_PREFIX, name, labels, value))
+
+        def by_kind(counts):
+            return [('{{kind="{}"}}'.format(kind), count) for kind, count in sorted(counts.items())]
+
+        metric("antennas_parsed_total", "counter", "Antennas read from the ANTEX input.", [("", self.Antennas_Parsed)])
+        metric("antennas_rendered_total", "counter", "Antenna pages written.", [("", self.Antennas_Rendered)])
+        metric("plots_total", "counter", "Plots saved, by plot kind.", by_kind(self.Plots))
+        metric("plot_failures_total", "counter", "Plots that could not be saved, by plot kind.", by_kind(self.Plot_Failures))
+        metric("bytes_written_total", "counter", "Bytes of pages and plots written.", [("", self.Bytes_Written)])
+        metric(
+            "files_unchanged_total",
+            "counter",
+            "Files not rewritten as their bytes were unchanged, in deterministic mode.",
+            [("", self.Files_Unchanged)],
+        )
+        metric("input_bytes_read", "gauge", "Bytes of the ANTEX input read so far.", [("", self.Input_Read)])
+        if self.Input_Size is not None:
+            metric("input_bytes", "gauge", "Total bytes of the ANTEX input.", [("", self.Input_Size)])
+        metric(
+            "elapsed_seconds", "gauge", "Seconds since the run started.", [("", "{:.1f}".format(time.monotonic() - self.Start))]
+        )
+        metric("last_update_timestamp_seconds", "gauge", "Unix time of this update.", [("", "{:.0f}".format(time.time()))])
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self):
+        # Written to a temporary file and renamed, so a collector never reads a partial file
+        temp_filename = "{}.tmp{}".format(self.Metrics_File, os.getpid())
+        with open(temp_filename, "w", encoding="utf-8") as metrics_file:
+            metrics_file.write(self.metrics())
+        os.replace(temp_filename, self.Metrics_File)
+
+
+Run_Progress = RunProgress()
@@ -0,0 +1,197 @@
+#! /usr/bin/env python3
+
+import argparse
+import csv
+import fileinput
+import sys
+
+import numpy as np
+
+from Antenna_atx import HTML_Unit, Output_Layout, plot_polar_contour, plt, safe_filename, save_plot
+from Antenna_model import AntennaCatalogue, BandProducts, frequency_code, parse_frequency_code, read_antennas
+from Antenna_resample import grid_axes, resample_band
+from Antenna_similarity import DEFAULT_GRID, solid_angle_weights
+
+REFERENCE_RADOME = "NONE"
+
+RADOME_COLUMNS = [
+    "Model",
+    "Radome",
+    "Frequency",
+    "dNorth",
+    "dEast",
+    "dUp",
+    "|dPCO|",
+    "PCV RMS",
+    "Max |dPCV|",
+]
+
+
+def frequency_codes(Antenna):
+    """Return the frequency codes of the antenna's PCV grids, without building the grids."""
+    return [frequency_code(System, band) for System, bands in Antenna.APC_Offsets.items() for band in bands]
+
+
+class RadomeDeltas:
+    """PCO and PCV of every radome variant less its model's NONE variant, per frequency code.
+
+    The variants and their references are resampled to one grid and stacked, so the deltas, their solid angle
+    weighted RMS and their maximums are computed for every model at once, one set of array operations per
+    frequency code.
+    """
+
+    def __init__(self, spec=DEFAULT_GRID):
+        self.Azimuths, self.Zeniths = grid_axes(spec)
+        self.Weights = solid_angle_weights(self.Azimuths, self.Zeniths)
+        self.Keys = {}  # frequency code -> [(Model, Radome, Type)]
+        self.PCOs = {}  # frequency code -> array of (dNorth, dEast, dUp)
+        self.PCVs = {}  # frequency code -> array of PCV deltas, azimuth x zenith per variant
+        self.RMS = {}  # frequency code -> weighted RMS of each PCV delta
+        self.Max = {}  # frequency code -> largest |PCV delta| of each variant
+
+    def grid(self, Antenna, code):
+        System, band = parse_frequency_code(code)
+        _, values = resample_band(Antenna, System, band, self.Azimuths, self.Zeniths)
+        return np.array(Antenna.NEE_Offsets[System][band]), values
+
+    def compute(self, catalogue, models=None):  # pylint: disable=R0914
+        """Compute the deltas of the radome variants of models, every model of the catalogue if not given.
+
+        Only the frequencies a variant shares with its NONE variant are compared.
+        """
+        rows = {}  # frequency code -> [(variant PCO, variant grid, reference PCO, reference grid)]
+        for Model in catalogue.Radomes if models is None else models:
+            variants = catalogue.radomes(Model)
+            Reference = variants.get(REFERENCE_RADOME)
+            if Reference is None:
+                continue
+            reference_codes = set(frequency_codes(Reference))
+            references = {}
+            for Radome, Antenna in variants.items():
+                if Radome == REFERENCE_RADOME:
+                    continue
+                for code in frequency_codes(Antenna):
+                    if code not in reference_codes:
+                        continue
+                    if code not in references:
+                        references[code] = self.grid(Reference, code)
+                    self.Keys.setdefault(code, []).append((Model, Radome, Antenna.Type))
+                    rows.setdefault(code, []).append(self.grid(Antenna, code) + references[code])
+
+        for code, grids in rows.items():
+            PCO, PCV, Reference_PCO, Reference_PCV = (np.array(arrays) for arrays in zip(*grids))
+            self.PCOs[code] = PCO - Reference_PCO
+            self.PCVs[code] = PCV - Reference_PCV
+            self.RMS[code] = np.sqrt(np.einsum("ij,nij->n", self.Weights, self.PCVs[code] ** 2))
+            self.Max[code] = np.abs(self.PCVs[code]).max(axis=(1, 2))
+
+    def rows(self):
+        """Yield a row of RADOME_COLUMNS, the antenna type and the PCV delta of each variant and frequency.
+
+        The rows are in order of model, radome and frequency.
+        """
+        entries = [(key, code, row) for code, keys in self.Keys.items() for row, key in enumerate(keys)]
+        for (Model, Radome, Type), code, row in sorted(entries, key=lambda entry: (entry[0], entry[1])):
+            PCO = self.PCOs[code][row]
+            yield [
+                Model,
+                Radome,
+                code,
+                *PCO.tolist(),
+                float(np.linalg.norm(PCO)),
+                float(self.RMS[code][row]),
+                float(self.Max[code][row]),
+            ], Type, self.PCVs[code][row]
+
+
+def create_radome_delta_plot(Type, code, azimuths, zeniths, delta):
+    # The contour levels cover the delta as they would a PCV grid
+    Products = BandProducts(azimuths, zeniths, delta, np.zeros(len(zeniths)))
+    plot_polar_contour("Radome Delta: " + Type + " " + code, delta, azimuths, zeniths, Products.Levels)
+    filename = safe_filename(Type) + "." + code + ".RADOME-Delta.png"
+    filename = save_plot(Type, filename)
+    plt.close("all")
+    return filename
+
+
+def format_row(row):
+    return row[:3] + ["{:.2f}".format(value) for value in row[3:]]
+
+
+def output_radomes_html(output, rows, plots=None):
+    HTML_Unit.output_html_header(output, "Radome deltas")
+    HTML_Unit.output_html_body(output)
+    HTML_Unit.output_table_header(
+        output,
+        "Radome_Deltas",
+        "Radome - NONE (mm)",
+        RADOME_COLUMNS + ["Plot"] if plots else RADOME_COLUMNS,
+    )
+    for number, row in enumerate(rows):
+        if plots:
+            # As for img_tag, a plot save_plot could not write gets no link
+            src = plots[number]
+            HTML_Unit.output_table_row(
+                output, format_row(row) + ['<a href="{}">Delta</a>'.format(src) if src not in ("", "ERROR") else ""]
+            )
+        else:
+            HTML_Unit.output_table_row(output, format_row(row))
+    HTML_Unit.output_table_footer(output)
+    HTML_Unit.output_html_footer(output, ["Radome_Deltas"])
+
+
+def output_radomes_csv(output, rows):
+    writer = csv.writer(output)
+    writer.writerow(RADOME_COLUMNS)
+    for row in rows:
+        writer.writerow(format_row(row))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Tabulate the PCO and PCV of each radome variant of an antenna model against its NONE variant."
+    )
+    parser.add_argument("files", nargs="*", help="ANTEX files, standard input if none are given")
+    parser.add_argument("--model", help="Comma separated antenna models to compare, without the radome code")
+    parser.add_argument("--csv", metavar="FILE", help="Also write the deltas as CSV to FILE")
+    parser.add_argument("--plots", action="store_true", help="Plot each PCV delta, linked from the table")
+    parser.add_argument("--output-dir", default=".", help="Directory for the plots (default: %(default)s)")
+    parser.add_argument("--dazi", type=float, default=DEFAULT_GRID.DAZI, help="Comparison grid DAZI (default: %(default)s)")
+    parser.add_argument("--dzen", type=float, default=DEFAULT_GRID.DZEN, help="Comparison grid DZEN (default: %(default)s)")
+    args = parser.parse_args()
+
+    spec = DEFAULT_GRID._replace(DAZI=args.dazi, DZEN=args.dzen)
+    if spec.DAZI == 0:
+        parser.error("The comparison grid needs a DAZI")
+    try:
+        deltas = RadomeDeltas(spec)
+    except ValueError as e:
+        parser.error(str(e))
+
+    catalogue = AntennaCatalogue()
+    for Antenna in read_antennas(fileinput.input(files=args.files)):
+        catalogue.add(Antenna, fileinput.filename())
+
+    models = args.model.split(",") if args.model else None
+    for Model in models or []:
+        if REFERENCE_RADOME not in catalogue.Radomes.get(Model, {}):
+            sys.stderr.write("No {} variant of {!r}\n".format(REFERENCE_RADOME, Model))
+    deltas.compute(catalogue, models)
+
+    rows = []
+    plots = []
+    Output_Layout.configure(args.output_dir, "flat")
+    for row, Type, delta in deltas.rows():
+        rows.append(row)
+        if args.plots:
+            plots.append(create_radome_delta_plot(Type, row[2], deltas.Azimuths, deltas.Zeniths, delta))
+
+    output_radomes_html(sys.stdout, rows, plots if args.plots else None)
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as csv_file:
+            output_radomes_csv(csv_file, rows)
+
+
+if __name__ == "__main__":
+    main()
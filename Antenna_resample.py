@@ -0,0 +1,174 @@
+#! /usr/bin/env python3
+
+import argparse
+import fileinput
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+from Antenna_model import SV_Types, parse_frequency_code, read_antennas
+from Antenna_eval import EXTRAPOLATIONS, interpolate_grid, interpolate_profile
+
+GridSpec = namedtuple("GridSpec", ["DAZI", "ZEN1", "ZEN2", "DZEN"])
+GridSpec.__doc__ = "Target grid of a resampling, as the ANTEX DAZI and ZEN1 / ZEN2 / DZEN records."
+
+
+def grid_axes(spec):
+    """Return the azimuths and zeniths of a GridSpec. There are no azimuths when DAZI is 0."""
+    if spec.DZEN <= 0 or spec.ZEN2 <= spec.ZEN1:
+        raise ValueError("Invalid zenith grid {} to {} by {}".format(spec.ZEN1, spec.ZEN2, spec.DZEN))
+    zeniths = spec.ZEN1 + spec.DZEN * np.arange(int(round((spec.ZEN2 - spec.ZEN1) / spec.DZEN)) + 1)
+
+    if spec.DAZI == 0:
+        return np.array([]), zeniths
+    if spec.DAZI < 0 or abs(360.0 / spec.DAZI - round(360.0 / spec.DAZI)) > 1e-9:
+        raise ValueError("DAZI {} does not divide 360".format(spec.DAZI))
+    return spec.DAZI * np.arange(int(round(360.0 / spec.DAZI)) + 1), zeniths
+
+
+def resample_band(Antenna, System, band, azimuths, zeniths, extrapolation="hold", rms=False):  # pylint: disable=R0913,R0917
+    """Return the NOAZI profile and the azimuth grid of one band resampled to azimuths x zeniths.
+
+    The whole grid is evaluated in one vectorized call. NOAZI only models resampled to an azimuth grid give
+    the NOAZI profile at every azimuth. With rms the band's FREQ RMS grid is resampled instead, and kept from
+    going negative where it is extrapolated.
+    """
+    source_azimuths, source_zeniths, values, noazi = (
+        Antenna.band_rms_grid(System, band) if rms else Antenna.band_grid(System, band)
+    )
+    new_noazi = interpolate_profile(source_zeniths, noazi, zeniths, extrapolation)
+
+    if len(azimuths) == 0:
+        new_values = np.zeros((0, len(zeniths)))
+    elif values.size == 0:
+        new_values = np.tile(new_noazi, (len(azimuths), 1))
+    else:
+        az, zen = np.meshgrid(azimuths, zeniths, indexing="ij")
+        new_values = interpolate_grid(source_azimuths, source_zeniths, values, az, zen, extrapolation)
+
+    if rms:
+        return np.maximum(new_noazi, 0), np.maximum(new_values, 0)
+    return new_noazi, new_values
+
+
+def format_record(text, label):
+    return "{:<60}{}".format(text, label)
+
+
+def grid_rows(azimuths, noazi, values):
+    # One format string per row rather than one format call per value
+    row_format = "{:8.2f}" * len(noazi)
+    rows = ["   NOAZI" + row_format.format(*noazi.tolist())]
+    for azimuth, row in zip(azimuths.tolist(), values.tolist()):
+        rows.append("{:8.1f}".format(azimuth) + row_format.format(*row))
+    return rows
+
+
+def resample_block(lines, spec, extrapolation="hold"):  # pylint: disable=R0914
+    """Return the lines of an ANTEX antenna block with its grids resampled to spec.
+
+    Records other than the grids, DAZI and ZEN1 / ZEN2 / DZEN are copied unchanged. The grids of FREQ RMS
+    sections are resampled as the PCV grids are. A COMMENT giving the original grid is added after the antenna
+    header records, just before the first frequency.
+    """
+    Antenna = next(read_antennas(lines))
+    azimuths, zeniths = grid_axes(spec)
+
+    result = []
+    In_Grid = False
+    In_RMS = False
+    Commented = False
+    System = None
+    band = None
+    for line in lines:
+        Record_Type = line[60:].rstrip()
+        if Record_Type == "DAZI":
+            result.append(format_record("  {:6.1f}".format(spec.DAZI), "DAZI"))
+        elif Record_Type == "ZEN1 / ZEN2 / DZEN":
+            result.append(format_record("  {:6.1f}{:6.1f}{:6.1f}".format(spec.ZEN1, spec.ZEN2, spec.DZEN), Record_Type))
+        elif Record_Type in ("START OF FREQUENCY", "START OF FREQ RMS"):
+            if not Commented:
+                result.append(
+                    format_record(
+                        "Resampled from DAZI {:.1f} ZEN {:.1f}-{:.1f}/{:.1f}".format(
+                            Antenna.DAZI, Antenna.ZEN1, Antenna.ZEN2, Antenna.DZEN
+                        ),
+                        "COMMENT",
+                    )
+                )
+                Commented = True
+            System, band = parse_frequency_code(line[3:6])
+            In_RMS = Record_Type == "START OF FREQ RMS"
+            result.append(line)
+        elif Record_Type == "NORTH / EAST / UP":
+            result.append(line)
+            noazi, values = resample_band(Antenna, System, band, azimuths, zeniths, extrapolation, In_RMS)
+            result.extend(grid_rows(azimuths, noazi, values))
+            In_Grid = True
+        elif Record_Type in ("END OF FREQUENCY", "END OF FREQ RMS"):
+            In_Grid = False
+            result.append(line)
+        elif not In_Grid:
+            result.append(line)
+    return result
+
+
+def resample_antex(lines, output, spec, extrapolation="hold", satellites=False):
+    """Stream an ANTEX file from lines to output, resampling each antenna block in turn.
+
+    Satellite antennas are copied unchanged unless satellites is set.
+    """
+    block = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        Record_Type = line[60:].rstrip()
+        if Record_Type == "START OF ANTENNA":
+            block = []
+        if block is None:
+            output.write(line + "\n")
+            continue
+
+        block.append(line)
+        if Record_Type == "END OF ANTENNA":
+            Type = next((line[0:20].rstrip() for line in block if line[60:].rstrip() == "TYPE / SERIAL NO"), None)
+            if Type in SV_Types and not satellites:
+                output.write("\n".join(block) + "\n")
+            else:
+                output.write("\n".join(resample_block(block, spec, extrapolation)) + "\n")
+            block = None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Resample the PCV grids of ANTEX files to one azimuth/zenith grid, writing ANTEX to stdout."
+    )
+    parser.add_argument("files", nargs="*", help="ANTEX files, standard input if none are given")
+    parser.add_argument("--dazi", type=float, default=5.0, help="Azimuth spacing, 0 for NOAZI only (default: %(default)s)")
+    parser.add_argument("--zen1", type=float, default=0.0, help="First zenith (default: %(default)s)")
+    parser.add_argument("--zen2", type=float, default=90.0, help="Last zenith (default: %(default)s)")
+    parser.add_argument("--dzen", type=float, default=5.0, help="Zenith spacing (default: %(default)s)")
+    parser.add_argument(
+        "--extrapolation",
+        choices=EXTRAPOLATIONS,
+        default="hold",
+        help="Beyond the source ZEN1/ZEN2: hold the edge value, extend the last cell linearly or fail "
+        "(default: %(default)s)",
+    )
+    parser.add_argument("--satellites", action="store_true", help="Resample satellite antennas too")
+    args = parser.parse_args()
+
+    spec = GridSpec(args.dazi, args.zen1, args.zen2, args.dzen)
+    try:
+        grid_axes(spec)
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        resample_antex(fileinput.input(files=args.files), sys.stdout, spec, args.extrapolation, args.satellites)
+    except ValueError as e:
+        sys.exit("Resampling failed at line {} of {}: {}".format(fileinput.filelineno(), fileinput.filename(), e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+#! /usr/bin/env python3
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import numpy as np
+
+from Antenna_model import AntennaCatalogue, parse_frequency_code, read_antennas
+from Antenna_eval import PCVInterpolator
+
+
+class AntennaService:
+    """Answers antenna queries from a catalogue that is loaded once and reloaded when the ANTEX file changes.
+
+    Interpolators are built on demand and the Cache_Size most recently used are kept, so the PCVs of the
+    antennas being asked about are evaluated without rebuilding their grids. With Compact the grids are held as
+    FixedPointGrids, a small fraction of the memory, and only the bands being interpolated are decoded.
+    """
+
+    def __init__(self, filename, Cache_Size=64, Reload_Interval=1.0, Compact=False):
+        self.Filename = filename
+        self.Cache_Size = Cache_Size
+        self.Reload_Interval = Reload_Interval
+        self.Compact = Compact
+        self.Lock = threading.Lock()
+        # Held while checking for and doing a reload, so a changed file is parsed once
+        self.Reload_Lock = threading.Lock()
+        self.Catalogue = None
+        self.Signature = None
+        self.Checked = 0
+        self.Interpolators = OrderedDict()
+        self.Stats = {"Loads": 0, "Cache_Hits": 0, "Cache_Misses": 0}
+        self.load()
+
+    def signature(self):
+        stat = os.stat(self.Filename)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load(self):
+        signature = self.signature()
+        catalogue = AntennaCatalogue()
+        with open(self.Filename, encoding="utf-8", errors="replace") as atx:
+            for Antenna in read_antennas(atx, compact=self.Compact):
+                catalogue.add(Antenna, self.Filename)
+
+        with self.Lock:
+            self.Catalogue = catalogue
+            self.Signature = signature
+            self.Interpolators.clear()
+            self.Stats["Loads"] += 1
+        sys.stderr.write("Loaded {} antennas from {}\n".format(len(catalogue), self.Filename))
+
+    def check_reload(self):
+        """Reload the catalogue if the file changed, checking at most every Reload_Interval seconds.
+
+        Only one request checks and reloads at a time. Requests arriving meanwhile are answered from the
+        catalogue already loaded rather than waiting for the reload or parsing the file again.
+        """
+        if time.monotonic() - self.Checked < self.Reload_Interval:
+            return
+        if not self.Reload_Lock.acquire(blocking=False):  # pylint: disable=R1732
+            return
+        try:
+            now = time.monotonic()
+            if now - self.Checked < self.Reload_Interval:
+                return
+            self.Checked = now
+            if self.signature() != self.Signature:
+                self.load()
+        except Exception as e:  # pylint: disable=W0718
+            # Keep serving the catalogue we have, the file is probably being replaced
+            sys.stderr.write("Reload of {} failed: {}\n".format(self.Filename, e))
+        finally:
+            self.Reload_Lock.release()
+
+    def antenna(self, Type, Serial, catalogue=None):
+        Antenna = (self.Catalogue if catalogue is None else catalogue).get(Type, Serial)
+        if Antenna is None:
+            raise KeyError("Unknown antenna {!r} serial {!r}".format(Type, Serial))
+        return Antenna
+
+    def interpolator(self, Type, Serial, code):
+        """Return the PCVInterpolator of an antenna's frequency, from the cache or built and cached.
+
+        It is built outside the lock, from the catalogue current when the cache was checked. If a reload has
+        replaced that catalogue meanwhile the interpolator is returned but not cached, so the cache only holds
+        interpolators of the current catalogue.
+        """
+        key = (Type, Serial, code)
+        with self.Lock:
+            interpolator = self.Interpolators.get(key)
+            if interpolator is not None:
+                self.Interpolators.move_to_end(key)
+                self.Stats["Cache_Hits"] += 1
+                return interpolator
+            catalogue = self.Catalogue
+
+        Antenna = self.antenna(Type, Serial, catalogue)
+        System, band = parse_frequency_code(code)
+        if band not in Antenna.APC_Offsets.get(System, {}):
+            raise KeyError("Antenna {!r} has no frequency {}".format(Type, code))
+        interpolator = PCVInterpolator(Antenna, System, band)
+
+        with self.Lock:
+            self.Stats["Cache_Misses"] += 1
+            if self.Catalogue is not catalogue:
+                return interpolator
+            self.Interpolators[key] = interpolator
+            while len(self.Interpolators) > self.Cache_Size:
+                self.Interpolators.popitem(last=False)
+        return interpolator
+
+    def pcv(self, query):
+        for name in ("type", "frequency", "az", "zen"):
+            if name not in query:
+                raise ValueError("Missing {} in query".format(name))
+        interpolator = self.interpolator(query["type"], query.get("serial", ""), query["frequency"])
+        return {"pcv": np.round(interpolator(query["az"], query["zen"]), 3).tolist()}
+
+    def handle(self, method, path, parameters, body):  # pylint: disable=R0911
+        """Return (HTTP status, JSON response) for a request."""
+        self.check_reload()
+
+        Type = parameters.get("type", [""])[0]
+        Serial = parameters.get("serial", [""])[0]
+        if path in ("/antenna", "/offsets") and "type" not in parameters:
+            raise ValueError("Missing type parameter")
+
+        if method == "GET" and path == "/antennas":
+            return 200, {
+                "antennas": [
+                    {"Type": Antenna.Type, "Serial": Antenna.Serial}
+                    for Antenna in self.Catalogue
+                    if Antenna.Type.startswith(Type)
+                ]
+            }
+        if method == "GET" and path == "/antenna":
+            return 200, self.antenna(Type, Serial).metadata()
+        if method == "GET" and path == "/offsets":
+            return 200, {"Offsets": self.antenna(Type, Serial).metadata()["Offsets"]}
+        if method == "GET" and path == "/stats":
+            return 200, dict(self.Stats, Antennas=len(self.Catalogue), Cached=len(self.Interpolators))
+        if method == "POST" and path == "/pcv":
+            # A single query or {"queries": [query, ...]} to evaluate a batch in one request
+            request = json.loads(body)
+            if "queries" in request:
+                return 200, {"results": [self.pcv(query) for query in request["queries"]]}
+            return 200, self.pcv(request)
+        return 404, {"error": "Unknown request {} {}".format(method, path)}
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # The headers and body are written separately, with Nagle each response waits for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def respond(self, method):
+        url = urlparse(self.path)
+        body = b""
+        if "Content-Length" in self.headers:
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+        try:
+            status, response = self.server.Service.handle(method, url.path, parse_qs(url.query), body)
+        except KeyError as e:
+            status, response = 404, {"error": str(e.args[0]) if e.args else str(e)}
+        except (ValueError, TypeError) as e:
+            status, response = 400, {"error": str(e)}
+
+        data = json.dumps(response).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.respond("GET")
+
+    def do_POST(self):
+        self.respond("POST")
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        # Per request logging costs more than answering most queries
+        pass
+
+
+class UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("local", 0)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.Path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.Path)
+
+
+def connect(args):
+    if args.socket:
+        return UnixHTTPConnection(args.socket)
+    return http.client.HTTPConnection(args.host, args.port)
+
+
+def send_request(connection, method, path, body=None):
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    connection.request(method, path, body=body, headers=headers)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def load_test(args):  # pylint: disable=R0914
+    """Run args.requests batched PCV queries over args.concurrency connections and report the latencies."""
+    connection = connect(args)
+    status, response = send_request(connection, "GET", "/antennas")
+    if status != 200 or not response["antennas"]:
+        sys.exit("No antennas to query: {}".format(response))
+    targets = []
+    for entry in response["antennas"]:
+        _, metadata = send_request(
+            connection, "GET", "/antenna?" + urlencode({"type": entry["Type"], "serial": entry["Serial"]})
+        )
+        for code in metadata["Offsets"]:
+            targets.append((entry["Type"], entry["Serial"], code))
+    connection.close()
+
+    # A few antennas take most of the queries, as with real processing jobs
+    hot = targets[: max(1, len(targets) // 10)]
+    latencies = []
+    lock = threading.Lock()
+    per_thread = args.requests // args.concurrency
+
+    def worker(seed):
+        generator = random.Random(seed)
+        thread_connection = connect(args)
+        thread_latencies = []
+        for _ in range(per_thread):
+            Type, Serial, code = generator.choice(hot if generator.random() < 0.8 else targets)
+            body = json.dumps(
+                {
+                    "type": Type,
+                    "serial": Serial,
+                    "frequency": code,
+                    "az": [generator.uniform(0, 360) for _ in range(args.points)],
+                    "zen": [generator.uniform(0, 90) for _ in range(args.points)],
+                }
+            ).encode("utf-8")
+            start = time.perf_counter()
+            status, _ = send_request(thread_connection, "POST", "/pcv", body)
+            thread_latencies.append(time.perf_counter() - start)
+            if status != 200:
+                sys.stderr.write("Query for {} {} failed with {}\n".format(Type, code, status))
+        thread_connection.close()
+        with lock:
+            latencies.extend(thread_latencies)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    print(
+        "{} requests of {} points in {:.2f}s, {:.0f} requests/s".format(
+            len(latencies), args.points, elapsed, len(latencies) / elapsed
+        )
+    )
+    print(
+        "Latency ms: p50 {:.2f}  p90 {:.2f}  p99 {:.2f}  max {:.2f}".format(
+            *np.percentile(np.array(latencies) * 1000, [50, 90, 99, 100])
+        )
+    )
+
+
+def serve(args):
+    service = AntennaService(args.file, args.cache, Compact=args.compact)
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        server = UnixHTTPServer(args.socket, ServiceHandler)
+        sys.stderr.write("Serving on {}\n".format(args.socket))
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), ServiceHandler)
+        sys.stderr.write("Serving on http://{}:{}/\n".format(args.host, args.port))
+    server.Service = service  # pylint: disable=W0201
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local JSON lookup service for antenna PCO and PCV queries.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Load an ANTEX file and answer queries")
+    serve_parser.add_argument("file", help="ANTEX file, reloaded when it changes")
+    serve_parser.add_argument("--cache", type=int, default=64, help="Interpolators to keep (default: %(default)s)")
+    serve_parser.add_argument(
+        "--compact", action="store_true", help="Hold the PCV grids as fixed point integers, losslessly, to use less memory"
+    )
+
+    load_parser = subparsers.add_parser("load-test", help="Measure the latency of a running service")
+    load_parser.add_argument("--requests", "-n", type=int, default=1000, help="Requests (default: %(default)s)")
+    load_parser.add_argument("--concurrency", "-c", type=int, default=4, help="Connections (default: %(default)s)")
+    load_parser.add_argument("--points", type=int, default=100, help="Points per request (default: %(default)s)")
+
+    for sub_parser in (serve_parser, load_parser):
+        sub_parser.add_argument("--host", default="127.0.0.1", help="HTTP address (default: %(default)s)")
+        sub_parser.add_argument("--port", type=int, default=8765, help="HTTP port (default: %(default)s)")
+        sub_parser.add_argument("--socket", metavar="PATH", help="Use a Unix socket at PATH instead of HTTP")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        serve(args)
+    else:
+        load_test(args)
+
+
+if __name__ == "__main__":
+    main()
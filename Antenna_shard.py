@@ -0,0 +1,254 @@
+#! /usr/bin/env python3
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+
+from Antenna_atx import FeedIndex, HTMLIndex, Output_Layout, Plot_Registry, output_antenna_details, source_timestamp
+from Antenna_index import ANTEXIndex
+from Antenna_model import read_antennas
+
+PLAN = "shards.json"
+SHARD_PATTERN = "shard-[0-9][0-9][0-9].*"
+
+
+def write_json_atomic(filename, data):
+    temp_filename = "{}.tmp{}".format(filename, os.getpid())
+    with open(temp_filename, "w", encoding="utf-8") as temp_file:
+        json.dump(data, temp_file)
+    os.replace(temp_filename, filename)
+
+
+def split_blocks(blocks, count):
+    """Split blocks into at most count runs of consecutive blocks with about the same number of bytes each."""
+    total = sum(block.End - block.Start for block in blocks)
+    shards = [[]]
+    size = 0
+    for block in blocks:
+        if shards[-1] and size >= total * len(shards) / count:
+            shards.append([])
+        shards[-1].append(block)
+        size += block.End - block.Start
+    return shards
+
+
+def file_sha1(filename):
+    digest = hashlib.sha1()
+    with open(filename, "rb") as atx:
+        for chunk in iter(lambda: atx.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def split(filename, count, work_dir):
+    """Write the antennas of filename as count ANTEX files, each with the header and whole antenna blocks.
+
+    The plan listing the shards in their original order is written to PLAN in work_dir, with the Split id of the
+    source's SHA1 and the shard count that render copies into each part. The shards and parts of an earlier split
+    are removed first, so merge cannot pick up a part rendered from another file.
+    """
+    index = ANTEXIndex(filename)
+    if not index.Blocks:
+        raise Exception("No antennas in {}".format(filename))
+    os.makedirs(work_dir, exist_ok=True)
+    for old in glob.glob(os.path.join(work_dir, SHARD_PATTERN)) + glob.glob(os.path.join(work_dir, PLAN)):
+        os.remove(old)
+    shards = split_blocks(index.Blocks, count)
+    plan = {
+        "Source": os.path.abspath(filename),
+        "Split": "{}-{}".format(file_sha1(filename), len(shards)),
+        "Shards": [],
+    }
+
+    with open(filename, "rb") as atx:
+        header = index.read_header(atx)
+        for number, blocks in enumerate(shards):
+            name = "shard-{:03d}".format(number)
+            with open(os.path.join(work_dir, name + ".atx"), "wb") as shard:
+                shard.write(header)
+                # The blocks are consecutive, so one read copies them all
+                shard.write(index.read_range(blocks[0].Start, blocks[-1].End, atx))
+            plan["Shards"].append({"Name": name, "File": name + ".atx", "Part": name + ".json", "Antennas": len(blocks)})
+
+    write_json_atomic(os.path.join(work_dir, PLAN), plan)
+    return plan
+
+
+class PartIndex:
+    """Collects the index entries of a shard instead of writing an index, for the merge to replay in order."""
+
+    def __init__(self):
+        self.Entries = []
+
+    def header(self):
+        pass
+
+    def add(self, entry):
+        self.Entries.append(entry)
+
+    def footer(self):
+        pass
+
+
+def render(shard_filename, part_filename, split_id):
+    """Render the pages and plots of one shard and write its partial index.
+
+    The part holds the Split id of the plan, the shard's index entries and the files it wrote. It is written last
+    and atomically, so it only exists once the shard is complete.
+    """
+    index = PartIndex()
+    with open(shard_filename, encoding="utf-8", errors="replace") as atx:
+        for Antenna in read_antennas(atx):
+            output_antenna_details(Antenna, index)
+    write_json_atomic(part_filename, {"Split": split_id, "Entries": index.Entries, "Written": Output_Layout.Written})
+
+
+def read_plan(filename):
+    with open(filename, encoding="utf-8") as plan_file:
+        return json.load(plan_file)
+
+
+def merge(work_dir, index, prune=False):
+    """Write the index of every shard's entries in the original order, and the combined manifest.
+
+    Every part must have been rendered for the plan's split, nothing is written otherwise.
+    """
+    plan = read_plan(os.path.join(work_dir, PLAN))
+
+    parts = []
+    for shard in plan["Shards"]:
+        try:
+            with open(os.path.join(work_dir, shard["Part"]), encoding="utf-8") as part_file:
+                part = json.load(part_file)
+        except FileNotFoundError:
+            sys.exit("Shard {} has not been rendered".format(shard["Name"]))
+        if part.get("Split") != plan["Split"]:
+            sys.exit("Shard {} was rendered for another split, render it again".format(shard["Name"]))
+        parts.append(part)
+
+    index.header()
+    for part in parts:
+        for entry in part["Entries"]:
+            index.add(entry)
+        Output_Layout.Written.extend(part["Written"])
+    index.footer()
+    Output_Layout.write_manifest(prune)
+
+
+def run_local(args):
+    """Split, render every shard in its own process and merge, as a set of nodes would."""
+    plan = split(args.file, args.shards, args.work_dir)
+    processes = []
+    for shard in plan["Shards"]:
+        command = [
+            sys.executable,
+            os.path.abspath(__file__),
+            "render",
+            os.path.join(args.work_dir, shard["File"]),
+            "--output-dir",
+            args.output_dir,
+            "--layout",
+            args.layout,
+        ]
+        if args.inline_images:
+            command += ["--inline-images", args.inline_images]
+        if args.thumbnails:
+            command.append("--thumbnails")
+        if args.plots:
+            command += ["--plots", args.plots]
+        if args.deterministic:
+            command.append("--deterministic")
+        processes.append(subprocess.Popen(command))  # pylint: disable=R1732
+
+    failed = [shard["Name"] for shard, process in zip(plan["Shards"], processes) if process.wait() != 0]
+    if failed:
+        sys.exit("Shards failed: {}".format(", ".join(failed)))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render an ANTEX file as independent shards, on any number of nodes, and merge their indexes."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    split_parser = subparsers.add_parser("split", help="Split an ANTEX file into shards of whole antennas")
+    split_parser.add_argument("file", help="ANTEX file")
+
+    render_parser = subparsers.add_parser("render", help="Render one shard's pages, plots and partial index")
+    render_parser.add_argument("shard", help="Shard ANTEX file written by split")
+    render_parser.add_argument("--part", help="Partial index to write (default: the shard file with .json)")
+    render_parser.add_argument("--plan", help="Plan written by split (default: {} beside the shard file)".format(PLAN))
+
+    merge_parser = subparsers.add_parser("merge", help="Write the index of the rendered shards to stdout")
+
+    run_parser = subparsers.add_parser("run", help="Split, render the shards as local processes and merge")
+    run_parser.add_argument("file", help="ANTEX file")
+
+    for sub_parser in (split_parser, run_parser):
+        sub_parser.add_argument("--shards", "-n", type=int, default=os.cpu_count(), help="Shards (default: %(default)s)")
+    for sub_parser in (split_parser, merge_parser, run_parser):
+        sub_parser.add_argument("--work-dir", default="shards", help="Directory for the shards (default: %(default)s)")
+    for sub_parser in (render_parser, merge_parser, run_parser):
+        sub_parser.add_argument("--deterministic", action="store_true", help="As for Antenna_atx.py")
+        sub_parser.add_argument("--output-dir", default=".", help="Directory for the pages and plots (default: %(default)s)")
+        sub_parser.add_argument(
+            "--layout",
+            choices=["flat", "type", "hash"],
+            default="flat",
+            help="Output directory layout, as for Antenna_atx.py (default: %(default)s)",
+        )
+    for sub_parser in (render_parser, run_parser):
+        sub_parser.add_argument("--inline-images", choices=["png", "svg"], help="As for Antenna_atx.py")
+        sub_parser.add_argument("--thumbnails", action="store_true", help="As for Antenna_atx.py")
+        sub_parser.add_argument("--plots", help="As for Antenna_atx.py")
+    for sub_parser in (merge_parser, run_parser):
+        sub_parser.add_argument("--prune", action="store_true", help="As for Antenna_atx.py")
+        sub_parser.add_argument("--index-feed", action="store_true", help="As for Antenna_atx.py")
+        sub_parser.add_argument("--sparklines", action="store_true", help="As for Antenna_atx.py")
+    args = parser.parse_args()
+
+    if args.command == "split":
+        plan = split(args.file, args.shards, args.work_dir)
+        for shard in plan["Shards"]:
+            print("{} {} antennas".format(os.path.join(args.work_dir, shard["File"]), shard["Antennas"]))
+        return
+
+    Timestamp = None
+    if args.deterministic:
+        if args.command == "merge":
+            Timestamp = source_timestamp([read_plan(os.path.join(args.work_dir, PLAN))["Source"]])
+        else:
+            Timestamp = source_timestamp([args.file if args.command == "run" else args.shard])
+    Output_Layout.configure(
+        args.output_dir,
+        args.layout,
+        getattr(args, "inline_images", None),
+        getattr(args, "thumbnails", False),
+        args.deterministic,
+        Timestamp,
+    )
+
+    if args.command == "render":
+        try:
+            Plot_Registry.select(args.plots.split(",") if args.plots else None)
+        except ValueError as e:
+            parser.error(str(e))
+        plan = read_plan(args.plan or os.path.join(os.path.dirname(os.path.abspath(args.shard)), PLAN))
+        render(args.shard, args.part or os.path.splitext(args.shard)[0] + ".json", plan["Split"])
+        return
+
+    if args.command == "run":
+        run_local(args)
+    if args.index_feed:
+        index = FeedIndex(sys.stdout, Sparklines=args.sparklines)
+    else:
+        index = HTMLIndex(sys.stdout, args.sparklines)
+    merge(args.work_dir, index, args.prune)
+
+
+if __name__ == "__main__":
+    main()
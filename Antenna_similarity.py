@@ -0,0 +1,200 @@
+#! /usr/bin/env python3
+
+import argparse
+import sys
+
+import numpy as np
+
+from Antenna_model import SV_Types, frequency_code, read_antennas
+from Antenna_resample import GridSpec, grid_axes, resample_band
+
+DEFAULT_GRID = GridSpec(5.0, 0.0, 90.0, 5.0)
+
+
+def solid_angle_weights(azimuths, zeniths):
+    """Return the fraction of the grid's solid angle covered by each azimuth x zenith point.
+
+    Each point covers the band from halfway to the zenith before it to halfway to the one after, the first and
+    last rows half a step, so the bands tile the grid's cap of sky exactly. The rows near the zenith get little
+    weight and the row at 360 azimuth, a repeat of the row at 0, gets none.
+    """
+    zen = np.radians(zeniths)
+    edges = np.concatenate(([zen[0]], (zen[:-1] + zen[1:]) / 2, [zen[-1]]))
+    rows = np.cos(edges[:-1]) - np.cos(edges[1:])
+
+    weights = np.tile(rows, (len(azimuths), 1))
+    weights[azimuths >= 360.0] = 0
+    return weights / weights.sum()
+
+
+class SimilarityIndex:
+    """PCO and PCV of every antenna in a catalogue on one grid, as a dense matrix per frequency.
+
+    Each row is the antenna's total phase pattern, its PCV less the projection of its PCO, on the common grid
+    and scaled by the square root of the solid angle weights. The Euclidean distance between two rows is then
+    the RMS difference of the two patterns over the sky, in mm, so a query against every antenna is a single
+    matrix product.
+    """
+
+    def __init__(self, spec=DEFAULT_GRID):
+        if spec.DAZI == 0:
+            raise ValueError("The similarity grid needs a DAZI")
+        self.Spec = spec
+        self.Azimuths, self.Zeniths = grid_axes(spec)
+        self.Scale = np.sqrt(solid_angle_weights(self.Azimuths, self.Zeniths)).ravel()
+
+        az = np.radians(self.Azimuths)[:, None]
+        zen = np.radians(self.Zeniths)[None, :]
+        # Unit vector components towards each grid point, so a PCO is projected with one matrix product
+        self.Directions = np.stack(
+            [(np.cos(az) * np.sin(zen)).ravel(), (np.sin(az) * np.sin(zen)).ravel(), np.repeat(np.cos(zen), len(az), 0).ravel()]
+        )
+
+        self.Keys = {}  # frequency code -> [(Type, Serial)]
+        self.Rows = {}  # frequency code -> [pattern] while the index is being built
+        self.Matrices = {}  # frequency code -> array of patterns, one row per antenna in Keys
+        self.PCOs = {}  # frequency code -> array of (North, East, Up)
+        self.Norms = {}  # frequency code -> squared norm of each pattern
+
+    def pattern(self, Antenna, System, band):
+        """Return the scaled phase pattern of one band on the index grid and its PCO."""
+        _, values = resample_band(Antenna, System, band, self.Azimuths, self.Zeniths)
+        PCO = np.array(Antenna.NEE_Offsets[System][band])
+        return (values.ravel() - PCO @ self.Directions) * self.Scale, PCO
+
+    def add(self, Antenna):
+        for System, bands in Antenna.NEE_Offsets.items():
+            for band in bands:
+                code = frequency_code(System, band)
+                pattern, PCO = self.pattern(Antenna, System, band)
+                self.Keys.setdefault(code, []).append((Antenna.Type, Antenna.Serial))
+                self.Rows.setdefault(code, []).append((pattern, PCO))
+
+    def finish(self):
+        """Stack the patterns added into the matrices queries run against."""
+        for code, rows in self.Rows.items():
+            matrix = np.array([pattern for pattern, _ in rows])
+            PCOs = np.array([PCO for _, PCO in rows])
+            if code in self.Matrices:
+                matrix = np.vstack([self.Matrices[code], matrix])
+                PCOs = np.vstack([self.PCOs[code], PCOs])
+            self.Matrices[code] = matrix
+            self.PCOs[code] = PCOs
+            self.Norms[code] = np.einsum("ij,ij->i", matrix, matrix)
+        self.Rows = {}
+
+    def nearest(self, Antenna, k=5, codes=None, exclude=None):  # pylint: disable=R0914
+        """Return {frequency code: [(Type, Serial, RMS mm, PCO difference mm)]} of the k nearest antennas.
+
+        Only the frequencies in codes are compared if it is given. Antennas whose (Type, Serial) is exclude,
+        normally the antenna asked about, are left out.
+        """
+        results = {}
+        for System, bands in Antenna.NEE_Offsets.items():
+            for band in bands:
+                code = frequency_code(System, band)
+                if code not in self.Matrices or (codes and code not in codes):
+                    continue
+                pattern, PCO = self.pattern(Antenna, System, band)
+                distances = self.Norms[code] - 2 * self.Matrices[code] @ pattern + pattern @ pattern
+                RMS = np.sqrt(np.maximum(distances, 0))
+                if exclude is not None:
+                    RMS[[key == exclude for key in self.Keys[code]]] = np.inf
+
+                count = min(k, int(np.isfinite(RMS).sum()))
+                nearest = np.argpartition(RMS, count - 1)[:count] if count else []
+                nearest = sorted(nearest, key=lambda row: RMS[row])  # pylint: disable=W0640
+                PCO_Deltas = np.linalg.norm(self.PCOs[code][nearest] - PCO, axis=1) if count else []
+                results[code] = [
+                    (*self.Keys[code][row], float(RMS[row]), float(delta)) for row, delta in zip(nearest, PCO_Deltas)
+                ]
+        return results
+
+    def save(self, filename):
+        arrays = {"spec": np.array(self.Spec)}
+        for code, matrix in self.Matrices.items():
+            arrays[code + "_matrix"] = matrix
+            arrays[code + "_pcos"] = self.PCOs[code]
+            arrays[code + "_keys"] = np.array(self.Keys[code], dtype=str).reshape(-1, 2)
+        np.savez_compressed(filename, **arrays)
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename) as data:
+            index = cls(GridSpec(*np.asarray(data["spec"], dtype=float).tolist()))
+            for name in data.files:
+                if name.endswith("_matrix"):
+                    code = name[:-7]
+                    index.Matrices[code] = data[name]
+                    index.PCOs[code] = data[code + "_pcos"]
+                    index.Keys[code] = [tuple(key) for key in data[code + "_keys"].tolist()]
+                    index.Norms[code] = np.einsum("ij,ij->i", index.Matrices[code], index.Matrices[code])
+        return index
+
+
+def build_index(filenames, spec=DEFAULT_GRID, satellites=False):
+    index = SimilarityIndex(spec)
+    for filename in filenames:
+        with open(filename, encoding="utf-8", errors="replace") as atx:
+            for Antenna in read_antennas(atx):
+                if satellites or Antenna.Type not in SV_Types:
+                    index.add(Antenna)
+    index.finish()
+    return index
+
+
+def find_antenna(filenames, Type, Serial):
+    for filename in filenames:
+        with open(filename, encoding="utf-8", errors="replace") as atx:
+            for Antenna in read_antennas(atx):
+                if Antenna.Type == Type and (Serial is None or Antenna.Serial == Serial):
+                    return Antenna
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find the calibrated antennas whose phase patterns are closest to an antenna, per frequency."
+    )
+    parser.add_argument("files", nargs="*", help="ANTEX files to search, not needed with --index")
+    parser.add_argument("--index", metavar="FILE", help="Search an index saved with --save instead of the files")
+    parser.add_argument("--save", metavar="FILE", help="Save the index built from the files to FILE (.npz)")
+    parser.add_argument("--type", help="Antenna type to find matches for, as in the TYPE / SERIAL NO record")
+    parser.add_argument("--serial", help="Serial number of the antenna, the first of the type if not given")
+    parser.add_argument(
+        "--query-file",
+        metavar="FILE",
+        help="ANTEX file holding the antenna to match, for grids that are not in the catalogue",
+    )
+    parser.add_argument("-k", type=int, default=5, help="Matches to list per frequency (default: %(default)s)")
+    parser.add_argument("--frequencies", help="Comma separated frequency codes to compare, for example G01,G02")
+    parser.add_argument("--dazi", type=float, default=DEFAULT_GRID.DAZI, help="Index grid DAZI (default: %(default)s)")
+    parser.add_argument("--dzen", type=float, default=DEFAULT_GRID.DZEN, help="Index grid DZEN (default: %(default)s)")
+    parser.add_argument("--satellites", action="store_true", help="Include satellite antennas in the index")
+    args = parser.parse_args()
+
+    if not args.index and not args.files:
+        parser.error("Either ANTEX files or --index is required")
+    if args.index:
+        index = SimilarityIndex.load(args.index)
+    else:
+        index = build_index(args.files, GridSpec(args.dazi, 0.0, 90.0, args.dzen), args.satellites)
+    if args.save:
+        index.save(args.save)
+    if not args.type:
+        return
+
+    Antenna = find_antenna([args.query_file] if args.query_file else args.files, args.type, args.serial)
+    if Antenna is None:
+        sys.exit("Antenna {!r} not found".format(args.type))
+
+    codes = args.frequencies.split(",") if args.frequencies else None
+    exclude = None if args.query_file else (Antenna.Type, Antenna.Serial)
+    for code, matches in index.nearest(Antenna, args.k, codes, exclude).items():
+        print("{} {}".format(Antenna.Type, code))
+        for rank, (Type, Serial, RMS, PCO_Delta) in enumerate(matches, 1):
+            print("  {:2d} {:20} {:20} RMS {:6.2f} mm  PCO {:6.2f} mm".format(rank, Type, Serial, RMS, PCO_Delta))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#! /usr/bin/env python3
+
+import argparse
+import csv
+import fileinput
+import sys
+
+import numpy as np
+
+from JCMBSoftPyLib import HTML_Unit
+
+from Antenna_model import (
+    NO_AZ,
+    SYSTEM_NAMES,
+    band_label,
+    read_antennas,
+)
+
+STATS_COLUMNS = [
+    "Type",
+    "Serial",
+    "System",
+    "Band",
+    "North",
+    "East",
+    "Up",
+    "PCO Sep",
+    "Max |PCV|",
+    "Az RMS",
+    "Max |Az Delta|",
+]
+
+
+def format_value(value):
+    if value is None:
+        return ""
+    return "{:.2f}".format(value)
+
+
+def antenna_statistics(Antenna):
+    """Yield one row of STATS_COLUMNS per system and band of the antenna.
+
+    PCO Sep is the distance of the band's phase centre offset from the first band of the same system, so the
+    L2 row of a GPS antenna holds the L1/L2 separation. The azimuth columns are the deviation from NOAZI that
+    create_az_delta_plot draws and are empty for NOAZI only models.
+    """
+    for System in sorted(Antenna.APC_Offsets):
+        Reference_Offsets = None
+        for band in sorted(Antenna.APC_Offsets[System]):
+            if NO_AZ not in Antenna.APC_Offsets[System][band]:
+                continue
+
+            Products = Antenna.band_products(System, band)
+            Offsets = np.array(Antenna.NEE_Offsets[System][band])
+            if Reference_Offsets is None:
+                Reference_Offsets = Offsets
+
+            Max_PCV = max(np.abs(Products.NOAZI).max(), Products.Max_Correction)
+            Az_RMS = None
+            Max_Az_Delta = None
+            if Products.Values.size:
+                Az_RMS = np.sqrt(np.mean(Products.Delta * Products.Delta))
+                Max_Az_Delta = np.abs(Products.Delta).max()
+
+            yield [
+                Antenna.Type,
+                Antenna.Serial,
+                SYSTEM_NAMES[System],
+                band_label(System, band),
+                Offsets[0],
+                Offsets[1],
+                Offsets[2],
+                np.linalg.norm(Offsets - Reference_Offsets),
+                Max_PCV,
+                Az_RMS,
+                Max_Az_Delta,
+            ]
+
+
+def output_statistics_html(output, rows):
+    HTML_Unit.output_html_header(output, "Antenna statistics")
+    HTML_Unit.output_html_body(output)
+    HTML_Unit.output_table_header(
+        output,
+        "Antenna_Statistics",
+        "Antenna Statistics (mm)",
+        STATS_COLUMNS,
+    )
+    for row in rows:
+        HTML_Unit.output_table_row(output, row[:4] + [format_value(value) for value in row[4:]])
+    HTML_Unit.output_table_footer(output)
+    HTML_Unit.output_html_footer(output, ["Antenna_Statistics"])
+
+
+def output_statistics_csv(output, rows):
+    writer = csv.writer(output)
+    writer.writerow(STATS_COLUMNS)
+    for row in rows:
+        writer.writerow(row[:4] + [format_value(value) for value in row[4:]])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compute per antenna, per band PCO/PCV statistics from ANTEX files without plotting."
+    )
+    parser.add_argument("files", nargs="*", help="ANTEX files, standard input if none are given")
+    parser.add_argument("--csv", metavar="FILE", help="Also write the statistics as CSV to FILE")
+    args = parser.parse_args()
+
+    rows = []
+    for Antenna in read_antennas(fileinput.input(files=args.files)):
+        rows.extend(antenna_statistics(Antenna))
+
+    output_statistics_html(sys.stdout, rows)
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as csv_file:
+            output_statistics_csv(csv_file, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#! /usr/bin/env python3
+
+import argparse
+import mmap
+import sys
+
+from Antenna_model import SV_Types, split_type
+
+START_LABEL = b"START OF ANTENNA"
+END_LABEL = b"END OF ANTENNA"
+
+
+class AntennaKey:  # pylint: disable=R0903
+    """One requested antenna, as "TYPE" or "TYPE,SERIAL".
+
+    The type may be written as in the TYPE / SERIAL NO record or with a single space before the radome code,
+    "TRM59800.00 SCIS", and a type without a radome code is the NONE variant. A key without a serial matches
+    every block of the type, the type mean and any individual calibrations or, for a satellite block type,
+    every satellite. A key without a type, ",G01", matches the serial, or the PRN of a satellite, of any type.
+    """
+
+    def __init__(self, text):
+        self.Text = text
+        Type, _, Serial = text.partition(",")
+        Type = Type.strip()
+        self.Serial = Serial.strip()
+        self.Model = None
+        self.Radome = None
+        if Type in SV_Types:
+            self.Model, self.Radome = Type, ""
+        elif len(Type) > 16:
+            self.Model, self.Radome = split_type(Type)
+        elif Type:
+            fields = Type.rsplit(None, 1)
+            if len(fields) == 2 and len(fields[1]) <= 4:
+                self.Model, self.Radome = fields
+            else:
+                self.Model, self.Radome = Type, "NONE"
+        if self.Model is None and not self.Serial:
+            raise ValueError("Empty antenna key {!r}".format(text))
+
+    def matches(self, Model, Radome, Serial):
+        if self.Model is not None and (self.Model, self.Radome) != (Model, Radome):
+            return False
+        return not self.Serial or self.Serial == Serial
+
+
+def read_keys(lines):
+    """Return the AntennaKeys of a station antenna list, one key per line. Blank lines and # comments are skipped."""
+    keys = []
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if line:
+            keys.append(AntennaKey(line))
+    return keys
+
+
+def find_label(data, label, start):
+    """Return the offsets of the start and end of the next line at or after start with the record label, or None.
+
+    The label must be in column 61, so the same text in a COMMENT is not taken for the record.
+    """
+    while True:
+        position = data.find(label, start)
+        if position < 0:
+            return None
+        line_start = data.rfind(b"\n", 0, position) + 1
+        line_end = data.find(b"\n", position)
+        line_end = len(data) if line_end < 0 else line_end + 1
+        if position - line_start == 60 and not data[position + len(label) : line_end].strip():
+            return line_start, line_end
+        start = line_end
+
+
+def antenna_blocks(data):
+    """Yield (start, end, TYPE / SERIAL NO line) for every antenna block of the ANTEX bytes data.
+
+    The blocks are found by searching for their record labels rather than by reading the file line by line, so
+    the scan runs at the speed of bytes.find.
+    """
+    position = 0
+    while True:
+        start = find_label(data, START_LABEL, position)
+        if start is None:
+            return
+        end = find_label(data, END_LABEL, start[1])
+        if end is None:
+            raise Exception("Antenna block at byte {} has no END OF ANTENNA".format(start[0]))
+        type_line_end = data.find(b"\n", start[1])
+        yield start[0], end[1], bytes(data[start[1] : type_line_end if type_line_end >= 0 else end[1]])
+        position = end[1]
+
+
+def subset_antex(data, output, keys):
+    """Write the header and the blocks of the ANTEX bytes data matching any of keys to the binary output.
+
+    The header and blocks are copied byte for byte. Returns the keys that matched no block.
+    """
+    found = set()
+    first_block = True
+    for start, end, type_line in antenna_blocks(data):
+        if first_block:
+            output.write(data[0:start])
+            first_block = False
+        Type = type_line[0:20].decode("utf-8", errors="replace").rstrip()
+        Serial = type_line[20:40].decode("utf-8", errors="replace").strip()
+        Model, Radome = split_type(Type)
+        matched = [number for number, key in enumerate(keys) if key.matches(Model, Radome, Serial)]
+        if matched:
+            output.write(data[start:end])
+            found.update(matched)
+    if first_block:
+        output.write(data)
+    return [key for number, key in enumerate(keys) if number not in found]
+
+
+def subset_file(filename, output, keys):
+    """Subset the ANTEX file filename, standard input if it is "-", to output. Returns the missing keys."""
+    if filename == "-":
+        return subset_antex(sys.stdin.buffer.read(), output, keys)
+    with open(filename, "rb") as atx:
+        try:
+            data = mmap.mmap(atx.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file cannot be mapped
+            data = b""
+        try:
+            return subset_antex(data, output, keys)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write an ANTEX file holding only the header and the antennas of a station antenna list."
+    )
+    parser.add_argument("file", help="ANTEX file, - for standard input")
+    parser.add_argument(
+        "--list",
+        metavar="FILE",
+        action="append",
+        default=[],
+        help='Station antenna list, one "TYPE" or "TYPE,SERIAL" per line. May be repeated',
+    )
+    parser.add_argument(
+        "--antenna",
+        metavar="KEY",
+        action="append",
+        default=[],
+        help='Antenna to keep, as "TYPE" or "TYPE,SERIAL", for example "TRM59800.00 SCIS" or ",G01". May be repeated',
+    )
+    parser.add_argument("--output", "-o", metavar="FILE", help="File to write, standard output if not given")
+    args = parser.parse_args()
+
+    try:
+        keys = [AntennaKey(text) for text in args.antenna]
+        for filename in args.list:
+            with open(filename, encoding="utf-8") as list_file:
+                keys.extend(read_keys(list_file))
+    except ValueError as e:
+        parser.error(str(e))
+    if not keys:
+        parser.error("No antennas requested, give --list or --antenna")
+
+    if args.output:
+        with open(args.output, "wb") as output:
+            missing = subset_file(args.file, output, keys)
+    else:
+        missing = subset_file(args.file, sys.stdout.buffer, keys)
+
+    for key in missing:
+        sys.stderr.write("Not found: {}\n".format(key.Text))
+    sys.exit(1 if missing else 0)
+
+
+if __name__ == "__main__":
+    main()
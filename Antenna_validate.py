@@ -0,0 +1,284 @@
+#! /usr/bin/env python3
+
+import argparse
+import sys
+from collections import namedtuple
+
+# Only the standard library is imported, so validating does not pay for numpy and matplotlib
+
+SYSTEM_CODES = "GRECJIS"
+
+HEADER_RECORDS = ["ANTEX VERSION / SYST", "PCV TYPE / REFANT", "COMMENT", "END OF HEADER"]
+
+# Records of an antenna block before its first frequency, in the order ANTEX requires. Those not in
+# REQUIRED_RECORDS are optional.
+ANTENNA_RECORDS = [
+    "TYPE / SERIAL NO",
+    "METH / BY / # / DATE",
+    "DAZI",
+    "ZEN1 / ZEN2 / DZEN",
+    "# OF FREQUENCIES",
+    "VALID FROM",
+    "VALID UNTIL",
+    "SINEX CODE",
+]
+REQUIRED_RECORDS = ["TYPE / SERIAL NO", "METH / BY / # / DATE", "DAZI", "ZEN1 / ZEN2 / DZEN", "# OF FREQUENCIES"]
+
+ValidationError = namedtuple("ValidationError", ["Filename", "Line", "Message"])
+
+
+def parse_field(text, convert):
+    """Return text converted by int or float, None if it is blank or not a number."""
+    if not text.strip():
+        return None
+    try:
+        return convert(text)
+    except ValueError:
+        return None
+
+
+class ANTEXValidator:  # pylint: disable=R0902
+    """Check that ANTEX files are well formed, collecting every problem found in a single pass.
+
+    The checks are record order, the frequency count against the frequency blocks, the number and length of
+    the grid rows against DAZI and ZEN1 / ZEN2 / DZEN, the numeric fields and duplicate antennas. Nothing is
+    built from the values, so a file is validated at the speed it can be read.
+    """
+
+    def __init__(self):
+        self.Errors = []
+        self.Antennas = {}  # (Type, Serial, Valid From) -> (filename, line) of its first block
+        self.Filename = None
+        self.Line_Number = 0
+        self.reset_antenna()
+
+    def reset_antenna(self):
+        self.Antenna_Line = None
+        self.Seen = []
+        self.Type = None
+        self.Serial = None
+        self.Valid_From = ""
+        self.Num_Freqs = None
+        self.Frequencies = 0
+        self.Azimuths = None
+        self.Zeniths = None
+        self.Section = None  # "START OF FREQUENCY" or "START OF FREQ RMS" while in one
+        self.Code = None
+        self.Rows = []
+
+    def error(self, message):
+        self.Errors.append(ValidationError(self.Filename, self.Line_Number, message))
+
+    def validate(self, lines, filename="-"):
+        """Validate the lines of one ANTEX file, adding the problems found to Errors."""
+        self.Filename = filename
+        self.Line_Number = 0
+        self.reset_antenna()
+        In_Header = True
+
+        for self.Line_Number, line in enumerate(lines, 1):
+            line = line.rstrip("\r\n")
+            Record_Type = line[60:].rstrip()
+
+            if In_Header:
+                if self.Line_Number == 1 and Record_Type != "ANTEX VERSION / SYST":
+                    self.error("File does not start with ANTEX VERSION / SYST")
+                if Record_Type == "START OF ANTENNA":
+                    self.error("START OF ANTENNA before END OF HEADER")
+                    In_Header = False
+                else:
+                    if Record_Type not in HEADER_RECORDS:
+                        self.error("Unexpected {!r} in the header".format(Record_Type or line))
+                    In_Header = Record_Type != "END OF HEADER"
+                    continue
+
+            if self.Section is not None and Record_Type not in ("END OF FREQUENCY", "END OF FREQ RMS"):
+                self.section_record(line, Record_Type)
+            else:
+                self.record(line, Record_Type)
+
+        if In_Header:
+            self.error("No END OF HEADER")
+        elif self.Antenna_Line is not None:
+            self.error("File ends inside the antenna started at line {}".format(self.Antenna_Line))
+
+    def record(self, line, Record_Type):  # pylint: disable=R0912
+        if Record_Type == "START OF ANTENNA":
+            if self.Antenna_Line is not None:
+                self.error("START OF ANTENNA inside the antenna started at line {}".format(self.Antenna_Line))
+            self.reset_antenna()
+            self.Antenna_Line = self.Line_Number
+            return
+
+        if self.Antenna_Line is None:
+            if Record_Type != "COMMENT" and line.strip():
+                self.error("{!r} outside an antenna".format(Record_Type or line))
+            return
+
+        if Record_Type == "END OF ANTENNA":
+            self.end_antenna()
+        elif Record_Type in ("START OF FREQUENCY", "START OF FREQ RMS"):
+            self.start_section(line, Record_Type)
+        elif Record_Type in ("END OF FREQUENCY", "END OF FREQ RMS"):
+            self.end_section(line, Record_Type)
+        elif Record_Type == "COMMENT":
+            pass
+        elif Record_Type in ANTENNA_RECORDS:
+            self.antenna_record(line, Record_Type)
+        else:
+            self.error("Unexpected {!r} in an antenna".format(Record_Type or line))
+
+    def antenna_record(self, line, Record_Type):
+        if self.Frequencies:
+            self.error("{} after the first frequency".format(Record_Type))
+        if Record_Type in self.Seen:
+            self.error("Repeated {}".format(Record_Type))
+        elif self.Seen and ANTENNA_RECORDS.index(Record_Type) < ANTENNA_RECORDS.index(self.Seen[-1]):
+            self.error("{} after {}".format(Record_Type, self.Seen[-1]))
+        elif not self.Seen and Record_Type != "TYPE / SERIAL NO":
+            self.error("{} before TYPE / SERIAL NO".format(Record_Type))
+        self.Seen.append(Record_Type)
+
+        if Record_Type == "TYPE / SERIAL NO":
+            self.Type = line[0:20].rstrip()
+            self.Serial = line[20:40].rstrip()
+            if not self.Type:
+                self.error("Blank antenna type")
+        elif Record_Type == "DAZI":
+            DAZI = parse_field(line[2:8], float)
+            if DAZI is None or DAZI < 0:
+                self.error("Invalid DAZI {!r}".format(line[2:8]))
+            elif DAZI == 0:
+                self.Azimuths = []
+            elif abs(360.0 / DAZI - round(360.0 / DAZI)) > 1e-6:
+                self.error("DAZI {} does not divide 360".format(DAZI))
+            else:
+                self.Azimuths = [DAZI * n for n in range(int(round(360.0 / DAZI)) + 1)]
+        elif Record_Type == "ZEN1 / ZEN2 / DZEN":
+            ZEN1, ZEN2, DZEN = (parse_field(line[start : start + 6], float) for start in (2, 8, 14))
+            if None in (ZEN1, ZEN2, DZEN):
+                self.error("Invalid ZEN1 / ZEN2 / DZEN {!r}".format(line[0:20]))
+            elif DZEN <= 0 or ZEN2 <= ZEN1 or abs((ZEN2 - ZEN1) / DZEN - round((ZEN2 - ZEN1) / DZEN)) > 1e-6:
+                self.error("ZEN1 {} to ZEN2 {} is not a whole number of DZEN {}".format(ZEN1, ZEN2, DZEN))
+            else:
+                self.Zeniths = int(round((ZEN2 - ZEN1) / DZEN)) + 1
+        elif Record_Type == "# OF FREQUENCIES":
+            self.Num_Freqs = parse_field(line[0:6], int)
+            if self.Num_Freqs is None:
+                self.error("Invalid # OF FREQUENCIES {!r}".format(line[0:6]))
+        elif Record_Type in ("VALID FROM", "VALID UNTIL"):
+            fields = line[0:43].split()
+            if len(fields) != 6 or any(parse_field(field, float) is None for field in fields):
+                self.error("Invalid {} {!r}".format(Record_Type, line[0:43].strip()))
+            if Record_Type == "VALID FROM":
+                self.Valid_From = " ".join(fields)
+
+    def start_section(self, line, Record_Type):
+        missing = [record for record in REQUIRED_RECORDS if record not in self.Seen]
+        if missing and not self.Frequencies:
+            self.error("{} before {}".format(Record_Type, ", ".join(missing)))
+        self.Code = line[3:6]
+        if self.Code[0] not in SYSTEM_CODES or parse_field(self.Code[1:], int) is None:
+            self.error("Invalid frequency code {!r}".format(self.Code))
+        self.Section = Record_Type
+        self.Rows = []
+        if Record_Type == "START OF FREQUENCY":
+            self.Frequencies += 1
+
+    def section_record(self, line, Record_Type):
+        """A record inside a frequency or RMS section, the NORTH / EAST / UP record or a grid row."""
+        if Record_Type == "NORTH / EAST / UP":
+            if self.Rows:
+                self.error("NORTH / EAST / UP after the grid rows")
+            if any(parse_field(line[start : start + 10], float) is None for start in (0, 10, 20)):
+                self.error("Invalid NORTH / EAST / UP {!r}".format(line[0:30]))
+            self.Rows.append(None)
+            return
+        if Record_Type in ("START OF FREQUENCY", "START OF FREQ RMS", "END OF ANTENNA"):
+            self.error("{} inside {} {}".format(Record_Type, self.Code, self.Section))
+            self.Section = None
+            self.record(line, Record_Type)
+            return
+
+        if self.Section == "START OF FREQUENCY" and not self.Rows:
+            self.error("Grid row before NORTH / EAST / UP")
+            self.Rows.append(None)
+
+        Az = line[0:8]
+        if Az != "   NOAZI":
+            Az = parse_field(Az, float)
+            if Az is None:
+                self.error("Invalid azimuth {!r}".format(line[0:8]))
+        self.Rows.append(Az)
+
+        values = [line[start : start + 8] for start in range(8, len(line.rstrip()), 8)]
+        if self.Zeniths is not None and len(values) != self.Zeniths:
+            self.error("{} values in the row, ZEN1 / ZEN2 / DZEN gives {}".format(len(values), self.Zeniths))
+        for value in values:
+            if parse_field(value, float) is None:
+                self.error("Invalid value {!r}".format(value))
+                break
+
+    def end_section(self, line, Record_Type):
+        expected = "END OF FREQUENCY" if self.Section == "START OF FREQUENCY" else "END OF FREQ RMS"
+        if self.Section is None:
+            self.error("{} outside a frequency".format(Record_Type))
+            return
+        if Record_Type != expected:
+            self.error("{} ends a {}".format(Record_Type, self.Section))
+        if line[3:6] != self.Code:
+            self.error("{} {} ends frequency {}".format(Record_Type, line[3:6], self.Code))
+
+        Rows = [Az for Az in self.Rows if Az is not None]
+        if Rows[:1] != ["   NOAZI"]:
+            self.error("{} has no NOAZI row".format(self.Code))
+        elif self.Azimuths is not None and Rows[1:] != self.Azimuths:
+            self.error(
+                "{} has {} azimuth rows, DAZI gives {} from 0 to 360".format(self.Code, len(Rows) - 1, len(self.Azimuths))
+            )
+        self.Section = None
+
+    def end_antenna(self):
+        if self.Num_Freqs is not None and self.Num_Freqs != self.Frequencies:
+            self.error(
+                "# OF FREQUENCIES is {} but the antenna has {} frequencies".format(self.Num_Freqs, self.Frequencies)
+            )
+        key = (self.Type, self.Serial, self.Valid_From)
+        if self.Type is not None:
+            if key in self.Antennas:
+                self.error("Duplicate {!r} serial {!r}, first at {}:{}".format(self.Type, self.Serial, *self.Antennas[key]))
+            else:
+                self.Antennas[key] = (self.Filename, self.Antenna_Line)
+        self.reset_antenna()
+
+
+def validate_files(filenames, output=sys.stdout):
+    """Validate the files, standard input if there are none, writing the problems to output.
+
+    Returns the number of problems found, so it can be used as an exit status.
+    """
+    validator = ANTEXValidator()
+    for filename in filenames or ["-"]:
+        if filename == "-":
+            validator.validate(sys.stdin, filename)
+        else:
+            with open(filename, encoding="utf-8", errors="replace") as atx:
+                validator.validate(atx, filename)
+
+    for error in validator.Errors:
+        output.write("{}:{}: {}\n".format(*error))
+    sys.stderr.write("{} antennas, {} problems\n".format(len(validator.Antennas), len(validator.Errors)))
+    return len(validator.Errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that ANTEX files are well formed, listing every problem with its line number."
+    )
+    parser.add_argument("files", nargs="*", help="ANTEX files, standard input if none are given")
+    args = parser.parse_args()
+    sys.exit(1 if validate_files(args.files) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#! /usr/bin/env python3
+
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+from Antenna_atx import (
+    HTMLIndex,
+    Output_Layout,
+    output_antenna_details,
+    output_index_footer,
+    output_index_header,
+)
+from Antenna_index import ANTEXIndex, block_lines
+from Antenna_model import read_antennas
+
+
+def write_atomic(filename, text):
+    """Replace filename with text so readers only ever see the old or the new file."""
+    temp_filename = "{}.tmp{}".format(filename, os.getpid())
+    with open(temp_filename, "w", encoding="utf-8") as temp_file:
+        temp_file.write(text)
+    os.replace(temp_filename, filename)
+
+
+class WatchedFile:  # pylint: disable=R0903
+    """State kept in memory between updates for one ANTEX file.
+
+    Digests maps each (Type, Serial) to the digests of its blocks, Antennas to the parsed antennas, Rows to
+    the rendered index rows and Written to the files its rendering wrote, so only blocks whose bytes changed are
+    parsed and rendered again.
+    """
+
+    def __init__(self, filename):
+        self.Filename = filename
+        self.Signature = None
+        self.Order = []
+        self.Digests = {}
+        self.Antennas = {}
+        self.Rows = {}
+        self.Written = {}
+
+    def update(self):
+        """Re-index the file and re-render the antennas whose blocks changed. Returns the number re-rendered."""
+        index = ANTEXIndex(self.Filename)
+
+        Blocks = {}
+        for block in index:
+            Blocks.setdefault((block.Type, block.Serial), []).append(block)
+
+        Rendered = 0
+        with open(self.Filename, "rb") as atx:
+            for key, blocks in Blocks.items():
+                Digests = [block.Digest for block in blocks]
+                if self.Digests.get(key) == Digests:
+                    continue
+
+                # Recorded only once the antenna has rendered, so a block that fails is tried again next update
+                Antennas = []
+                row = io.StringIO()
+                start = len(Output_Layout.Written)
+                for block in blocks:
+                    for Antenna in read_antennas(block_lines(index.read_block(block, atx))):
+                        Antennas.append(Antenna)
+                        output_antenna_details(Antenna, HTMLIndex(row))
+                self.Digests[key] = Digests
+                self.Antennas[key] = Antennas
+                self.Rows[key] = row.getvalue()
+                self.Written[key] = Output_Layout.Written[start:]
+                Rendered += 1
+
+        for key in set(self.Digests) - set(Blocks):
+            del self.Digests[key]
+            del self.Antennas[key]
+            del self.Rows[key]
+            del self.Written[key]
+
+        self.Order = [key for key in Blocks if key in self.Rows]
+        return Rendered
+
+
+class ANTEXWatcher:
+    """Re-render the report for a set of ANTEX files and directories whenever their files change.
+
+    Changes are picked up through inotify when inotify_simple is installed and by polling otherwise. A file is
+    only processed once it has not changed for debounce seconds, so a burst of writes causes a single update.
+    """
+
+    def __init__(self, paths, index_filename, pattern="*.atx", interval=2.0, debounce=5.0):
+        self.Paths = paths
+        self.Index_Filename = index_filename
+        self.Pattern = pattern
+        self.Interval = interval
+        self.Debounce = debounce
+        self.Files = {}
+        self.Pending = {}  # filename -> (signature, time it was first seen with it)
+        self.INotify = None
+
+        if INotify is not None:
+            self.INotify = INotify()
+            mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE | flags.CREATE
+            for path in paths:
+                self.INotify.add_watch(path if os.path.isdir(path) else os.path.dirname(path) or ".", mask)
+
+    def filenames(self):
+        result = []
+        for path in self.Paths:
+            if os.path.isdir(path):
+                result.extend(sorted(glob.glob(os.path.join(path, self.Pattern))))
+            elif os.path.exists(path):
+                result.append(path)
+        return result
+
+    def changed_files(self):
+        """Return {filename: (mtime, size)} for the files new or changed since processed, None if removed."""
+        changed = {}
+        current = self.filenames()
+        for filename in current:
+            stat = os.stat(filename)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            watched = self.Files.get(filename)
+            if watched is None or watched.Signature != signature:
+                changed[filename] = signature
+        for filename in set(self.Files) - set(current):
+            changed[filename] = None
+        return changed
+
+    def wait(self):
+        """Block until something may have changed, at most the poll interval."""
+        if self.INotify is not None:
+            self.INotify.read(timeout=int(self.Interval * 1000))
+        else:
+            time.sleep(self.Interval)
+
+    def write_index(self):
+        index = io.StringIO()
+        output_index_header(index)
+        for filename in sorted(self.Files):
+            watched = self.Files[filename]
+            for key in watched.Order:
+                index.write(watched.Rows[key])
+        output_index_footer(index)
+        write_atomic(self.Index_Filename, index.getvalue())
+
+    def write_manifest(self):
+        """Write the manifest of the files of every antenna watched, then empty Output_Layout.Written.
+
+        As only the antennas that changed are rendered again, the manifest lists the files each antenna last
+        wrote rather than the files written by this update. Emptying Written stops it growing between updates.
+        """
+        Output_Layout.Written[:] = [
+            name
+            for filename in sorted(self.Files)
+            for key in self.Files[filename].Order
+            for name in self.Files[filename].Written[key]
+        ]
+        Output_Layout.write_manifest()
+        Output_Layout.Written.clear()
+
+    def process(self, filenames):
+        for filename in filenames:
+            if not os.path.exists(filename):
+                if self.Files.pop(filename, None) is not None:
+                    sys.stderr.write("Removed {}\n".format(filename))
+                continue
+
+            watched = self.Files.setdefault(filename, WatchedFile(filename))
+            stat = os.stat(filename)
+            try:
+                Rendered = watched.update()
+            except Exception as e:  # pylint: disable=W0718
+                # Most likely caught mid write, the next change will pick it up again
+                sys.stderr.write("Failed to process {}: {}\n".format(filename, e))
+                continue
+            watched.Signature = (stat.st_mtime_ns, stat.st_size)
+            sys.stderr.write("Updated {}: {} antennas re-rendered\n".format(filename, Rendered))
+        self.write_index()
+        self.write_manifest()
+
+    def run(self, once=False):
+        self.process(self.changed_files())
+        while not once:
+            self.wait()
+            now = time.monotonic()
+            for filename, signature in self.changed_files().items():
+                # The debounce restarts whenever the file is seen changing again
+                if filename not in self.Pending or self.Pending[filename][0] != signature:
+                    self.Pending[filename] = (signature, now)
+
+            ready = [filename for filename, (_, seen) in self.Pending.items() if now - seen >= self.Debounce]
+            if ready:
+                for filename in ready:
+                    del self.Pending[filename]
+                self.process(ready)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Watch ANTEX files and directories, re-rendering the antennas that change and the index."
+    )
+    parser.add_argument("paths", nargs="+", help="ANTEX files or directories containing them")
+    parser.add_argument("--index", default="index.html", help="Index page to update atomically (default: %(default)s)")
+    parser.add_argument("--pattern", default="*.atx", help="Files to watch in directories (default: %(default)s)")
+    parser.add_argument("--interval", type=float, default=2.0, help="Poll interval in seconds (default: %(default)s)")
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=5.0,
+        help="Seconds a file must be unchanged before it is processed (default: %(default)s)",
+    )
+    parser.add_argument("--output-dir", default=".", help="Directory for the pages and plots (default: %(default)s)")
+    parser.add_argument(
+        "--layout",
+        choices=["flat", "type", "hash"],
+        default="flat",
+        help="Output directory layout, as for Antenna_atx.py (default: %(default)s)",
+    )
+    parser.add_argument("--once", action="store_true", help="Render once and exit")
+    args = parser.parse_args()
+
+    Output_Layout.configure(args.output_dir, args.layout)
+
+    watcher = ANTEXWatcher(args.paths, args.index, args.pattern, args.interval, args.debounce)
+    try:
+        watcher.run(args.once)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import pytest
+
+
+def record(text, label):
+    return "{:<60}{}\n".format(text, label)
+
+
+def antenna_block(  # pylint: disable=R0913,R0914,R0917
+    Type="TRM59800.00     NONE",
+    Serial="",
+    dazi=30.0,
+    zen=(0.0, 90.0, 30.0),
+    freqs=("G01", "G02"),
+    value=lambda freq, az, zen: -0.01 * zen,
+    rms=None,
+    valid=None,
+    neu="      1.00      2.00     60.00",
+):
+    """Return the lines of an ANTEX antenna block.
+
+    value(freq, az, zen) gives each PCV, az being None for the NOAZI row, and rms the same for the FREQ RMS
+    sections, which are only written when it is given. valid is (VALID FROM, VALID UNTIL) record text.
+    """
+    zeniths = []
+    z = zen[0]
+    while z <= zen[1]:
+        zeniths.append(z)
+        z += zen[2]
+    azimuths = []
+    az = 0.0
+    while dazi and az <= 360.0:
+        azimuths.append(az)
+        az += dazi
+
+    def grid(values):
+        rows = ["   NOAZI" + "".join("{:8.2f}".format(values(None, z)) for z in zeniths) + "\n"]
+        for az in azimuths:
+            rows.append("{:8.1f}".format(az) + "".join("{:8.2f}".format(values(az, z)) for z in zeniths) + "\n")
+        return rows
+
+    lines = [
+        record("", "START OF ANTENNA"),
+        record("{:<20}{:<20}".format(Type, Serial), "TYPE / SERIAL NO"),
+        record("ROBOT               Geo++ GmbH           0    29-JAN-17", "METH / BY / # / DATE"),
+        record("  {:6.1f}".format(dazi), "DAZI"),
+        record("  {:6.1f}{:6.1f}{:6.1f}".format(*zen), "ZEN1 / ZEN2 / DZEN"),
+        record("{:6d}".format(len(freqs)), "# OF FREQUENCIES"),
+    ]
+    if valid:
+        lines.append(record(valid[0], "VALID FROM"))
+        lines.append(record(valid[1], "VALID UNTIL"))
+    lines.append(record("IGS20_2247", "SINEX CODE"))
+    for freq in freqs:
+        lines.append(record("   " + freq, "START OF FREQUENCY"))
+        lines.append(record(neu, "NORTH / EAST / UP"))
+        lines.extend(grid(lambda az, z, freq=freq: value(freq, az, z)))
+        lines.append(record("   " + freq, "END OF FREQUENCY"))
+        if rms is not None:
+            lines.append(record("   " + freq, "START OF FREQ RMS"))
+            lines.append(record("      0.10      0.20      0.30", "NORTH / EAST / UP"))
+            lines.extend(grid(lambda az, z, freq=freq: rms(freq, az, z)))
+            lines.append(record("   " + freq, "END OF FREQ RMS"))
+    lines.append(record("", "END OF ANTENNA"))
+    return lines
+
+
+HEADER = [
+    record("     1.4            M", "ANTEX VERSION / SYST"),
+    record("A", "PCV TYPE / REFANT"),
+    record("", "END OF HEADER"),
+]
+
+
+@pytest.fixture(name="make_block")
+def make_block_fixture():
+    """The antenna_block builder."""
+    return antenna_block
+
+
+@pytest.fixture(name="make_antex")
+def make_antex_fixture():
+    """Return a builder of a whole ANTEX file from antenna blocks."""
+
+    def make_antex(*blocks):
+        return "".join(HEADER + [line for block in blocks for line in block])
+
+    return make_antex
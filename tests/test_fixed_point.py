@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from Antenna_model import NO_AZ, FixedPointGrid, grid_arrays, read_antennas
+
+
+def pcv(freq, az, zen):
+    # -0.001 is written as -0.00
+    if zen == 0.0:
+        return -0.001
+    return (1.5 if freq == "G02" else -2.25) * np.sin(np.radians(zen)) + (0.0 if az is None else 0.37 * np.cos(np.radians(az)))
+
+
+def encode(values, noazi):
+    values = np.array(values, dtype=float)
+    return FixedPointGrid(np.arange(len(values), dtype=float), np.arange(values.shape[1], dtype=float), values, np.array(noazi))
+
+
+def test_round_trip_is_exact(make_block):
+    block = make_block(dazi=5.0, zen=(0.0, 90.0, 5.0), value=pcv, rms=pcv)
+    (Parsed,) = read_antennas(block)
+    (Compact,) = read_antennas(block, compact=True)
+    for Grids, Compact_Grids in ((Parsed.APC_Offsets, Compact.APC_Offsets), (Parsed.APC_RMS, Compact.APC_RMS)):
+        for System, bands in Grids.items():
+            for band, Grid in bands.items():
+                assert isinstance(Compact_Grids[System][band], FixedPointGrid)
+                for parsed, decoded in zip(grid_arrays(Grid), grid_arrays(Compact_Grids[System][band])):
+                    assert parsed.dtype == decoded.dtype and parsed.shape == decoded.shape
+                    assert parsed.tobytes() == decoded.tobytes()
+
+
+def test_negative_zero_keeps_its_sign(make_block):
+    (Antenna,) = read_antennas(make_block(value=pcv), compact=True)
+    _, _, values, noazi = Antenna.band_grid(0, 1)
+    assert noazi[0] == 0.0 and np.signbit(noazi[0])
+    assert np.signbit(values[:, 0]).all()
+    assert np.signbit(Antenna.APC_Offsets[0][1][NO_AZ][0][1])
+
+
+def test_int16_and_int32():
+    assert encode([[327.67, -327.67]], [0.0, 0.0]).Grid.dtype == np.int16
+    grid = encode([[327.68, -1.0]], [0.0, 0.0])
+    assert grid.Grid.dtype == np.int32
+    assert grid.decode()[2].tolist() == [[327.68, -1.0]]
+
+
+def test_finer_scale_fallback():
+    grid = encode([[0.005, 1.25]], [-0.125, 0.0])
+    assert grid.Units_Per_MM == 1000
+    assert grid.decode()[2].tolist() == [[0.005, 1.25]]
+    assert grid.decode()[3].tolist() == [-0.125, 0.0]
+    assert encode([[0.01]], [0.0]).Units_Per_MM == 100
+    with pytest.raises(ValueError):
+        encode([[1e-6]], [0.0])
+
+
+def test_reads_as_the_parsed_dict(make_block):
+    block = make_block(value=pcv)
+    (Parsed,) = read_antennas(block)
+    (Compact,) = read_antennas(block, compact=True)
+    Grid = Parsed.APC_Offsets[0][2]
+    Compact_Grid = Compact.APC_Offsets[0][2]
+    assert list(Compact_Grid) == list(Grid)
+    assert len(Compact_Grid) == len(Grid)
+    assert dict(Compact_Grid.items()) == Grid
+    assert Compact_Grid[NO_AZ] == Grid[NO_AZ] and Compact_Grid[90.0] == Grid[90.0]
+    assert Compact_Grid.get(45.0) is None and 45.0 not in Compact_Grid
+    with pytest.raises(KeyError):
+        Compact_Grid[45.0]  # pylint: disable=W0104
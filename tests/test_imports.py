@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must load without the plotting dependencies
+NUMPY_ONLY_MODULES = ["Antenna_model", "Antenna_eval", "Antenna_validate", "Antenna_resample", "Antenna_service"]
+PLOTTING_PACKAGES = ["matplotlib", "JCMBSoftPyLib"]
+
+
+@pytest.mark.parametrize("module", NUMPY_ONLY_MODULES)
+def test_module_does_not_import_plotting(module):
+    # A fresh interpreter, so nothing imported by other tests is already in sys.modules
+    code = "import sys; import {}; print(','.join(name for name in {!r} if name in sys.modules))".format(
+        module, PLOTTING_PACKAGES
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=False)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
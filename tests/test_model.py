@@ -0,0 +1,40 @@
+from datetime import datetime, UTC
+
+import pytest
+
+from Antenna_model import GPS, L1, L2, NO_AZ, read_antennas
+
+
+def rms_value(freq, az, zen):
+    return 0.1 + zen / 100 + (0.5 if freq == "G02" else 0.0) + (0.0 if az is None else az / 100)
+
+
+def test_freq_rms_sections(make_block):
+    valid = ("  2011     7    16     0     0    0.0000000", "  2020     1     1    12    30   15.5000000")
+    (Antenna,) = read_antennas(make_block(rms=rms_value, valid=valid))
+    (Plain,) = read_antennas(make_block(valid=valid))
+
+    assert Antenna.APC_Offsets == Plain.APC_Offsets
+    assert Antenna.NEE_Offsets == Plain.NEE_Offsets
+
+    assert Antenna.NEE_RMS == {GPS: {L1: (0.1, 0.2, 0.3), L2: (0.1, 0.2, 0.3)}}
+    assert sorted(Antenna.APC_RMS[GPS]) == [L1, L2]
+    for band, freq in ((L1, "G01"), (L2, "G02")):
+        Grid = Antenna.APC_RMS[GPS][band]
+        assert list(Grid) == [NO_AZ, 0.0, 30.0, 60.0, 90.0, 120.0, 150.0, 180.0, 210.0, 240.0, 270.0, 300.0, 330.0, 360.0]
+        for Az, row in Grid.items():
+            assert [zen for zen, _ in row] == [0.0, 30.0, 60.0, 90.0]
+            assert [value for _, value in row] == pytest.approx(
+                [rms_value(freq, None if Az == NO_AZ else Az, zen) for zen, _ in row]
+            )
+
+    assert Antenna.Valid_From == datetime(2011, 7, 16, tzinfo=UTC)
+    assert Antenna.Valid_Until == datetime(2020, 1, 1, 12, 30, 15, 500000, tzinfo=UTC)
+
+
+def test_records_outside_an_antenna(make_block):
+    lines = make_block()
+    with pytest.raises(Exception, match="while not in antenna"):
+        list(read_antennas(lines[1:]))
+    with pytest.raises(Exception, match="start of antenna while in antenna"):
+        list(read_antennas(lines[:-1] + lines))
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+import Antenna_service
+from Antenna_model import parse_frequency_code
+from Antenna_service import AntennaService
+
+
+@pytest.fixture(name="service")
+def service_fixture(tmp_path, make_block, make_antex):
+    filename = tmp_path / "test.atx"
+    filename.write_text(make_antex(make_block()))
+    return AntennaService(str(filename))
+
+
+def test_parse_frequency_code():
+    assert parse_frequency_code("G01") == (0, 1)
+    for code in ["", "G", "X01", "G0x", "01", None, 1]:
+        with pytest.raises(ValueError):
+            parse_frequency_code(code)
+
+
+def test_bad_frequency_is_a_client_error(service):
+    query = {"type": "TRM59800.00     NONE", "frequency": "", "az": [0], "zen": [0]}
+    with pytest.raises(ValueError):
+        service.handle("POST", "/pcv", {}, json.dumps(query))
+
+
+def test_missing_type_is_a_client_error(service):
+    with pytest.raises(ValueError):
+        service.handle("GET", "/antenna", {}, b"")
+
+
+def test_interpolator_of_a_replaced_catalogue_is_not_cached(service, monkeypatch):
+    build = Antenna_service.PCVInterpolator
+
+    def reload_while_building(*args):
+        service.load()
+        return build(*args)
+
+    monkeypatch.setattr(Antenna_service, "PCVInterpolator", reload_while_building)
+    interpolator = service.interpolator("TRM59800.00     NONE", "", "G01")
+    assert interpolator(0.0, 30.0) == pytest.approx(-0.3)
+    assert not service.Interpolators
+
+    monkeypatch.setattr(Antenna_service, "PCVInterpolator", build)
+    service.interpolator("TRM59800.00     NONE", "", "G01")
+    assert len(service.Interpolators) == 1
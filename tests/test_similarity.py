@@ -0,0 +1,26 @@
+import numpy as np
+
+from Antenna_similarity import solid_angle_weights
+
+
+def test_solid_angle_weights_cover_the_grid():
+    azimuths = np.arange(0.0, 360.1, 5.0)
+    zeniths = np.arange(0.0, 90.1, 5.0)
+    weights = solid_angle_weights(azimuths, zeniths)
+    assert np.isclose(weights.sum(), 1.0)
+    assert not weights[-1].any()
+
+    # Each zenith row covers the band of half a step either side of it, clipped to the grid, of the cap's solid angle
+    cap = 2 * np.pi * (1 - np.cos(np.radians(zeniths[-1])))
+    low = np.radians(np.clip(zeniths - 2.5, zeniths[0], zeniths[-1]))
+    high = np.radians(np.clip(zeniths + 2.5, zeniths[0], zeniths[-1]))
+    np.testing.assert_allclose(weights.sum(axis=0) * cap, 2 * np.pi * (np.cos(low) - np.cos(high)))
+
+
+def test_solid_angle_weights_partial_cap():
+    azimuths = np.arange(0.0, 360.0, 10.0)
+    zeniths = np.arange(0.0, 80.1, 10.0)
+    weights = solid_angle_weights(azimuths, zeniths)
+    # The bands up to 45 degrees, halfway between the 40 and 50 degree rows, are that part of the cap
+    below = weights[:, zeniths <= 40.0].sum()
+    np.testing.assert_allclose(below, (1 - np.cos(np.radians(45.0))) / (1 - np.cos(np.radians(80.0))))
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("matplotlib")
+pytest.importorskip("JCMBSoftPyLib")
+
+from Antenna_atx import Output_Layout  # pylint: disable=C0413
+from Antenna_watch import ANTEXWatcher  # pylint: disable=C0413
+
+
+def test_bad_block_is_rendered_once_fixed(tmp_path, make_block, make_antex):
+    good = make_block("TRM59800.00     NONE")
+    fixed = make_block("LEIAR25.R3      LEIT")
+    bad = [line.replace("      1.00      2.00", "      xx.x      2.00") for line in fixed]
+    filename = tmp_path / "test.atx"
+    index_filename = tmp_path / "index.html"
+    Output_Layout.configure(str(tmp_path / "out"), "flat")
+    watcher = ANTEXWatcher([str(filename)], str(index_filename))
+
+    filename.write_text(make_antex(good, bad))
+    watcher.process([str(filename)])
+    watched = watcher.Files[str(filename)]
+    assert ("LEIAR25.R3      LEIT", "") not in watched.Digests
+    assert not Output_Layout.Written
+
+    # An edit elsewhere while the block is still bad
+    edited = make_block("TRM59800.00     NONE", value=lambda freq, az, zen: -0.02 * zen)
+    filename.write_text(make_antex(edited, bad))
+    watcher.process([str(filename)])
+    assert ("LEIAR25.R3      LEIT", "") not in watched.Digests
+
+    filename.write_text(make_antex(edited, fixed))
+    watcher.process([str(filename)])
+    assert watched.Order == [("TRM59800.00     NONE", ""), ("LEIAR25.R3      LEIT", "")]
+    index = index_filename.read_text()
+    assert "TRM59800.00" in index and "LEIAR25.R3" in index
+    manifest = (tmp_path / "out" / "manifest.txt").read_text().split()
+    assert any(name.startswith("LEIAR25.R3") for name in manifest)